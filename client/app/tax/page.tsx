@@ -27,7 +27,7 @@ export default function TaxPage() {
 
   const taxEstimate = tax.tax_estimate;
   const oldRegime = taxEstimate?.old_regime;
-  const newRegime = taxEstimate?.new_regime_2025_26;
+  const newRegime = taxEstimate?.new_regime;
 
   return (
     <main className="min-h-screen bg-gradient-to-br from-black via-slate-900 to-black text-white px-6 py-20">
@@ -96,7 +96,7 @@ export default function TaxPage() {
 
             {/* NEW REGIME */}
             <div className="rounded-xl border border-emerald-400/30 bg-emerald-400/10 p-6">
-              <p className="text-sm text-slate-400">New Regime (2025–26)</p>
+              <p className="text-sm text-slate-400">New Regime (FY {taxEstimate?.financial_year})</p>
               <p className="mt-2">
                 Taxable Income: <b>₹{newRegime?.taxable_income}</b>
               </p>
@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useRef, useEffect } from "react";
-import axios from "axios";
+import { HttpError, endChatSession, postEventStream, startChatSession } from "@/lib/api";
 import { Button } from "./ui/button";
 import { Input } from "./ui/input";
 import { Avatar } from "./ui/avatar";
@@ -27,6 +27,7 @@ export function ChatBot() {
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
   const inputRef = useRef<HTMLInputElement>(null);
+  const sessionRef = useRef<string | null>(null);
 
   // Define common prompt with provided data
   const commonPrompt = `
@@ -147,6 +148,26 @@ Large single txn (≥50% of monthly total) found in:
     }
   }, [messages]);
 
+  // The server keeps the report and history per session; end it on unmount
+  useEffect(() => {
+    return () => {
+      if (sessionRef.current) endChatSession(sessionRef.current);
+    };
+  }, []);
+
+  // Created on the first question: the stored /analyze response is sent
+  // once, and its structured fields (monthly_summary, category_breakdown,
+  // tax_snapshot) let the server answer factual questions without the LLM
+  const chatSession = async () => {
+    if (!sessionRef.current) {
+      const analysisResult = JSON.parse(
+        localStorage.getItem("analysisResult") || "{}"
+      );
+      sessionRef.current = await startChatSession(analysisResult);
+    }
+    return sessionRef.current;
+  };
+
   // Focus input when chat opens
   useEffect(() => {
     if (isOpen && inputRef.current) {
@@ -162,62 +183,51 @@ Large single txn (≥50% of monthly total) found in:
       content: inputValue,
     };
 
-    // Update messages with user input
-    setMessages([...messages, userMessage]);
+    // Update messages with user input, plus the assistant reply that the
+    // streamed tokens are written into
+    setMessages([...messages, userMessage, { role: "assistant", content: "" }]);
     setInputValue("");
     setIsLoading(true);
 
-    try {
-      // Construct the payload with a single system prompt and the current user message
-      const analysisResult = JSON.parse(
-        localStorage.getItem("analysisResult") || "{}"
+    const setReply = (update: (content: string) => string) =>
+      setMessages((prevMessages) => {
+        const last = prevMessages[prevMessages.length - 1];
+        return [...prevMessages.slice(0, -1), { ...last, content: update(last.content) }];
+      });
+
+    // Stream the answer so it shows from the first token
+    let failed = false;
+    const ask = async () =>
+      postEventStream(
+        `http://localhost:8000/report-chat/session/${await chatSession()}/stream`,
+        { message: userMessage.content },
+        (event, data) => {
+          if (event === "token") {
+            setReply((content) => content + data.text);
+          } else if (event === "done") {
+            setReply(() => data?.response || "This information isn't available.");
+          } else if (event === "error") {
+            failed = true;
+          }
+        }
       );
-      
-      // ✅ Convert report JSON into readable text
-      const reportText = `
-      HIGHEST EXPENSE MONTH:
-      April had the highest expenses with total outflow of ₹3,18,899.
-
-      LIFE EVENT:
-      ${JSON.stringify(analysisResult.life_event, null, 2)}
-
-      AI REPORT:
-      ${analysisResult.ai_report?.sections
-      ?.map((s: any) => `${s.title}\n${s.content}`)
-      .join("\n\n")}
-
-      SIP RECOMMENDATION:
-      ${JSON.stringify(analysisResult.sip_recommendation, null, 2)}
-      `;
-      
-      const payload = {
-        message: userMessage.content,
-        report: reportText,
-      };
-
-      // Send message to backend
-      const response = await axios.post("http://localhost:8000/report-chat", payload);
-
-      console.log("CHAT RESPONSE:", response.data);
-
-      // Add response to messages
-      setMessages((prevMessages) => [
-        ...prevMessages,
-        {
-          role: "assistant",
-          content: response.data?.response ?? "This information isn't available.",
-        },
-      ]);
+
+    try {
+      try {
+        await ask();
+      } catch (error) {
+        // Sessions expire after a while idle: start a new one and retry once
+        if (!(error instanceof HttpError && error.status === 404)) throw error;
+        sessionRef.current = null;
+        await ask();
+      }
+      if (failed) throw new Error("Report chat stream failed");
     } catch (error) {
       console.error("Error sending message:", error);
-      setMessages((prevMessages) => [
-        ...prevMessages,
-        {
-          role: "assistant",
-          content:
-             "I’m unable to answer right now. Please ask a question related to your financial report or try again.",
-        },
-      ]);
+      setReply(
+        () =>
+          "I’m unable to answer right now. Please ask a question related to your financial report or try again."
+      );
     } finally {
       setIsLoading(false);
     }
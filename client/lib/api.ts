@@ -14,3 +14,78 @@ export async function analyzeStatement(file: File, risk: number) {
 
   return res.json()
 }
+
+export class HttpError extends Error {
+  constructor(public status: number) {
+    super(`Request failed (${status})`)
+  }
+}
+
+// Report chat sessions: the report is uploaded once, then each turn sends
+// only the question (see /report-chat/session on the server)
+export async function startChatSession(report: unknown): Promise<string> {
+  const res = await fetch("http://localhost:8000/report-chat/session", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ report }),
+  })
+
+  if (!res.ok) {
+    throw new HttpError(res.status)
+  }
+
+  return (await res.json()).session_id
+}
+
+export function endChatSession(sessionId: string) {
+  // keepalive lets the request finish while the page is unloading
+  return fetch(`http://localhost:8000/report-chat/session/${sessionId}`, {
+    method: "DELETE",
+    keepalive: true,
+  }).catch(() => undefined)
+}
+
+// POSTs JSON to a server-sent-events endpoint (e.g. /report-chat/stream) and
+// calls onEvent(event, data) for each event as it arrives. Resolves once the
+// server closes the stream.
+export async function postEventStream(
+  url: string,
+  body: unknown,
+  onEvent: (event: string, data: any) => void,
+) {
+  const res = await fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  })
+
+  if (!res.ok || !res.body) {
+    throw new HttpError(res.status)
+  }
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ""
+
+  while (true) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+
+    // Events are separated by a blank line
+    let boundary = buffer.indexOf("\n\n")
+    while (boundary !== -1) {
+      const frame = buffer.slice(0, boundary)
+      buffer = buffer.slice(boundary + 2)
+      boundary = buffer.indexOf("\n\n")
+
+      let event = "message"
+      const data: string[] = []
+      for (const line of frame.split("\n")) {
+        if (line.startsWith("event:")) event = line.slice(6).trim()
+        else if (line.startsWith("data:")) data.push(line.slice(5).trimStart())
+      }
+      if (data.length) onEvent(event, JSON.parse(data.join("\n")))
+    }
+  }
+}
@@ -0,0 +1,309 @@
+# server/aggregation.py
+
+import numpy as np
+import pandas as pd
+
+from merchant_keys import UNKNOWN_MERCHANT, merchant_keys
+
+# =============================================================================
+# Vectorised aggregation engine
+# =============================================================================
+# Everything analyze_transactions reports is derived from three grouped
+# reductions over the rows:
+#   - per (month, category, subcategory): counts and amount sums/max
+#   - per month: the closing balance (last row of the month)
+#   - per (merchant key, month): row counts and amounts, for recurring
+#     detection (keys come from merchant_keys.py, so reference numbers and
+#     dates in the narration do not split one merchant into many)
+# Monthly totals, the category breakdown, salary series, income/expense
+# totals and the largest-transaction ratio are then rolled up from the
+# (month, category, subcategory) table, which has a few hundred rows rather
+# than one per transaction. Only built-in reductions are used, no per-group
+# Python callbacks.
+#
+# The same engine serves whole statements (aggregate_frame) and chunked
+# reads (new_aggregates / fold_frame / finish_aggregates).
+
+SUBCAT_KEYS = ["monthyear", "month", "category", "subcategory"]
+
+SUBCAT_AGGS = {
+    "subcat_count": "sum",
+    "subcat_amount": "sum",
+    "subcat_inflow": "sum",
+    "subcat_outflow": "sum",
+    "max_abs_amount": "max",
+    "positive_credit": "sum",
+    "expense_debit": "sum",
+    "expense_count": "sum",
+}
+
+
+# ==============================
+# ACCUMULATORS
+# ==============================
+
+def _accumulator(keys, aggs):
+    return {"keys": keys, "aggs": aggs, "frames": [], "pending": 0, "size": 0}
+
+
+def _compact(acc):
+    if len(acc["frames"]) > 1:
+        acc["frames"] = [
+            pd.concat(acc["frames"], ignore_index=True)
+              .groupby(acc["keys"], as_index=False, sort=False)
+              .agg(acc["aggs"])
+        ]
+    acc["size"] = len(acc["frames"][0]) if acc["frames"] else 0
+    acc["pending"] = 0
+
+
+def _accumulate(acc, part):
+    """
+    Fold a per-chunk partial aggregate into a running accumulator.
+    Partials are buffered and only re-grouped once they outgrow the last
+    compacted result, so an accumulator never holds more than about twice
+    its group count and is not re-grouped in full on every chunk.
+    """
+    acc["frames"].append(part)
+    acc["pending"] += len(part)
+    if acc["pending"] > acc["size"]:
+        _compact(acc)
+
+
+def _accumulated(acc):
+    _compact(acc)
+    return acc["frames"][0] if acc["frames"] else None
+
+
+def drop_months(aggs, months):
+    """
+    Removes `months` from every month-keyed accumulator in `aggs`.
+    `debit_moments` spans all months and is left to the caller.
+    """
+    for acc in aggs.values():
+        if isinstance(acc, dict) and "monthyear" in acc["keys"]:
+            frame = _accumulated(acc)
+            if frame is not None:
+                acc["frames"] = [frame[~frame["monthyear"].isin(months)].reset_index(drop=True)]
+                acc["size"] = len(acc["frames"][0])
+
+
+def new_aggregates(recurring=True):
+    """
+    recurring: also track per-(merchant, month) counts and amounts. That
+    accumulator grows with the number of distinct merchants, so callers that
+    do not report recurring transactions can skip it.
+    """
+    aggs = {
+        "subcat": _accumulator(SUBCAT_KEYS, SUBCAT_AGGS),
+        "balance": _accumulator(["monthyear"], {"balance": "last"}),
+        "debit_moments": (0, 0.0, 0.0),
+    }
+    if recurring:
+        aggs["detail_months"] = _accumulator(
+            ["merchant", "monthyear"], {"DetailCount": "sum", "amount": "sum"}
+        )
+    return aggs
+
+
+# ==============================
+# FOLD
+# ==============================
+
+def combine_moments(moments, other):
+    """
+    Chan's parallel combination of two (count, mean, M2) triples.
+    """
+    n_b, mean_b, m2_b = other
+    if not n_b:
+        return moments
+    n_a, mean_a, m2_a = moments
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    return (
+        n,
+        mean_a + delta * n_b / n,
+        m2_a + m2_b + delta ** 2 * n_a * n_b / n,
+    )
+
+
+def _merge_moments(moments, values):
+    """
+    Chan's parallel update of (count, mean, M2) with a new batch of values.
+    """
+    if not len(values):
+        return moments
+    mean = values.mean()
+    return combine_moments(moments, (len(values), mean, ((values - mean) ** 2).sum()))
+
+
+def fold_frame(aggs, df):
+    """
+    Folds a normalised statement frame (or chunk) into `aggs`.
+    The frame is not modified.
+    """
+    # Expense volatility is the std of the raw debit column (blanks skipped)
+    aggs["debit_moments"] = _merge_moments(aggs["debit_moments"], df["debit"].dropna())
+
+    credit = df["credit"].fillna(0)
+    debit = df["debit"].fillna(0)
+    rows = pd.DataFrame({
+        "monthyear": df["monthyear"],
+        "month": df["month"],
+        "category": df["category"],
+        "subcategory": df["subcategory"],
+        "subcat_count": df["transaction detail"].notna().astype("int64"),
+        "subcat_amount": (credit - debit).abs(),
+        "subcat_inflow": credit,
+        "subcat_outflow": debit,
+        "positive_credit": credit.where(credit > 0, 0),
+        "expense_debit": debit.where(debit > 0, 0),
+        "expense_count": (debit > 0).astype("int64"),
+    })
+    rows["max_abs_amount"] = rows["subcat_amount"]
+
+    grouped = rows.groupby(SUBCAT_KEYS, as_index=False, sort=False)
+    _accumulate(aggs["subcat"], grouped.agg(SUBCAT_AGGS))
+
+    # Closing balance: the last row of each month
+    last_rows = ~df["monthyear"].duplicated(keep="last")
+    _accumulate(
+        aggs["balance"],
+        pd.DataFrame({
+            "monthyear": df["monthyear"][last_rows],
+            "balance": df["balance"].fillna(0)[last_rows],
+        }),
+    )
+
+    # Recurring detection only needs how often (and how much) each merchant
+    # is paid per month
+    if "detail_months" in aggs:
+        _accumulate(
+            aggs["detail_months"],
+            pd.DataFrame({
+                "merchant": merchant_keys(df["transaction detail"]),
+                "monthyear": df["monthyear"],
+                "DetailCount": 1,
+                "amount": rows["subcat_amount"],
+            }).groupby(["merchant", "monthyear"], as_index=False, sort=False)
+              .agg({"DetailCount": "sum", "amount": "sum"}),
+        )
+
+
+# ==============================
+# FINISH
+# ==============================
+
+def finish_aggregates(aggs, recurring=True) -> dict:
+    """
+    Rolls the accumulators up into the frames the analysis reports on.
+    `detail_months` is only materialised when tracked and `recurring` is set.
+    """
+    subcat = _accumulated(aggs["subcat"])
+    if subcat is None:
+        raise ValueError("CSV contains no transactions")
+
+    subcat = subcat.sort_values(["monthyear", "category", "subcategory"]).reset_index(drop=True)
+
+    monthly = (
+        subcat.groupby(["monthyear", "month"], as_index=False, sort=True)
+              .agg(
+                  cat_count=("subcat_count", "sum"),
+                  cat_amount=("subcat_amount", "sum"),
+                  cat_inflow=("subcat_inflow", "sum"),
+                  cat_outflow=("subcat_outflow", "sum"),
+              )
+              .merge(_accumulated(aggs["balance"]), on="monthyear", how="left")
+    )
+
+    expense_rows = subcat[subcat["expense_count"] > 0]
+    expense_categories = (
+        expense_rows.groupby(["month", "category"], as_index=False, sort=True)
+                    .agg(amount=("expense_debit", "sum"))
+    )
+
+    salary_by_month = (
+        subcat[subcat["subcategory"].str.contains("salary", na=False)]
+        .groupby("month", sort=True)["subcat_inflow"]
+        .sum()
+        .rename("credit")
+    )
+
+    salary_by_monthyear = (
+        subcat[(subcat["category"] == "income") & (subcat["subcategory"] == "salary")]
+        .groupby("monthyear", sort=True)["subcat_inflow"]
+        .sum()
+        .rename("credit")
+    )
+
+    income_rows = subcat["subcategory"].str.contains("salary|income", na=False)
+
+    n, _, m2 = aggs["debit_moments"]
+
+    return {
+        "monthly": monthly,
+        "subcat": subcat,
+        "expense_categories": expense_categories,
+        "salary_by_month": salary_by_month,
+        "salary_by_monthyear": salary_by_monthyear,
+        "detail_months": (
+            _accumulated(aggs["detail_months"])
+            if recurring and "detail_months" in aggs else None
+        ),
+        "debit_std": np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+        "monthly_income": subcat.loc[income_rows, "positive_credit"].sum(),
+        "monthly_expenses": subcat["expense_debit"].sum(),
+    }
+
+
+def aggregate_frame(df, recurring=True) -> dict:
+    """
+    One-shot aggregation of a whole normalised statement frame.
+    """
+    aggs = new_aggregates(recurring=recurring)
+    fold_frame(aggs, df)
+    return finish_aggregates(aggs, recurring=recurring)
+
+
+# ==============================
+# DERIVED TABLES
+# ==============================
+
+def largest_txn_ratios(subcat):
+    """
+    Share of each (month, category, subcategory) total taken by its single
+    largest transaction.
+    """
+    large_txn_df = subcat[["monthyear", "category", "subcategory"]].copy()
+    large_txn_df["LargestTxnRatio"] = (
+        subcat["max_abs_amount"] / subcat["subcat_amount"].replace(0, np.nan)
+    ).fillna(0)
+    large_txn_df["HasLargeSingleTxn"] = large_txn_df["LargestTxnRatio"] >= 0.5
+    return large_txn_df
+
+
+def recurring_counts(detail_month_counts):
+    """
+    detail_month_counts: one row per ('merchant', 'monthyear') with the
+    number of rows in `DetailCount`. Keeps merchants seen in more than two
+    distinct months, other than the "unknown" catch-all, and adds the
+    month-on-month % change.
+    """
+    detail_month_counts = detail_month_counts[detail_month_counts['merchant'] != UNKNOWN_MERCHANT]
+    distinct_months = detail_month_counts.groupby('merchant')['monthyear'].transform('nunique')
+    monthly_recurring_counts = (
+        detail_month_counts[distinct_months > 2]
+        .sort_values(['merchant', 'monthyear'])
+        .reset_index(drop=True)
+    )
+
+    monthly_recurring_counts['PrevDetailCount'] = (
+        monthly_recurring_counts.groupby('merchant')['DetailCount'].shift(1)
+    )
+
+    monthly_recurring_counts['PctChange'] = (
+        (monthly_recurring_counts['DetailCount'] - monthly_recurring_counts['PrevDetailCount'])
+        / monthly_recurring_counts['PrevDetailCount'].replace(0, np.nan)
+    ) * 100
+
+    return monthly_recurring_counts
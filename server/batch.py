@@ -0,0 +1,126 @@
+# server/batch.py
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from event_detection import (
+    api_analysis,
+    generate_sip_recommendation,
+    life_event_summary,
+    local_life_event,
+    narrate_analysis,
+)
+from statement_cache import parse_statement_cached
+from tax_snapshot import tax_snapshot_from_statement
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# Multi-statement batch analysis
+# =============================================================================
+# The pandas work for one statement is CPU bound and holds the GIL, so a
+# batch of statements is spread over a process pool instead of being run one
+# after another in the request's worker. Workers are started with "spawn", so
+# they share nothing with the server's threads. A spawned worker imports this
+# module and re-imports the script that started the server (main.py under
+# `python main.py`) as __mp_main__, so main.py keeps its top level light:
+# no model loading at import, and uvicorn only starts under __main__.
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "0")) or os.cpu_count() or 1
+
+# Per-request caps, so one request cannot queue unbounded work on the pool
+MAX_BATCH_FILES = int(os.getenv("BATCH_MAX_FILES", "20"))
+MAX_BATCH_BYTES = int(os.getenv("BATCH_MAX_BYTES", str(50 * 1024 * 1024)))
+
+_pool = None
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=BATCH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# ==============================
+# WORKER
+# ==============================
+
+def analyze_statement_bytes(filename: str, data: bytes, risk: int = 50, narrative: bool = False) -> dict:
+    """
+    Full per-statement pipeline, run inside a pool worker. Never raises:
+    failures are reported in the result so one bad file does not sink the
+    rest of the batch.
+
+    Every result's analysis has monthly_summary, life_event and
+    sip_recommendation, with the life event from the local scorer
+    (life_events.py). narrative: also run the LLM stages and add ai_report
+    and sip_analysis; life_event and sip_recommendation then come from the
+    narrated pipeline, which may ask the LLM about an ambiguous event.
+    """
+    try:
+        statement = parse_statement_cached(io.BytesIO(data))
+
+        numbers = api_analysis(statement=statement)
+        life_event = life_event_summary(local_life_event(numbers["life_event_scores"]))
+        analysis = {
+            "monthly_summary": numbers["monthly_summary"],
+            "life_event": life_event,
+            "sip_recommendation": generate_sip_recommendation(
+                numbers["monthly_income"],
+                numbers["monthly_expenses"],
+                life_event["event"],
+                risk
+            ),
+        }
+        if narrative:
+            analysis.update(narrate_analysis(numbers, risk=risk))
+
+        return {
+            "filename": filename,
+            "status": "ok",
+            "analysis": analysis,
+            "tax_snapshot": tax_snapshot_from_statement(statement),
+        }
+    except Exception as e:
+        return {"filename": filename, "status": "error", "error": str(e)}
+
+
+# ==============================
+# FAN-OUT
+# ==============================
+
+async def analyze_batch(uploads, risk: int = 50, narrative: bool = False) -> list:
+    """
+    uploads: list of (filename, bytes). Returns one result per upload, in
+    the same order.
+    """
+    loop = asyncio.get_running_loop()
+    pool = get_pool()
+    futures = [
+        loop.run_in_executor(pool, analyze_statement_bytes, filename, data, risk, narrative)
+        for filename, data in uploads
+    ]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+
+    # Worker crashes (e.g. killed for memory) surface here rather than in
+    # analyze_statement_bytes
+    for i, result in enumerate(results):
+        if isinstance(result, BaseException):
+            logger.error(f"Batch worker failed on {uploads[i][0]}: {result}")
+            results[i] = {"filename": uploads[i][0], "status": "error", "error": str(result)}
+    return results
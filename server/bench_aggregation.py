@@ -0,0 +1,124 @@
+"""
+Benchmark: legacy per-group lambda aggregation vs the vectorised engine.
+
+Builds a synthetic statement with many (month, category, subcategory)
+groups, runs the original lambda/apply based steps of analyze_transactions
+and the aggregation.py engine on it, checks that both agree and prints the
+timings.
+
+Run: python bench_aggregation.py [rows] [months] [categories] [subcategories]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregation import aggregate_frame, largest_txn_ratios, recurring_counts
+from event_detection import _category_breakdown
+
+
+def make_statement(rows, months, categories, subcategories, seed=7):
+    rng = np.random.default_rng(seed)
+    month_index = rng.integers(0, months, rows)
+    dates = pd.Timestamp("2020-01-01") + pd.to_timedelta(month_index * 31 + rng.integers(0, 28, rows), unit="D")
+    is_credit = rng.random(rows) < 0.2
+    amount = rng.integers(10, 100000, rows).astype(float)
+
+    df = pd.DataFrame({
+        "date": dates,
+        "transaction detail": [f"merchant {i}" for i in rng.integers(0, rows // 20 + 1, rows)],
+        "credit": np.where(is_credit, amount, np.nan),
+        "debit": np.where(is_credit, np.nan, amount),
+        "balance": rng.integers(0, 10**6, rows).astype(float),
+        "category": [f"cat{i}" for i in rng.integers(0, categories, rows)],
+        "subcategory": [f"sub{i}" for i in rng.integers(0, subcategories, rows)],
+    }).sort_values("date", kind="stable").reset_index(drop=True)
+    df["monthyear"] = df["date"].dt.to_period("M")
+    df["month"] = df["monthyear"].astype(str)
+    return df
+
+
+def legacy_aggregation(df):
+    """The per-group lambda/apply steps as they were in analyze_transactions."""
+    category_breakdown = (
+        df[df["debit"] > 0]
+        .groupby(["month", "category"])
+        .agg(amount=("debit", "sum"))
+        .reset_index()
+        .groupby("month")
+        .apply(lambda x: x.sort_values("amount", ascending=False)
+               .to_dict(orient="records"))
+        .to_dict()
+    )
+
+    df = df.assign(credit=df["credit"].fillna(0), debit=df["debit"].fillna(0))
+    df = df.assign(inflow=df["credit"], outflow=df["debit"], amount=df["credit"] - df["debit"])
+
+    monthly_agg = (
+        df.groupby('monthyear', as_index=False)
+          .agg({
+               'balance': 'last',
+               'transaction detail': 'count',
+               'amount': lambda x: x.abs().sum(),
+               'inflow': 'sum',
+               'outflow': 'sum'
+          })
+    )
+
+    cat_subcat_agg = (
+        df.groupby(['monthyear', 'category', 'subcategory'], as_index=False)
+          .agg({
+              'transaction detail': 'count',
+              'amount': lambda x: x.abs().sum(),
+              'inflow': 'sum',
+              'outflow': 'sum'
+          })
+    )
+
+    def largest_txn_ratio(group):
+        total_sum = group['amount'].abs().sum()
+        max_txn = group['amount'].abs().max()
+        return max_txn / total_sum if total_sum != 0 else 0
+
+    large_txn_df = (
+        df.groupby(['monthyear', 'category', 'subcategory'])
+          .apply(lambda x: pd.Series({'LargestTxnRatio': largest_txn_ratio(x)}))
+          .reset_index()
+    )
+
+    return monthly_agg, cat_subcat_agg, large_txn_df, category_breakdown
+
+
+def engine_aggregation(df):
+    aggs = aggregate_frame(df)
+    recurring_counts(aggs["detail_months"])
+    return aggs, largest_txn_ratios(aggs["subcat"]), _category_breakdown(aggs["expense_categories"])
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rows, months, categories, subcategories = (
+        [int(a) for a in sys.argv[1:5]] + [500_000, 60, 20, 30][len(sys.argv[1:5]):]
+    )
+    df = make_statement(rows, months, categories, subcategories)
+    print(f"{rows} rows, {months} months, {categories}x{subcategories} category/subcategory pairs")
+
+    (monthly_agg, cat_subcat_agg, large_txn_df, breakdown), legacy_s = timed(legacy_aggregation, df)
+    (aggs, engine_large, engine_breakdown), engine_s = timed(engine_aggregation, df)
+
+    # Same numbers from both paths
+    np.testing.assert_allclose(monthly_agg["amount"], aggs["monthly"]["cat_amount"])
+    np.testing.assert_allclose(cat_subcat_agg["amount"], aggs["subcat"]["subcat_amount"])
+    np.testing.assert_allclose(large_txn_df["LargestTxnRatio"], engine_large["LargestTxnRatio"])
+    assert breakdown.keys() == engine_breakdown.keys()
+
+    print(f"legacy lambdas : {legacy_s * 1000:8.1f} ms")
+    print(f"vectorised     : {engine_s * 1000:8.1f} ms")
+    print(f"speedup        : {legacy_s / engine_s:8.1f}x")
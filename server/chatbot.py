@@ -1,10 +1,15 @@
-import requests
-import os
-
-SARVAM_API_KEY = os.getenv("SARVAM_API_KEY")  # or paste directly for hackathon
-SARVAM_URL = "https://api.sarvam.ai/v1/chat/completions"
-
-def report_chat_with_sarvam(report: str, question: str) -> str:
+from report_answers import answer_locally
+from report_index import report_context
+from sarvam_client import chat_completion, chat_completion_stream_async
+
+def _report_chat_request(report, question: str, history: list = None, summary: str = "") -> dict:
+    history = history or []
+
+    # Long reports are cut down to the chunks relevant to the question (and
+    # to the previous question, so follow-ups like "and in April?" still
+    # find their context)
+    previous = [m["content"] for m in history if m["role"] == "user"][-1:]
+    report = report_context(report, " ".join([*previous, question]))
     system_prompt = f"""
 You are a Financial Report Assistant.
 
@@ -16,21 +21,40 @@ REPORT:
 {report}
 """
 
-    payload = {
+    messages = [{"role": "system", "content": system_prompt}]
+    if summary:
+        messages.append({"role": "system", "content": f"Earlier in this conversation:\n{summary}"})
+
+    return {
         "model": "sarvam-m",   # ✅ VALID MODEL
-        "messages": [
-            {"role": "system", "content": system_prompt},
+        "messages": messages + history + [
             {"role": "user", "content": question}
         ],
         "temperature": 0
     }
 
-    headers = {
-        "Authorization": f"Bearer {SARVAM_API_KEY}",
-        "Content-Type": "application/json"
-    }
 
-    response = requests.post(SARVAM_URL, json=payload, headers=headers)
-    response.raise_for_status()
+def report_chat_with_sarvam(report, question: str, history: list = None, summary: str = "") -> str:
+    return chat_completion(_report_chat_request(report, question, history, summary))
+
+
+async def stream_report_chat(report, question: str, history: list = None, summary: str = ""):
+    """
+    report_chat_with_sarvam, yielding the answer in pieces as Sarvam
+    generates it. Closing the generator closes the upstream request.
+    """
+    async for piece in chat_completion_stream_async(
+        _report_chat_request(report, question, history, summary)
+    ):
+        yield piece
+
 
-    return response.json()["choices"][0]["message"]["content"]
\ No newline at end of file
+def answer_report_question(report, question: str, history: list = None, summary: str = ""):
+    """
+    (answer, source): factual lookups are answered from the report's
+    structured fields ("local"), everything else by Sarvam ("llm").
+    """
+    answer = answer_locally(report, question)
+    if answer is not None:
+        return answer, "local"
+    return report_chat_with_sarvam(report, question, history, summary), "llm"
@@ -0,0 +1,87 @@
+"""
+Shared pytest fixtures for the server tests: small synthetic statements in
+the plain Date/Transaction Detail/Credit/Debit/Balance layout, parsed the
+same way an upload is (statement.parse_statement).
+"""
+
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from statement import parse_statement
+
+COLUMNS = ["Date", "Transaction Detail", "Credit", "Debit", "Balance", "Category", "Subcategory"]
+
+
+def statement_frame(months=24, seed=0, events=(), extra=(), hike=0.35) -> pd.DataFrame:
+    """
+    A salaried household's statement from Jan 2022: salary, rent, food,
+    shopping, insurance and UPI spend every month. `events` injects life
+    events ("job": salary up by `hike` from month 12, "wedding", "baby",
+    "home") or a one-off "bonus" salary credit in month 14; `extra` is a
+    list of (detail, debit, category, subcategory) rows added to every month.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    def add(day, detail, credit, debit, category, subcategory):
+        rows.append((month.start_time + pd.Timedelta(days=day), detail, credit, debit, category, subcategory))
+
+    for i, month in enumerate(pd.period_range("2022-01", periods=months, freq="M")):
+        ref = lambda: str(rng.integers(10 ** 11, 10 ** 12))
+        salary = 100000 * (1 + hike if "job" in events and i >= 12 else 1)
+        add(0, f"NEFT/ACME CORP SALARY/{ref()}", salary, np.nan, "Income", "Salary")
+        add(2, f"IMPS/{ref()}/LANDLORD RENT", np.nan, 25000, "Expense", "Rent")
+        for k in range(8):
+            add(3 + k, f"UPI/{ref()}/SWIGGY/paytm", np.nan, round(rng.normal(1500, 300), 2), "Expense", "Food")
+        for k in range(4):
+            add(5 + k, f"POS AMAZON {ref()}", np.nan, round(rng.normal(2000, 600), 2), "Expense", "Shopping")
+        add(12, "LIC PREMIUM", np.nan, 2000, "Expense", "Insurance")
+        for k in range(10):
+            add(16 + k, f"UPI/{ref()}/RAJ KIRANA/okaxis", np.nan, round(rng.normal(800, 300), 2), "Expense", "UPI")
+        for detail, debit, category, subcategory in extra:
+            add(26, detail, np.nan, debit, category, subcategory)
+
+        if "bonus" in events and i == 14:
+            add(1, "NEFT/ACME CORP BONUS", 50000, np.nan, "Income", "Salary")
+        if "wedding" in events and i == 14:
+            add(20, "TANISHQ JEWELLERS", np.nan, 350000, "Expense", "Shopping")
+            add(21, "SHREE CATERERS", np.nan, 90000, "Expense", "Food")
+        if "baby" in events and i == 10:
+            add(20, "CLOUDNINE HOSPITAL", np.nan, 160000, "Expense", "Hospital")
+            add(22, "STAR HEALTH INSURANCE", np.nan, 25000, "Expense", "Insurance")
+        if "home" in events and i >= 14:
+            add(5, "HDFC HOME LOAN EMI", np.nan, 42000, "Expense", "EMI")
+            if i == 14:
+                add(6, "DOWN PAYMENT BUILDER", np.nan, 900000, "Expense", "UPI")
+
+    frame = pd.DataFrame(rows, columns=["Date", "Transaction Detail", "Credit", "Debit", "Category", "Subcategory"])
+    frame = frame.sort_values("Date", kind="stable").reset_index(drop=True)
+    frame["Balance"] = 500000 + (frame["Credit"].fillna(0) - frame["Debit"].fillna(0)).cumsum()
+    frame["Date"] = frame["Date"].dt.strftime("%Y-%m-%d")
+    return frame[COLUMNS]
+
+
+@pytest.fixture
+def make_statement():
+    """
+    Builds a ParsedStatement from statement_frame() arguments.
+    """
+    def make(**kwargs):
+        csv = statement_frame(**kwargs).to_csv(index=False)
+        return parse_statement(io.StringIO(csv))
+    return make
+
+
+@pytest.fixture
+def statement_csv(tmp_path):
+    """
+    Writes statement_frame() to a CSV file and returns its path.
+    """
+    def write(**kwargs):
+        path = tmp_path / f"statement_{len(list(tmp_path.iterdir()))}.csv"
+        statement_frame(**kwargs).to_csv(path, index=False)
+        return str(path)
+    return write
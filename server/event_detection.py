@@ -6,6 +6,22 @@ from tabulate import tabulate  # For pretty printing tables
 import json
 import os
 from fastapi import APIRouter
+from statement import ParsedStatement, normalize_frame, parse_statement
+from statement_schema import read_statement_csv
+from aggregation import (
+    aggregate_frame,
+    finish_aggregates,
+    fold_frame,
+    largest_txn_ratios,
+    new_aggregates,
+    recurring_counts,
+)
+from incremental import store as incremental_store
+from life_events import WINDOW_MONTHS, event_matrix, life_event_timeline, score_life_events
+from merchant_keys import recurring_merchants
+from report_index import report_context
+from sarvam_client import chat_completion, chat_completion_async, is_configured
+import asyncio
 import re   # REQUIRED before safe_json_from_ai
 def safe_json_from_ai(raw: str, fallback: dict):
     """
@@ -43,27 +59,17 @@ EVENT_TAXONOMY = {
 
 import re
 import json
-import requests
 import os
 
-def detect_life_event_with_sarvam(analysis_data: str):
-    api_key = os.getenv("SARVAM_API_KEY")
+LIFE_EVENT_UNAVAILABLE = {
+    "primaryEvent": "none",
+    "detectedSignal": "none",
+    "reasoning": "Life event detection unavailable (AI key not configured)"
+}
 
-    # SAFE FALLBACK — DO NOT CRASH
-    if not api_key:
-        return {
-            "primaryEvent": "none",
-            "detectedSignal": "none",
-            "reasoning": "Life event detection unavailable (AI key not configured)"
-        }
-    url = "https://api.sarvam.ai/v1/chat/completions"
 
-    headers = {
-        "api-subscription-key": api_key,
-        "Content-Type": "application/json"
-    }
-
-    payload = {
+def _life_event_request(analysis_data: str) -> dict:
+    return {
         "model": "sarvam-m",
         "messages": [
             {
@@ -97,12 +103,8 @@ DATA:
         "max_tokens": 300
     }
 
-    response = requests.post(url, headers=headers, json=payload, timeout=30)
-    response.raise_for_status()
-
-    data = response.json()
-    text = data["choices"][0]["message"]["content"]
 
+def _life_event_result(text: str) -> dict:
     # 🔥 Extract JSON from text safely
     match = re.search(r"\{.*\}", text, re.DOTALL)
     if not match:
@@ -127,9 +129,75 @@ DATA:
 }
 
 
+def detect_life_event_with_sarvam(analysis_data: str):
+    api_key = os.getenv("SARVAM_API_KEY")
+
+    # SAFE FALLBACK — DO NOT CRASH
+    if not api_key:
+        return dict(LIFE_EVENT_UNAVAILABLE)
+
+    return _life_event_result(chat_completion(_life_event_request(analysis_data), timeout=30))
+
+
+async def detect_life_event_async(analysis_data: str):
+    if not os.getenv("SARVAM_API_KEY"):
+        return dict(LIFE_EVENT_UNAVAILABLE)
+    return _life_event_result(
+        await chat_completion_async(_life_event_request(analysis_data), timeout=30)
+    )
+
+
+# ---- LOCAL FIRST ----
+# The life_event_scores section (life_events.py) decides on its own unless
+# its top two events are too close to call; only then is the LLM asked.
+
+def local_life_event(scores: dict) -> dict:
+    """
+    The life_event_scores section as a detected-event result, no LLM.
+    """
+    return {
+        "primaryEvent": scores["event"],
+        "detectedSignal": scores["event"],
+        "reasoning": scores["reasoning"],
+        "confidence": scores["confidence"],
+        "scores": scores["scores"],
+        "source": "local",
+    }
+
+
+def _needs_llm(scores) -> bool:
+    if scores is None:
+        return True
+    return scores["ambiguous"] and is_configured()
+
+
+def _llm_life_event(result: dict, scores) -> dict:
+    result = {**result, "source": "llm"}
+    if scores is not None:
+        result["scores"] = scores["scores"]
+    return result
+
+
+def resolve_life_event(analysis_payload: dict) -> dict:
+    """
+    Life event for an api_analysis payload: the local scorer's answer, or
+    the LLM's when the scorer is ambiguous (or was not computed).
+    """
+    scores = analysis_payload.get("life_event_scores")
+    if not _needs_llm(scores):
+        return local_life_event(scores)
+    return _llm_life_event(detect_life_event_with_sarvam(analysis_payload["analysis_text"]), scores)
+
+
+async def resolve_life_event_async(analysis_payload: dict) -> dict:
+    scores = analysis_payload.get("life_event_scores")
+    if not _needs_llm(scores):
+        return local_life_event(scores)
+    return _llm_life_event(await detect_life_event_async(analysis_payload["analysis_text"]), scores)
+
+
 
 import re
-import requests
 
 
 
@@ -246,272 +314,139 @@ Recommended SIP: {sip_amount}
         "max_tokens": 150
     }
 
-    r = requests.post(
-        "https://api.sarvam.ai/v1/chat/completions",
-        headers={
-            "api-subscription-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json=payload,
-        timeout=30
-    )
-
-    return r.json()["choices"][0]["message"]["content"].strip()
-
-
+    return chat_completion(payload, timeout=30).strip()
 
 
 
 
-def analyze_transactions(csv_path, top_n=5):
-    # Always use uploads/data.csv
-    output = []
 
-    try:
-        # 1. Read CSV data
-        df = pd.read_csv(csv_path)
-        # Normalize text columns (VERY IMPORTANT)
-        df["category"] = df["category"].astype(str).str.lower().str.strip()
-        df["subcategory"] = df["subcategory"].astype(str).str.lower().str.strip()
-        
-        # Normalize column names (strip spaces, lowercase)
-        df.columns = [c.strip().lower() for c in df.columns]
-
-        # Validate required columns
-        required_columns = {
-            "date", "credit", "debit", "balance", 
-            "transaction detail", "category", "subcategory"
-        }
 
-        missing = required_columns - set(df.columns)
-        if missing:
-            raise ValueError(
-                f"CSV missing required columns: {missing}. "
-                f"Found columns: {list(df.columns)}"
-            )
+# =============================================================================
+# Transaction analysis
+# =============================================================================
+# The numbers come from the vectorised engine in aggregation.py; the helpers
+# below turn its aggregate frames into the payload returned by
+# analyze_transactions. Whole-file and streaming reads share both layers, so
+# their output is identical.
 
-        # 2. Parse Date and create monthyear
-        df['date'] = pd.to_datetime(df['date'])
-        df['monthyear'] = df['date'].dt.to_period('M')
-        df['month'] = df['monthyear'].astype(str)
-        
-        monthly_summary = (
-            df.groupby("month")
-      .agg(
-          income=("credit", "sum"),
-          expenses=("debit", "sum")
-      )
-      .reset_index()
-)
-        if len(monthly_summary) < 3:
-             summary_confidence = "low"
-        else:
-             summary_confidence = "high"
-        
-
-        monthly_summary["savings"] = (
-        monthly_summary["income"] - monthly_summary["expenses"]
-)
-        monthly_summary = monthly_summary[
-           (monthly_summary["income"] > 0) &
-            (monthly_summary["expenses"] >= 0)
-]
-
-        # -------- FORMAT MONTHLY SUMMARY FOR AI (CRITICAL FIX) --------
-        formatted_monthly_summary = []
-
-        for row in monthly_summary.to_dict(orient="records"):
-            formatted_monthly_summary.append({
-        "month": row["month"],  # keep YYYY-MM (AI can reason on it)
-        "income": round(float(row["income"]), 2),
-        "expenses": round(float(row["expenses"]), 2),
-        "savings": round(float(row["savings"]), 2),
-        "observation": (
-            "Income exceeded expenses"
-            if row["savings"] > 0
-            else "Expenses exceeded income"
-        )
-    })
-
-
-        category_breakdown = (
-        df[df["debit"] > 0]
-    .groupby(["month", "category"])
-    .agg(amount=("debit", "sum"))
-    .reset_index()
-)
-
-        category_breakdown = (
-        category_breakdown
-    .groupby("month")
-    .apply(lambda x: x.sort_values("amount", ascending=False)
-           .to_dict(orient="records"))
-    .to_dict()
-)
-        
-        salary_by_month = (
-    df[df["subcategory"].str.contains("salary", na=False)]
-    .groupby("month")["credit"]
-    .sum()
-)
-        salary_change_pct = None
-        if len(salary_by_month) >= 2:
-                last, prev = salary_by_month.iloc[-1], salary_by_month.iloc[-2]
-                salary_change_pct = round(((last - prev) / prev) * 100, 1)
-
-        behaviour_metrics = {
-                "salary_change_pct": salary_change_pct,
-                "income_stability": "high" if salary_change_pct and salary_change_pct > 10 else "stable",
-                "expense_volatility": "high" if df["debit"].std() > 10000 else "medium"
+REQUIRED_COLUMNS = {
+    "date", "credit", "debit", "balance",
+    "transaction detail", "category", "subcategory"
 }
-        avg_savings = (
-    sum(m["savings"] for m in formatted_monthly_summary)
-    / len(formatted_monthly_summary)
-    if formatted_monthly_summary
-    else 0
-)
 
-        sip_capacity = {
-                "safe_monthly_sip": int(avg_savings * 0.6),
-                "max_possible_sip": int(avg_savings * 0.8)
-}
+STREAM_CHUNKSIZE = 100_000
 
 
+def _format_monthly_summary(monthly_summary):
+    """
+    Adds savings, drops empty months and formats the rows for the AI stages.
+    Returns (formatted_monthly_summary, summary_confidence).
+    """
+    if len(monthly_summary) < 3:
+        summary_confidence = "low"
+    else:
+        summary_confidence = "high"
 
+    monthly_summary["savings"] = (
+        monthly_summary["income"] - monthly_summary["expenses"]
+    )
+    monthly_summary = monthly_summary[
+        (monthly_summary["income"] > 0) &
+        (monthly_summary["expenses"] >= 0)
+    ]
+
+    # -------- FORMAT MONTHLY SUMMARY FOR AI (CRITICAL FIX) --------
+    formatted_monthly_summary = []
+
+    for row in monthly_summary.to_dict(orient="records"):
+        formatted_monthly_summary.append({
+            "month": row["month"],  # keep YYYY-MM (AI can reason on it)
+            "income": round(float(row["income"]), 2),
+            "expenses": round(float(row["expenses"]), 2),
+            "savings": round(float(row["savings"]), 2),
+            "observation": (
+                "Income exceeded expenses"
+                if row["savings"] > 0
+                else "Expenses exceeded income"
+            )
+        })
 
-        # 3. Ensure numeric columns
-        df['credit'] = pd.to_numeric(df['credit'], errors='coerce').fillna(0)
-        df['debit'] = pd.to_numeric(df['debit'], errors='coerce').fillna(0)
+    return formatted_monthly_summary, summary_confidence
 
-        # ---- MONTHLY INCOME & EXPENSE CALCULATION (FOR SIP) ----
-        # Robust income & expense detection (bank-agnostic)
-        income_mask = (
-    (df["credit"] > 0) &
-    (df["subcategory"].str.contains("salary|income", na=False))
-)
 
-        expense_mask = df["debit"] > 0
+def _category_breakdown(category_totals):
+    """
+    category_totals: one row per (month, category) with the debit `amount`.
+    Returns {month: [{category, amount}, ...]} sorted by amount, largest first.
+    """
+    ordered = category_totals.sort_values(["month", "amount"], ascending=[True, False])
+    breakdown = {}
+    for month, category, amount in zip(
+        ordered["month"].tolist(), ordered["category"].tolist(), ordered["amount"].tolist()
+    ):
+        breakdown.setdefault(month, []).append({"category": category, "amount": amount})
+    return breakdown
 
-        monthly_income = df[income_mask]["credit"].sum()
-        monthly_expenses = df[expense_mask]["debit"].sum()
 
-        df['balance'] = pd.to_numeric(df['balance'], errors='coerce').fillna(0)
+def _behaviour_metrics(salary_by_month, debit_std):
+    salary_change_pct = None
+    if len(salary_by_month) >= 2:
+        last, prev = salary_by_month.iloc[-1], salary_by_month.iloc[-2]
+        salary_change_pct = round(((last - prev) / prev) * 100, 1)
 
-        # ---- MONTHLY SALARY CALCULATION (Now correctly indented) ----
-        salary_by_month = (
-          df[
-               (df["category"].str.lower() == "income") &
-               (df["subcategory"].str.lower() == "salary")
-        ]
-          .groupby("monthyear")["credit"]
-          .sum()
-          .sort_index()
-)
+    return {
+        "salary_change_pct": salary_change_pct,
+        "income_stability": "high" if salary_change_pct and salary_change_pct > 10 else "stable",
+        "expense_volatility": "high" if debit_std > 10000 else "medium"
+    }
 
 
-        salary_change_pct = None
-        if len(salary_by_month) >= 2:
-            last = salary_by_month.iloc[-1]
-            prev = salary_by_month.iloc[-2]
-            if prev > 0:
-                salary_change_pct = ((last - prev) / prev) * 100
-
-        # 4. Create helper columns
-        df['inflow'] = df['credit']
-        df['outflow'] = df['debit']
-        df['amount'] = df['credit'] - df['debit']
-
-        # A) MONTHLY AGGREGATES
-        monthly_agg = (
-            df.groupby('monthyear', as_index=False)
-              .agg({
-                   'balance': 'last',
-                   'transaction detail': 'count',
-                   'amount': lambda x: x.abs().sum(),
-                   'inflow': 'sum',
-                   'outflow': 'sum'
-              })
-              .rename(columns={
-                   'transaction detail': 'cat_count',
-                   'amount': 'cat_amount',
-                   'inflow': 'cat_inflow',
-                   'outflow': 'cat_outflow'
-              })
-        )
+def _sip_capacity(formatted_monthly_summary):
+    avg_savings = (
+        sum(m["savings"] for m in formatted_monthly_summary)
+        / len(formatted_monthly_summary)
+        if formatted_monthly_summary
+        else 0
+    )
 
-        # B) MONTHLY CATEGORY/SUBCATEGORY AGGREGATES
-        cat_subcat_agg = (
-            df.groupby(['monthyear', 'category', 'subcategory'], as_index=False)
-              .agg({
-                  'transaction detail': 'count',
-                  'amount': lambda x: x.abs().sum(),
-                  'inflow': 'sum',
-                  'outflow': 'sum'
-              })
-              .rename(columns={
-                  'transaction detail': 'subcat_count',
-                  'amount': 'subcat_amount',
-                  'inflow': 'subcat_inflow',
-                  'outflow': 'subcat_outflow'
-              })
-        )
+    return {
+        "safe_monthly_sip": int(avg_savings * 0.6),
+        "max_possible_sip": int(avg_savings * 0.8)
+    }
 
-        # C) RECURRING TRANSACTIONS
-        detail_month_counts = (
-            df.groupby('transaction detail')['monthyear']
-              .nunique()
-              .reset_index(name='DistinctMonthCount')
-        )
-        recurring_details = detail_month_counts[detail_month_counts['DistinctMonthCount'] > 2]
-        recurring_set = set(recurring_details['transaction detail'])
-
-        # D) MONTHLY COUNTS & % CHANGE
-        recurring_df = df[df['transaction detail'].isin(recurring_set)]
-        monthly_recurring_counts = (
-            recurring_df.groupby(['transaction detail', 'monthyear'])
-                        .size()
-                        .reset_index(name='DetailCount')
-        ).sort_values(['transaction detail', 'monthyear'])
-
-        monthly_recurring_counts['PrevDetailCount'] = (
-            monthly_recurring_counts.groupby('transaction detail')['DetailCount'].shift(1)
-        )
 
-        monthly_recurring_counts['PctChange'] = (
-            (monthly_recurring_counts['DetailCount'] - monthly_recurring_counts['PrevDetailCount'])
-            / monthly_recurring_counts['PrevDetailCount'].replace(0, np.nan)
-        ) * 100
+def _salary_change_pct(salary_by_monthyear):
+    salary_change_pct = None
+    if len(salary_by_monthyear) >= 2:
+        last = salary_by_monthyear.iloc[-1]
+        prev = salary_by_monthyear.iloc[-2]
+        if prev > 0:
+            salary_change_pct = ((last - prev) / prev) * 100
+    return salary_change_pct
 
-        # E) LARGE SINGLE TRANSACTION CHECK
-        def largest_txn_ratio(group):
-            total_sum = group['amount'].abs().sum()
-            max_txn = group['amount'].abs().max()
-            return max_txn / total_sum if total_sum != 0 else 0
 
-        large_txn_df = (
-            df.groupby(['monthyear', 'category', 'subcategory'], as_index=False)
-              .apply(lambda x: pd.Series({'LargestTxnRatio': largest_txn_ratio(x)}))
-        )
-        large_txn_df['HasLargeSingleTxn'] = large_txn_df['LargestTxnRatio'] >= 0.5
+def _render_debug_report(monthly_agg, cat_subcat_agg, monthly_recurring_counts, large_txn_df, top_n):
+    output = []
+    output.append("=== MONTHLY AGGREGATES (Overall) [Top 5 Rows] ===")
+    output.append(tabulate(monthly_agg.head(top_n), headers='keys', tablefmt='psql', showindex=False))
 
-        # ============== BUILD REPORT STRING ==============
-        output.append("=== MONTHLY AGGREGATES (Overall) [Top 5 Rows] ===")
-        output.append(tabulate(monthly_agg.head(top_n), headers='keys', tablefmt='psql', showindex=False))
+    output.append("\n=== MONTHLY CATEGORY/SUBCATEGORY AGGREGATES [Top 5 Rows] ===")
+    output.append(tabulate(cat_subcat_agg.head(top_n), headers='keys', tablefmt='psql', showindex=False))
 
-        output.append("\n=== MONTHLY CATEGORY/SUBCATEGORY AGGREGATES [Top 5 Rows] ===")
-        output.append(tabulate(cat_subcat_agg.head(top_n), headers='keys', tablefmt='psql', showindex=False))
+    # Recurring summary
+    inc_changes = monthly_recurring_counts[monthly_recurring_counts['PctChange'] > 0].sort_values('PctChange', ascending=False).head(top_n)
+    dec_changes = monthly_recurring_counts[monthly_recurring_counts['PctChange'] < 0].sort_values('PctChange').head(top_n)
 
-        # Recurring summary
-        inc_changes = monthly_recurring_counts[monthly_recurring_counts['PctChange'] > 0].sort_values('PctChange', ascending=False).head(top_n)
-        dec_changes = monthly_recurring_counts[monthly_recurring_counts['PctChange'] < 0].sort_values('PctChange').head(top_n)
+    output.append("\n=== RECURRING TRANSACTIONS MONTH-TO-MONTH INCREASES ===")
+    output.append(tabulate(inc_changes, headers='keys', tablefmt='psql', showindex=False) if not inc_changes.empty else "No increases.")
 
-        output.append("\n=== RECURRING TRANSACTIONS MONTH-TO-MONTH INCREASES ===")
-        output.append(tabulate(inc_changes, headers='keys', tablefmt='psql', showindex=False) if not inc_changes.empty else "No increases.")
+    output.append("\n=== LARGE SINGLE TRANSACTIONS (≥50% of Group Total) ===")
+    output.append(tabulate(large_txn_df.head(top_n), headers='keys', tablefmt='psql', showindex=False))
+    return output
 
-        output.append("\n=== LARGE SINGLE TRANSACTIONS (≥50% of Group Total) ===")
-        output.append(tabulate(large_txn_df.head(top_n), headers='keys', tablefmt='psql', showindex=False))
 
-        analysis_text = f"""
+def _build_analysis_text(formatted_monthly_summary, behaviour_metrics, sip_capacity):
+    return f"""
          Monthly Summary:
            {json.dumps(formatted_monthly_summary, indent=2)}
 
@@ -523,44 +458,206 @@ def analyze_transactions(csv_path, top_n=5):
 """
 
 
+# ---- SECTION GRAPH ----
+# Each payload section (and each shared intermediate) is a node with the
+# nodes it is built from. Only the requested sections and their
+# dependencies are computed, each exactly once.
+
+def _monthly_rows(values):
+    monthly = values["aggregates"]["monthly"]
+    return _format_monthly_summary(
+        monthly[["month"]].assign(income=monthly["cat_inflow"], expenses=monthly["cat_outflow"])
+    )
+
+
+def _debug_report(values):
+    aggs = values["aggregates"]
+    monthly = aggs["monthly"]
+    subcat = aggs["subcat"]
+    return _render_debug_report(
+        monthly[["monthyear", "balance", "cat_count", "cat_amount", "cat_inflow", "cat_outflow"]],
+        subcat[["monthyear", "category", "subcategory", "subcat_count",
+                "subcat_amount", "subcat_inflow", "subcat_outflow"]],
+        recurring_counts(aggs["detail_months"]),
+        largest_txn_ratios(subcat),
+        values["top_n"]
+    )
 
-        return {
-    "monthly_summary": formatted_monthly_summary,
-    "category_breakdown": category_breakdown,
-    "behaviour_metrics": behaviour_metrics,
-    "sip_capacity": sip_capacity,
-    "analysis_text": analysis_text,
-    "monthly_income": monthly_income,
-    "monthly_expenses": monthly_expenses,
-    "salary_change_pct": salary_change_pct,
-    "summary_confidence": summary_confidence
 
+SECTION_GRAPH = {
+    "monthly_rows": (["aggregates"], _monthly_rows),
+    "monthly_summary": (["monthly_rows"], lambda v: v["monthly_rows"][0]),
+    "summary_confidence": (["monthly_rows"], lambda v: v["monthly_rows"][1]),
+    "category_breakdown": (
+        ["aggregates"],
+        lambda v: _category_breakdown(v["aggregates"]["expense_categories"])
+    ),
+    "behaviour_metrics": (
+        ["aggregates"],
+        lambda v: _behaviour_metrics(v["aggregates"]["salary_by_month"], v["aggregates"]["debit_std"])
+    ),
+    "sip_capacity": (["monthly_summary"], lambda v: _sip_capacity(v["monthly_summary"])),
+    "analysis_text": (
+        ["monthly_summary", "behaviour_metrics", "sip_capacity"],
+        lambda v: _build_analysis_text(v["monthly_summary"], v["behaviour_metrics"], v["sip_capacity"])
+    ),
+    "monthly_income": (["aggregates"], lambda v: v["aggregates"]["monthly_income"]),
+    "monthly_expenses": (["aggregates"], lambda v: v["aggregates"]["monthly_expenses"]),
+    "salary_change_pct": (
+        ["aggregates"],
+        lambda v: _salary_change_pct(v["aggregates"]["salary_by_monthyear"])
+    ),
+    "recurring_merchants": (
+        ["aggregates"],
+        lambda v: recurring_merchants(v["aggregates"]["detail_months"])
+    ),
+    # Month x spend-group matrix shared by the life-event scorer and timeline
+    "event_matrix": (["aggregates"], lambda v: event_matrix(v["aggregates"]["subcat"])),
+    "life_event_scores": (["event_matrix"], lambda v: score_life_events(v["event_matrix"])),
+    "life_event_timeline": (["event_matrix"], lambda v: life_event_timeline(v["event_matrix"])),
+    # Tabulated tables for eyeballing during development; never needed by the API
+    "debug_report": (["aggregates"], _debug_report),
 }
 
+ANALYSIS_SECTIONS = [
+    "monthly_summary",
+    "category_breakdown",
+    "behaviour_metrics",
+    "sip_capacity",
+    "analysis_text",
+    "monthly_income",
+    "monthly_expenses",
+    "salary_change_pct",
+    "summary_confidence",
+    "recurring_merchants",
+    "life_event_scores",
+    "life_event_timeline",
+]
 
+# Sections built from the per-(merchant, month) aggregates
+RECURRING_SECTIONS = {"recurring_merchants", "debug_report"}
 
 
+def _resolve_sections(sections, debug):
+    """
+    Validates the requested sections and returns (sections, needs_recurring).
+    Per-merchant aggregates are only built when a recurring section is asked for.
+    """
+    sections = list(ANALYSIS_SECTIONS if sections is None else sections)
+    unknown = set(sections) - set(ANALYSIS_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown analysis sections: {sorted(unknown)}")
+    if debug:
+        sections.append("debug_report")
+    return sections, bool(RECURRING_SECTIONS.intersection(sections))
+
+
+def _analysis_payload(aggs, top_n, sections):
+    values = {"aggregates": aggs, "top_n": top_n}
+
+    def build(node):
+        if node not in values:
+            deps, fn = SECTION_GRAPH[node]
+            for dep in deps:
+                build(dep)
+            values[node] = fn(values)
+        return values[node]
+
+    return {section: build(section) for section in sections}
+
+
+def analyze_transactions(csv_path, top_n=5, chunksize=None, sections=None, debug=False):
+    # Large statements: fold the file chunk by chunk instead of loading it whole
+    if chunksize:
+        return analyze_transactions_streaming(
+            csv_path, top_n=top_n, chunksize=chunksize, sections=sections, debug=debug
+        )
+
+    try:
+        statement = parse_statement(csv_path)
     except Exception as e:
         raise ValueError(f"analyze_transactions failed: {str(e)}")
 
-def generate_financial_facts(monthly_summary):
+    return analyze_statement(statement, top_n=top_n, sections=sections, debug=debug)
+
+
+def analyze_statement(statement, top_n=5, sections=None, debug=False):
     """
-    Stage 1 AI: Extracts STRICT month-wise financial facts.
-    NO advice. NO narrative.
+    Core numeric analysis over an already parsed statement (see statement.py).
+    The statement frame is shared with other consumers and is not modified.
+
+    sections: payload keys to compute (default: all of ANALYSIS_SECTIONS)
+    debug: also render the tabulated aggregate tables into `debug_report`
     """
+    try:
+        statement.require(REQUIRED_COLUMNS)
+        sections, recurring = _resolve_sections(sections, debug)
+        return _analysis_payload(
+            aggregate_frame(statement.frame, recurring=recurring), top_n, sections
+        )
+    except Exception as e:
+        raise ValueError(f"analyze_transactions failed: {str(e)}")
 
-    api_key = os.getenv("SARVAM_API_KEY")
 
-    if not api_key:
-        # if sarvam api key not set 
-            return {
-                "months": monthly_summary,
-                "overall_patterns": [],
-                "risk_flags": [
-                    "AI explanation unavailable because SARVAM_API_KEY is not configured"
-                ]  
-            }
+def statement_life_event_timeline(statement, window=WINDOW_MONTHS):
+    """
+    Life-event timeline (see life_events.py) with a chosen window length;
+    the life_event_timeline section uses WINDOW_MONTHS.
+    """
+    try:
+        statement.require(REQUIRED_COLUMNS)
+        aggs = aggregate_frame(statement.frame, recurring=False)
+    except Exception as e:
+        raise ValueError(f"analyze_transactions failed: {str(e)}")
+    return life_event_timeline(event_matrix(aggs["subcat"]), window)
+
+
+def analyze_statement_incremental(statement, history_token, top_n=5, sections=None, debug=False):
+    """
+    Like analyze_statement, but only re-aggregates the months that differ
+    from the history kept under `history_token` (see incremental.py), so a
+    monthly re-upload costs roughly the size of the changed months.
+    """
+    try:
+        statement.require(REQUIRED_COLUMNS)
+        sections, recurring = _resolve_sections(sections, debug)
+        aggs, _ = incremental_store.update(history_token, statement.frame, recurring=recurring)
+        return _analysis_payload(aggs, top_n, sections)
+    except Exception as e:
+        raise ValueError(f"analyze_transactions failed: {str(e)}")
+
+
+def analyze_transactions_streaming(csv_path, top_n=5, chunksize=STREAM_CHUNKSIZE, sections=None, debug=False):
+    """
+    Chunked equivalent of analyze_transactions for very large statements.
+    Each chunk is folded into running aggregates (see aggregation.py), so peak
+    memory depends on the chunk size and the number of groups, not the file.
+    """
+    try:
+        sections, recurring = _resolve_sections(sections, debug)
+        aggs = new_aggregates(recurring=recurring)
+
+        schema, chunks = read_statement_csv(csv_path, chunksize=chunksize)
+        for chunk in chunks:
+            chunk = ParsedStatement(frame=normalize_frame(chunk, schema))
+            chunk.require(REQUIRED_COLUMNS)
+            fold_frame(aggs, chunk.frame)
+        return _analysis_payload(finish_aggregates(aggs, recurring=recurring), top_n, sections)
+    except Exception as e:
+        raise ValueError(f"analyze_transactions failed: {str(e)}")
+
+
+def _facts_unavailable(monthly_summary):
+    return {
+        "months": monthly_summary,
+        "overall_patterns": [],
+        "risk_flags": [
+            "AI explanation unavailable because SARVAM_API_KEY is not configured"
+        ]
+    }
+
 
+def _facts_request(monthly_summary) -> dict:
     prompt = f"""
 You are a financial data analyst.
 
@@ -599,26 +696,18 @@ DATA:
 {json.dumps(monthly_summary, indent=2)}
 """
 
-    response = requests.post(
-        "https://api.sarvam.ai/v1/chat/completions",
-        headers={
-            "api-subscription-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json={
-            "model": "sarvam-m",
-            "messages": [
-                {"role": "system", "content": "Return ONLY valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.1,
-            "max_tokens": 800
-        },
-        timeout=30
-    )
+    return {
+        "model": "sarvam-m",
+        "messages": [
+            {"role": "system", "content": "Return ONLY valid JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.1,
+        "max_tokens": 800
+    }
 
-    raw = response.json()["choices"][0]["message"]["content"]
 
+def _facts_result(raw: str) -> dict:
     return safe_json_from_ai(
         raw,
         fallback={
@@ -628,19 +717,38 @@ DATA:
         }
     )
 
-def generate_advisory_report(facts_json):
+
+def generate_financial_facts(monthly_summary):
     """
-    Stage 2 AI: Converts FACTS into deep human explanation.
+    Stage 1 AI: Extracts STRICT month-wise financial facts.
+    NO advice. NO narrative.
     """
 
-    aapi_key = os.getenv("SARVAM_API_KEY")
+    api_key = os.getenv("SARVAM_API_KEY")
+
     if not api_key:
-        return {
-            "summary": "AI explanation unavailable. Showing rule-based financial insights.",
-            "sections": [],
-            "final_advice": []
-        }
+        # if sarvam api key not set 
+        return _facts_unavailable(monthly_summary)
+
+    return _facts_result(chat_completion(_facts_request(monthly_summary), timeout=30))
+
+
+async def generate_financial_facts_async(monthly_summary):
+    if not os.getenv("SARVAM_API_KEY"):
+        return _facts_unavailable(monthly_summary)
+    return _facts_result(
+        await chat_completion_async(_facts_request(monthly_summary), timeout=30)
+    )
+
+
+ADVISORY_UNAVAILABLE = {
+    "summary": "AI explanation unavailable. Showing rule-based financial insights.",
+    "sections": [],
+    "final_advice": []
+}
 
+
+def _advisory_request(facts_json) -> dict:
     prompt = f"""
 You are a senior Indian personal finance advisor.
 
@@ -683,26 +791,18 @@ Return JSON in this format ONLY:
 }}
 """
 
-    response = requests.post(
-        "https://api.sarvam.ai/v1/chat/completions",
-        headers={
-            "api-subscription-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json={
-            "model": "sarvam-m",
-            "messages": [
-                {"role": "system", "content": "Return ONLY valid JSON."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.25,
-            "max_tokens": 1200
-        },
-        timeout=40
-    )
+    return {
+        "model": "sarvam-m",
+        "messages": [
+            {"role": "system", "content": "Return ONLY valid JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.25,
+        "max_tokens": 1200
+    }
 
-    raw = response.json()["choices"][0]["message"]["content"]
 
+def _advisory_result(raw: str) -> dict:
     return safe_json_from_ai(
         raw,
         fallback={
@@ -713,48 +813,86 @@ Return JSON in this format ONLY:
     )
 
 
-def analyze_transactions_api(csv_path=None, risk=50):
+def generate_advisory_report(facts_json):
+    """
+    Stage 2 AI: Converts FACTS into deep human explanation.
+    """
+
+    api_key = os.getenv("SARVAM_API_KEY")
+    if not api_key:
+        return dict(ADVISORY_UNAVAILABLE)
+
+    return _advisory_result(chat_completion(_advisory_request(facts_json), timeout=40))
+
+
+async def generate_advisory_report_async(facts_json):
+    if not os.getenv("SARVAM_API_KEY"):
+        return dict(ADVISORY_UNAVAILABLE)
+    return _advisory_result(
+        await chat_completion_async(_advisory_request(facts_json), timeout=40)
+    )
+
+
+# Only what the SIP/AI pipeline below reads from the analysis
+API_SECTIONS = [
+    "monthly_summary",
+    "monthly_income",
+    "monthly_expenses",
+    "salary_change_pct",
+    "analysis_text",
+    "life_event_scores",
+]
+
+# Sections the pipeline uses locally but never sends to a prompt
+LOCAL_SECTIONS = ["life_event_scores", "life_event_timeline"]
+
+# Structured sections /analyze also returns for report chat lookups (see
+# report_answers.py); callers pop them before the payload reaches a prompt
+REPORT_DATA_SECTIONS = ["category_breakdown"]
+
+
+def api_analysis(csv_path=None, statement=None, history_token=None, sections=API_SECTIONS):
+    """
+    Deterministic numbers the AI stages work from (API_SECTIONS by default).
+    """
     # ---- CORE NUMERIC ANALYSIS ----
-    analysis_payload = analyze_transactions(csv_path)
+    # Callers that already parsed the upload pass `statement` to skip re-parsing;
+    # with a `history_token`, only months that changed since that history's
+    # last upload are re-aggregated
+    if statement is not None and history_token:
+        analysis_payload = analyze_statement_incremental(statement, history_token, sections=sections)
+    elif statement is not None:
+        analysis_payload = analyze_statement(statement, sections=sections)
+    else:
+        analysis_payload = analyze_transactions(csv_path, sections=sections)
 
     if not isinstance(analysis_payload, dict):
         raise ValueError(
             f"analyze_transactions returned invalid type: {type(analysis_payload)}"
     )
+    return analysis_payload
 
-    monthly_summary = analysis_payload["monthly_summary"]
-    monthly_income = analysis_payload["monthly_income"]
-    monthly_expenses = analysis_payload["monthly_expenses"]
-    salary_change_pct = analysis_payload["salary_change_pct"]
 
-    # ---- AI STAGE 1: FACTS (MONTH-WISE, NO OPINION) ----
-    facts = generate_financial_facts(monthly_summary)
+def life_event_summary(event_result: dict) -> dict:
+    """
+    The `life_event` block of the API response for a detected-event result.
+    "confidence" is a float in [0, 1] from the local scorer (see
+    score_life_events) and None when the LLM made the call.
+    """
+    return {
+        "event": event_result.get("primaryEvent", "none"),
+        "confidence": event_result.get("confidence"),
+        "reason": event_result.get("reasoning", ""),
+        "source": event_result.get("source", "llm"),
+    }
 
-    # ---- LIFE EVENT (FACT-BASED) ----
-    event_result = detect_life_event_with_sarvam(
-    analysis_payload["analysis_text"]
-)
 
+def _narrated_result(analysis_payload, event_result, ai_report, risk):
+    monthly_income = analysis_payload["monthly_income"]
+    monthly_expenses = analysis_payload["monthly_expenses"]
 
     final_event = event_result.get("primaryEvent", "none")
 
-    final_decision = {
-    "finalEvent": final_event,
-    "confidence": "AI-derived",
-    "decisionReason": event_result.get("reasoning", "")
-}
-
-
-    # ---- AI STAGE 2: HUMAN EXPLANATION ----
-    try:
-        ai_report = generate_advisory_report(facts)
-    except Exception:
-        ai_report = {
-            "summary": "AI explanation unavailable.",
-            "sections": [],
-            "final_advice": []
-        }
-
     # ---- SIP (RULE-BASED, SAFE) ----
     sip_plan = generate_sip_recommendation(
         monthly_income,
@@ -801,17 +939,82 @@ def analyze_transactions_api(csv_path=None, risk=50):
     return {
     "ai_report": ai_report,
 
-    "life_event": {
-        "event": final_event,
-        "confidence": final_decision["confidence"],
-        "reason": final_decision["decisionReason"]
-    },
+    "life_event": life_event_summary(event_result),
 
     "sip_recommendation": sip_plan,
     "sip_analysis": sip_analysis
 }
 
 
+def _advisory_failed():
+    return {
+        "summary": "AI explanation unavailable.",
+        "sections": [],
+        "final_advice": []
+    }
+
+
+def analyze_transactions_api(csv_path=None, risk=50, statement=None, history_token=None):
+    analysis_payload = api_analysis(csv_path=csv_path, statement=statement, history_token=history_token)
+    return narrate_analysis(analysis_payload, risk=risk)
+
+
+def narrate_analysis(analysis_payload, risk=50):
+    """
+    The AI part of analyze_transactions_api, for an already computed
+    api_analysis payload.
+    """
+    # ---- AI STAGE 1: FACTS (MONTH-WISE, NO OPINION) ----
+    facts = generate_financial_facts(analysis_payload["monthly_summary"])
+
+    # ---- LIFE EVENT (FACT-BASED) ----
+    event_result = resolve_life_event(analysis_payload)
+
+    # ---- AI STAGE 2: HUMAN EXPLANATION ----
+    try:
+        ai_report = generate_advisory_report(facts)
+    except Exception:
+        ai_report = _advisory_failed()
+
+    return _narrated_result(analysis_payload, event_result, ai_report, risk)
+
+
+# ---- ASYNC PIPELINE ----
+# The AI stages as a dependency graph on the shared async client:
+#   facts -> advisory
+#   life event            (independent of both)
+# so wall-clock time is the longer of the two branches, not the sum.
+
+async def _facts_then_advisory(monthly_summary):
+    facts = await generate_financial_facts_async(monthly_summary)
+    try:
+        return await generate_advisory_report_async(facts)
+    except Exception:
+        return _advisory_failed()
+
+
+async def narrate_analysis_async(analysis_payload, risk=50):
+    """
+    Async equivalent of narrate_analysis.
+    """
+    event_result, ai_report = await asyncio.gather(
+        resolve_life_event_async(analysis_payload),
+        _facts_then_advisory(analysis_payload["monthly_summary"]),
+    )
+    return _narrated_result(analysis_payload, event_result, ai_report, risk)
+
+
+async def life_event_analysis_async(analysis_payload, risk=50):
+    """
+    Life event and the SIP that depends on it, without the facts -> advisory
+    branch (for callers that do not show the advisory report).
+    """
+    event_result = await resolve_life_event_async(analysis_payload)
+    narrated = _narrated_result(analysis_payload, event_result, None, risk)
+    del narrated["ai_report"]
+    return narrated
+
+
 def report_chat_with_sarvam(report_json, user_question):
     api_key = os.getenv("SARVAM_API_KEY")
     if not api_key:
@@ -828,7 +1031,7 @@ STRICT RULES:
   "I can only answer questions based on your financial report."
 
 REPORT:
-{json.dumps(report_json, indent=2)}
+{report_context(report_json, user_question)}
 
 USER QUESTION:
 {user_question}
@@ -836,13 +1039,8 @@ USER QUESTION:
 Answer in 2–4 clear sentences.
 """
 
-    response = requests.post(
-        "https://api.sarvam.ai/v1/chat/completions",
-        headers={
-            "api-subscription-key": api_key,
-            "Content-Type": "application/json"
-        },
-        json={
+    answer = chat_completion(
+        {
             "model": "sarvam-m",
             "messages": [
                 {"role": "system", "content": "You are a cautious financial explainer."},
@@ -854,7 +1052,7 @@ Answer in 2–4 clear sentences.
         timeout=30
     )
 
-    return response.json()["choices"][0]["message"]["content"].strip()
+    return answer.strip()
 
 
 
@@ -1,7 +1,6 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
-import os
 import time
 import logging
 
@@ -31,35 +30,28 @@ async def service_status():
 
 @app.post("/hello")
 async def hello_world(file: UploadFile = File(...)):
+    # Nothing reads the upload back, so it is only counted as it streams in;
+    # no copy is written to disk
     try:
         logger.info(f"Receiving file: {file.filename}")
         
-        # Create uploads directory if it doesn't exist
-        os.makedirs("uploads", exist_ok=True)
-        
         # Read file in chunks to avoid memory issues with large files
         file_size = 0
-        file_path = f"uploads/{file.filename}"
-        
-        with open(file_path, "wb") as buffer:
-            # Read and write in chunks of 1MB
-            chunk_size = 1024 * 1024  # 1MB
-            while True:
-                chunk = await file.read(chunk_size)
-                if not chunk:
-                    break
-                buffer.write(chunk)
-                file_size += len(chunk)
+        chunk_size = 1024 * 1024  # 1MB
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            file_size += len(chunk)
                 
-        logger.info(f"File saved successfully: {file.filename}, size: {file_size} bytes at {file_path}")
+        logger.info(f"File received successfully: {file.filename}, size: {file_size} bytes")
         
         # Here you could process the file as needed
         
         return {
             "message": "File uploaded successfully", 
             "filename": file.filename,
-            "size": file_size,
-            "path": file_path
+            "size": file_size
         }
         
     except Exception as e:
@@ -0,0 +1,156 @@
+# server/goal_simulator.py
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# =============================================================================
+# Monte Carlo goal-attainment simulator
+# =============================================================================
+# compute_sip sizes a SIP as if the plan earned its expected return every
+# month. Here the same SIP is run through many random monthly return paths
+# for the goal's adjusted allocation, giving the probability of reaching the
+# target and percentile bands of the corpus over time.
+#
+# Asset-class returns are jointly normal (per-asset return / volatility and
+# correlations from market_assumptions.json), so a portfolio's monthly return
+# is itself normal with mean w.mu and variance w'Σw: one normal draw per
+# path-month is enough, whatever the number of asset classes. Corpus paths
+# are then closed-form over cumulative growth, with no Python loop over
+# months.
+
+ASSUMPTIONS_PATH = os.getenv(
+    "MARKET_ASSUMPTIONS_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "market_assumptions.json")
+)
+
+DEFAULT_PATHS = 10000
+DEFAULT_SEED = 42
+MAX_PATHS = 100000
+PERCENTILES = [10, 25, 50, 75, 90]
+
+
+@lru_cache(maxsize=8)
+def load_assumptions(path: str = ASSUMPTIONS_PATH) -> dict:
+    """
+    Reads the market assumptions file into arrays keyed by asset class:
+    {"assets", "mean", "volatility", "covariance"} (annual figures).
+    """
+    with open(path) as f:
+        config = json.load(f)
+
+    assets = list(config["asset_classes"])
+    mean = np.array([config["asset_classes"][a]["expected_return"] for a in assets])
+    volatility = np.array([config["asset_classes"][a]["volatility"] for a in assets])
+
+    correlation = np.eye(len(assets))
+    if "correlation" in config:
+        order = [config["correlation"]["assets"].index(a) for a in assets]
+        correlation = np.array(config["correlation"]["matrix"])[np.ix_(order, order)]
+
+    return {
+        "assets": assets,
+        "mean": mean,
+        "volatility": volatility,
+        "covariance": correlation * np.outer(volatility, volatility),
+    }
+
+
+def _portfolio_moments(allocation: dict, assumptions: dict):
+    """
+    Monthly mean and std of the portfolio return for an allocation.
+    """
+    unknown = set(allocation) - set(assumptions["assets"])
+    if unknown:
+        raise ValueError(f"No market assumptions for asset classes: {sorted(unknown)}")
+
+    weights = np.array([allocation.get(a, 0.0) for a in assumptions["assets"]])
+    total = weights.sum()
+    if total <= 0:
+        raise ValueError("Allocation must have a positive total weight")
+    weights = weights / total
+
+    annual_mean = weights @ assumptions["mean"]
+    annual_var = weights @ assumptions["covariance"] @ weights
+    return annual_mean / 12, np.sqrt(annual_var / 12)
+
+
+def simulate_goal(
+    allocation: dict,
+    monthly_sip: float,
+    target_amount: float,
+    target_years: float,
+    paths: int = DEFAULT_PATHS,
+    seed: int = DEFAULT_SEED,
+    assumptions: dict = None,
+) -> dict:
+    """
+    Runs `paths` monthly SIP paths (contribution at the end of each month, as
+    in compute_sip) and returns the probability of ending at or above
+    `target_amount` plus corpus percentile bands at each year end.
+    The same seed always gives the same result.
+    """
+    if not 1 <= paths <= MAX_PATHS:
+        raise ValueError(f"paths must be between 1 and {MAX_PATHS}")
+    months = int(round(target_years * 12))
+    if months <= 0:
+        raise ValueError("target_years must be positive")
+
+    assumptions = assumptions or load_assumptions()
+    mu, sigma = _portfolio_moments(allocation, assumptions)
+
+    rng = np.random.default_rng(seed)
+    growth = 1 + mu + sigma * rng.standard_normal((paths, months))
+    np.maximum(growth, 1e-6, out=growth)  # a month cannot lose more than everything
+
+    # Corpus after month t: sip * sum_{k<=t} prod_{k<j<=t} growth_j
+    #                     = sip * C_t * sum_{k<=t} 1 / C_k, with C = cumprod(growth)
+    cumulative = np.cumprod(growth, axis=1)
+    corpus = monthly_sip * cumulative * np.cumsum(1 / cumulative, axis=1)
+
+    final = corpus[:, -1]
+    year_ends = np.arange(12, months + 1, 12) - 1
+    if not len(year_ends) or year_ends[-1] != months - 1:
+        year_ends = np.append(year_ends, months - 1)
+    bands = np.percentile(corpus[:, year_ends], PERCENTILES, axis=0)
+
+    return {
+        "paths": paths,
+        "seed": seed,
+        "monthly_sip": monthly_sip,
+        "target_amount": target_amount,
+        "success_probability": round(float((final >= target_amount).mean()), 4),
+        "final_corpus": {
+            f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, bands[:, -1])
+        },
+        "bands": [
+            {
+                "month": int(m + 1),
+                **{f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, bands[:, i])}
+            }
+            for i, m in enumerate(year_ends)
+        ],
+        "assumptions": {
+            "monthly_mean_return": round(float(mu), 6),
+            "monthly_volatility": round(float(sigma), 6),
+        },
+    }
+
+
+def simulate_recommendation(recommendation: dict, paths: int = DEFAULT_PATHS, seed: int = DEFAULT_SEED):
+    """
+    Simulates one goal as returned by generate_recommendation_for_goal.
+    Returns None for general recommendations (no amount or horizon).
+    """
+    if "adjusted_allocation" not in recommendation:
+        return None
+    return simulate_goal(
+        recommendation["adjusted_allocation"],
+        recommendation["recommended_sip"],
+        recommendation["target_amount"],
+        recommendation["target_horizon_years"],
+        paths=paths,
+        seed=seed,
+    )
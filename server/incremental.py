@@ -0,0 +1,152 @@
+# server/incremental.py
+
+import os
+import secrets
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from aggregation import combine_moments, drop_months, finish_aggregates, fold_frame, new_aggregates
+
+# =============================================================================
+# Incremental re-analysis
+# =============================================================================
+# Users upload a fresh statement every month that mostly repeats the previous
+# one. Every aggregate in aggregation.py is keyed by month (apart from the
+# debit moments, which are kept per month here), so instead of re-aggregating
+# the whole upload we keep a history's running accumulators and only redo the
+# months that differ:
+#   1. a cheap per-month fingerprint (row count, credit and debit totals)
+#      picks out the months whose rows differ from what the history holds;
+#   2. those months, and any month the upload no longer contains (e.g. the
+#      oldest month of a rolling 12-month export), are dropped from the
+#      accumulators;
+#   3. the upload's rows for the changed months are folded back in.
+# The result therefore covers exactly the uploaded months, and re-analysis
+# costs one vectorised pass for the fingerprints plus work proportional to
+# the changed months. An edit that keeps a month's row count and totals
+# (e.g. a relabelled category) is not detected.
+#
+# Histories are keyed by an opaque token the server issues (create), never
+# by a client-chosen id, and the feature is off unless enabled.
+
+INCREMENTAL_ENABLED = os.getenv("INCREMENTAL_ANALYSIS_ENABLED", "0") == "1"
+
+MAX_HISTORIES = 1000
+
+
+def month_fingerprints(frame: pd.DataFrame) -> pd.DataFrame:
+    return frame.groupby("monthyear", sort=False).agg(
+        rows=("credit", "size"),
+        credit=("credit", "sum"),
+        debit=("debit", "sum"),
+    )
+
+
+def _changed_months(fingerprints: pd.DataFrame, seen: pd.DataFrame) -> pd.Index:
+    joined = fingerprints.join(seen, rsuffix="_seen", how="left")
+    unchanged = (
+        (joined["rows"] == joined["rows_seen"]) &
+        np.isclose(joined["credit"], joined["credit_seen"]) &
+        np.isclose(joined["debit"], joined["debit_seen"])
+    )
+    return joined.index[~unchanged.to_numpy()]
+
+
+def month_moments(frame: pd.DataFrame) -> dict:
+    """
+    (count, mean, M2) of the debit column per month, blanks skipped.
+    """
+    grouped = frame["debit"].dropna().groupby(frame["monthyear"], sort=False)
+    stats = grouped.agg(["size", "mean", "var"])
+    m2 = stats["var"].fillna(0) * (stats["size"] - 1)
+    return {
+        month: (int(n), float(mean), float(sq))
+        for month, n, mean, sq in zip(stats.index, stats["size"], stats["mean"], m2)
+    }
+
+
+class IncrementalStore:
+    """
+    Running aggregates per history token, kept in memory with LRU eviction
+    beyond `max_histories`.
+    """
+
+    def __init__(self, max_histories: int = MAX_HISTORIES):
+        self.max_histories = max_histories
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self) -> str:
+        """
+        Starts an empty history and returns its token.
+        """
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[token] = {
+                "aggs": new_aggregates(),
+                "months": pd.DataFrame(columns=["rows", "credit", "debit"], dtype="float64"),
+                "moments": {},
+                "lock": threading.Lock(),
+            }
+            while len(self._entries) > self.max_histories:
+                self._entries.popitem(last=False)
+        return token
+
+    def __contains__(self, token):
+        with self._lock:
+            return token in self._entries
+
+    def _entry(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                raise KeyError("Unknown or expired history token")
+            self._entries.move_to_end(token)
+            return entry
+
+    def update(self, token, frame: pd.DataFrame, recurring=True):
+        """
+        Brings the history for `token` in line with `frame` and returns
+        (finished aggregates, number of rows re-folded); `recurring`
+        controls whether the recurring-detail table is rolled up. Raises
+        KeyError for an unknown token.
+        """
+        entry = self._entry(token)
+
+        with entry["lock"]:
+            fingerprints = month_fingerprints(frame)
+            changed = _changed_months(fingerprints, entry["months"])
+            removed = entry["months"].index.difference(fingerprints.index)
+            stale = changed.union(removed)
+
+            if len(stale):
+                drop_months(entry["aggs"], stale)
+                entry["months"] = entry["months"].drop(index=stale, errors="ignore")
+                for month in stale:
+                    entry["moments"].pop(month, None)
+
+            added = frame[frame["monthyear"].isin(changed)]
+            if len(added):
+                fold_frame(entry["aggs"], added)
+                entry["months"] = pd.concat([entry["months"], fingerprints.loc[changed]])
+                entry["moments"].update(month_moments(added))
+
+            # Debit moments are kept per month so dropped months can be
+            # taken out of the statement-wide figure
+            entry["aggs"]["debit_moments"] = reduce(
+                combine_moments,
+                (entry["moments"][m] for m in sorted(entry["moments"])),
+                (0, 0.0, 0.0)
+            )
+            return finish_aggregates(entry["aggs"], recurring=recurring), len(added)
+
+    def forget(self, token) -> bool:
+        with self._lock:
+            return self._entries.pop(token, None) is not None
+
+
+store = IncrementalStore()
@@ -0,0 +1,417 @@
+# server/life_events.py
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# Local life-event scorer
+# =============================================================================
+# The signals the LLM is asked to read off analysis_text (salary changes,
+# category spikes, large one-off payments) are already in the aggregates.
+# Here they are measured directly on a month x spend-group matrix built from
+# the (month, category, subcategory) table, turned into a handful of
+# features in [0, 1], and combined with fixed per-event weights into one
+# score per event. Only when the two best scores are too close to call does
+# the caller fall back to the LLM.
+
+# Spend groups the events look at, matched against the subcategory
+SPEND_GROUPS = {
+    "shopping": ["shopping", "jewel", "apparel", "cloth"],
+    "food": ["food", "restaurant", "dining", "catering"],
+    "hospital": ["hospital", "medical", "pharma", "clinic", "doctor"],
+    "insurance": ["insurance", "lic"],
+    "emi": ["emi", "loan", "mortgage"],
+    "rent": ["rent"],
+}
+
+FEATURES = [
+    "salary_shift", "salary_gap", "large_payment", "emi_onset",
+    "shopping_spike", "food_spike", "hospital_spike", "insurance_spike", "rent_spike",
+]
+
+EVENT_WEIGHTS = {
+    "jobChange": {"salary_shift": 1.0, "salary_gap": 0.5},
+    "wedding": {"shopping_spike": 0.6, "food_spike": 0.3, "large_payment": 0.4},
+    "newBaby": {"hospital_spike": 0.7, "insurance_spike": 0.3, "shopping_spike": 0.2},
+    "homePurchase": {"emi_onset": 0.8, "large_payment": 0.4, "rent_spike": 0.1},
+}
+EVENTS = list(EVENT_WEIGHTS)
+
+# (events x features), each row normalised so a score is in [0, 1]
+WEIGHTS = np.array([[EVENT_WEIGHTS[e].get(f, 0.0) for f in FEATURES] for e in EVENTS])
+WEIGHTS /= WEIGHTS.sum(axis=1, keepdims=True)
+
+# A signal's strength is its size (relative to SCALE, below) times how far
+# it stands out from the month-to-month noise of its series: robust z-score
+# (median / MAD) mapped from Z_FLOOR (noise) to Z_FULL (certain)
+SPIKE_SCALE = 2.0           # peak month at 3x the group's median month
+SALARY_SHIFT_SCALE = 0.12   # salary level moved by 12% (a 10-20% hike registers on its own)
+EMI_ONSET_SCALE = 1.0       # EMI outgo doubled between halves of the statement
+LARGE_PAYMENT_FLOOR = 0.5   # single payment share of a month's spend below this is noise
+Z_FLOOR = 2.0
+Z_FULL = 4.0
+MAD_FLOOR = 0.1             # spend MAD is at least 10% of the median (steady series)
+SALARY_MAD_FLOOR = 0.01     # salary is steadier: 1%
+SALARY_MIN_SEGMENT = 3      # paid months each side of a salary level change (one bonus is not a shift)
+BASELINE_FLOOR = 0.02       # a group's usual month is at least 2% of a usual month's total spend
+
+MIN_EVENT_SCORE = 0.5
+AMBIGUITY_MARGIN = 0.15
+
+WINDOW_MONTHS = 3
+MIN_SALARY_HISTORY = 2      # paid months needed before a window to judge a salary shift
+
+
+# ==============================
+# MONTH x GROUP MATRIX
+# ==============================
+
+def _group_of(subcategories) -> dict:
+    groups = {}
+    for subcategory in subcategories:
+        text = str(subcategory).lower()
+        for group, keywords in SPEND_GROUPS.items():
+            if any(k in text for k in keywords):
+                groups[subcategory] = group
+                break
+    return groups
+
+
+def event_matrix(subcat: pd.DataFrame) -> dict:
+    """
+    Per-month arrays (months in order) from the aggregation subcat table:
+    "spend" (months x SPEND_GROUPS debits), "total_spend", "largest" (the
+    single largest expense row) and "salary" (salary credits).
+    """
+    months = np.sort(subcat["monthyear"].unique())
+    index = pd.Index(months)
+
+    expense = subcat[subcat["expense_count"] > 0]
+    groups = expense["subcategory"].map(_group_of(expense["subcategory"].unique()))
+    spend = (
+        expense.assign(group=groups).dropna(subset=["group"])
+               .groupby(["monthyear", "group"])["expense_debit"].sum()
+               .unstack(fill_value=0)
+               .reindex(index=index, columns=list(SPEND_GROUPS), fill_value=0)
+    )
+
+    salary_rows = subcat["subcategory"].str.contains("salary", case=False, na=False)
+    return {
+        "months": months,
+        "spend": spend.to_numpy(dtype=float),
+        "total_spend": expense.groupby("monthyear")["expense_debit"].sum()
+                              .reindex(index, fill_value=0).to_numpy(dtype=float),
+        "largest": expense.groupby("monthyear")["max_abs_amount"].max()
+                          .reindex(index, fill_value=0).to_numpy(dtype=float),
+        "salary": subcat[salary_rows].groupby("monthyear")["subcat_inflow"].sum()
+                                     .reindex(index, fill_value=0).to_numpy(dtype=float),
+    }
+
+
+# ==============================
+# FEATURES
+# ==============================
+
+def _ratio(numerator, denominator):
+    return np.divide(
+        numerator, denominator,
+        out=np.zeros(np.broadcast(numerator, denominator).shape), where=denominator > 0
+    )
+
+
+def _significance(value, reference, mad_floor=MAD_FLOOR, median_floor=0.0):
+    """
+    How clearly `value` stands above the series `reference` (column-wise,
+    NaNs ignored), in [0, 1]: its robust z-score against the series mapped
+    from Z_FLOOR to Z_FULL.
+    """
+    reference = np.where(np.isnan(reference).all(axis=0), 0.0, reference)
+    median = np.maximum(np.nanmedian(reference, axis=0), median_floor)
+    mad = np.nanmedian(np.abs(reference - median), axis=0)
+    scale = 1.4826 * np.maximum(mad, mad_floor * median)
+    return _z_strength(value - median, scale)
+
+
+def _z_strength(excess, scale):
+    """
+    z = excess / scale mapped from Z_FLOOR (0) to Z_FULL (1); any excess
+    over a zero scale counts as certain.
+    """
+    excess = np.asarray(excess, dtype=float)
+    z = np.divide(excess, scale, out=np.where(excess > 0, np.inf, 0.0), where=scale > 0)
+    return np.clip((z - Z_FLOOR) / (Z_FULL - Z_FLOOR), 0, 1)
+
+
+def statement_features(matrix: dict):
+    """
+    Feature values in [0, 1] over the whole statement, plus the raw
+    measurements behind them (for the reasoning text).
+    """
+    months = matrix["months"]
+    spend = matrix["spend"]
+    salary = matrix["salary"]
+    n = len(months)
+    half = max(n // 2, 1)
+    columns = np.arange(spend.shape[1])
+
+    # ---- SPIKES: peak month against the group's other active months ----
+    # (months without any spend in a group are absence, not a baseline of
+    # zero, so occasional categories do not spike on every use)
+    peak = spend.argmax(axis=0)
+    peak_spend = spend[peak, columns]
+    others = np.where((np.arange(n)[:, None] == peak) | (spend <= 0), np.nan, spend)
+    floor = BASELINE_FLOOR * np.median(matrix["total_spend"])
+    spike_strength = np.zeros(len(columns))
+    spike = np.zeros(len(columns))
+    if n > 1:
+        usual = np.where(np.isnan(others).all(axis=0), 0.0, others)
+        baseline = np.maximum(np.nanmedian(usual, axis=0), floor)
+        spike = np.where(baseline > 0, _ratio(peak_spend, baseline) - 1, 0)
+        spike_strength = np.clip(spike / SPIKE_SCALE, 0, 1) * _significance(
+            peak_spend, others, median_floor=floor
+        )
+
+    # ---- SALARY: strongest level shift over the paid months, and gaps ----
+    paid = np.flatnonzero(salary > 0)
+    salary_shift = 0.0
+    salary_gap = 0.0
+    shift_strength = 0.0
+    if len(paid) >= 2:
+        span = paid[-1] - paid[0] + 1
+        salary_gap = 1 - len(paid) / span
+    # Every split with SALARY_MIN_SEGMENT paid months on each side, so a
+    # change late in the statement is not diluted by a fixed halfway split
+    for split in range(SALARY_MIN_SEGMENT, len(paid) - SALARY_MIN_SEGMENT + 1):
+        before, after = salary[paid[:split]], salary[paid[split:]]
+        shift = abs(np.median(after) / np.median(before) - 1)
+        # Significant if the later level stands out from the earlier months
+        # (either way)
+        moved = abs(np.median(after) - np.median(before)) + np.median(before)
+        strength = min(shift / SALARY_SHIFT_SCALE, 1) * float(
+            _significance(moved, before, mad_floor=SALARY_MAD_FLOOR)
+        )
+        if strength > shift_strength or (not shift_strength and shift > salary_shift):
+            salary_shift, shift_strength = shift, strength
+
+    # ---- EMI ONSET: EMI outgo in the second half against the first ----
+    emi = spend[:, list(SPEND_GROUPS).index("emi")]
+    emi_before = emi[:half].mean()
+    emi_after = emi[half:].mean() if n > 1 else 0.0
+    emi_onset = (emi_after / emi_before - 1) if emi_before > 0 else (1.0 if emi_after > 0 else 0.0)
+    onset_strength = (
+        min(max(emi_onset, 0) / EMI_ONSET_SCALE, 1) * float(_significance(np.median(emi[half:]), emi[:half]))
+        if n > 1 else 0.0
+    )
+
+    # ---- LARGE ONE-OFF PAYMENT: share of a month's spend ----
+    share = _ratio(matrix["largest"], matrix["total_spend"])
+    large_month = int(share.argmax()) if n else 0
+    large_share = float(share[large_month]) if n else 0.0
+
+    raw = {
+        "salary_shift": salary_shift,
+        "salary_gap": salary_gap,
+        "large_payment": large_share,
+        "emi_onset": emi_onset,
+        **{f"{g}_spike": float(spike[i]) for i, g in enumerate(SPEND_GROUPS)},
+    }
+    scaled = {
+        "salary_shift": shift_strength,
+        "salary_gap": salary_gap,
+        "large_payment": (large_share - LARGE_PAYMENT_FLOOR) / (1 - LARGE_PAYMENT_FLOOR),
+        "emi_onset": onset_strength,
+        **{f"{g}_spike": float(spike_strength[i]) for i, g in enumerate(SPEND_GROUPS)},
+    }
+    values = np.clip(np.array([scaled[f] for f in FEATURES], dtype=float), 0, 1)
+
+    where = {
+        "large_payment": months[large_month] if n else None,
+        **{f"{g}_spike": months[peak[i]] if n else None for i, g in enumerate(SPEND_GROUPS)},
+    }
+    return values, raw, where
+
+
+def _describe(feature, raw, where):
+    value = raw[feature]
+    if feature == "salary_shift":
+        return f"salary level changed by {value:.0%}"
+    if feature == "salary_gap":
+        return f"salary missing in {value:.0%} of months"
+    if feature == "large_payment":
+        return f"a single payment was {value:.0%} of {where[feature]} spending"
+    if feature == "emi_onset":
+        return f"EMI outgo rose {value:.0%} in the later months"
+    return f"{feature.replace('_spike', '')} spend in {where[feature]} was {value + 1:.1f}x its usual month"
+
+
+# ==============================
+# SCORING
+# ==============================
+
+def score_life_events(matrix: dict) -> dict:
+    """
+    Local life-event scores for a statement's event_matrix:
+    {"scores", "event", "confidence", "ambiguous", "reasoning"}. "event" is
+    "none" when no score reaches MIN_EVENT_SCORE; "ambiguous" is set when
+    the top two scores are within AMBIGUITY_MARGIN of each other.
+    "confidence" is the winning event's score, or for "none" 1 minus the
+    strongest score (how clearly nothing happened).
+    """
+    values, raw, where = statement_features(matrix)
+    scores = WEIGHTS @ values
+    order = np.argsort(-scores, kind="stable")
+    top, second = scores[order[0]], scores[order[1]]
+
+    detected = top >= MIN_EVENT_SCORE
+    event = EVENTS[order[0]] if detected else "none"
+
+    contributions = WEIGHTS[order[0]] * values
+    signals = [
+        _describe(FEATURES[i], raw, where)
+        for i in np.argsort(-contributions) if contributions[i] > 0
+    ][:3]
+
+    return {
+        "scores": {e: round(float(s), 3) for e, s in zip(EVENTS, scores)},
+        "event": event,
+        "confidence": round(float(top if detected else 1 - top), 3),
+        "ambiguous": bool(detected and top - second < AMBIGUITY_MARGIN),
+        "reasoning": (
+            "; ".join(signals)[:1].upper() + "; ".join(signals)[1:] + "." if detected and signals
+            else "No strong life-event signals in the statement."
+        ),
+    }
+
+
+# ==============================
+# TIMELINE
+# ==============================
+# The same features per rolling window of N months instead of per
+# statement, each window measured against the months outside it (spend) or
+# before it (salary, EMI). Every window sum, mean and variance comes from
+# one cumulative sum (and sum of squares) over the month x group matrix, so
+# scoring all windows costs a few array operations whatever the length of
+# the statement. Consecutive windows won by the same event are one
+# occurrence, dated by its best window.
+
+def _prefix(values):
+    """
+    Cumulative sums with a leading zero row: window [s, e) sums to p[e] - p[s].
+    """
+    values = np.asarray(values, dtype=float)
+    return np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+
+
+def _mean_std(total, squares, count):
+    mean = _ratio(total, count)
+    variance = np.maximum(_ratio(squares, count) - mean ** 2, 0)
+    return mean, np.sqrt(variance)
+
+
+def window_features(matrix: dict, window: int = WINDOW_MONTHS) -> np.ndarray:
+    """
+    (windows x FEATURES) values in [0, 1]; row s covers months [s, s + window).
+    """
+    spend = matrix["spend"]
+    salary = matrix["salary"]
+    n = len(matrix["months"])
+    starts = np.arange(n - window + 1)
+    ends = starts + window
+
+    # ---- SPIKES: window mean against the months outside the window ----
+    p1, p2 = _prefix(spend), _prefix(spend ** 2)
+    in_sum = p1[ends] - p1[starts]
+    in_squares = p2[ends] - p2[starts]
+    out_count = n - window
+    out_mean, out_std = _mean_std(p1[n] - in_sum, p2[n] - in_squares, out_count)
+    floor = BASELINE_FLOOR * np.median(matrix["total_spend"])
+    baseline = np.maximum(out_mean, floor)
+    in_mean = in_sum / window
+    spike = np.where(baseline > 0, _ratio(in_mean, baseline) - 1, 0)
+    spike_strength = np.clip(spike / SPIKE_SCALE, 0, 1) * _z_strength(
+        in_mean - baseline, np.maximum(out_std, MAD_FLOOR * baseline)
+    )
+    if not out_count:
+        spike_strength[:] = 0
+
+    # ---- SALARY: window level against the paid months before it ----
+    # A rise must hold in every paid month of the window and a fall in
+    # every month, so a one-off bonus or a late credit is not a shift
+    paid = (salary > 0).astype(float)
+    s1, s2, k = _prefix(salary), _prefix(salary ** 2), _prefix(paid)
+    before_mean, before_std = _mean_std(s1[starts], s2[starts], k[starts])
+    in_paid = k[ends] - k[starts]
+    judged = (k[starts] >= MIN_SALARY_HISTORY) & (in_paid > 0)
+    view = np.lib.stride_tricks.sliding_window_view
+    held = np.where(judged, view(np.where(salary > 0, salary, np.inf), window).min(axis=1), 0)
+    peak = view(salary, window).max(axis=1)
+    rise = _ratio(held, before_mean) - 1
+    fall = 1 - _ratio(peak, before_mean)
+    salary_shift = np.where(judged, np.maximum(np.maximum(rise, fall), 0), 0)
+    level = np.where(rise >= fall, held, peak)
+    shift_strength = np.clip(salary_shift / SALARY_SHIFT_SCALE, 0, 1) * _z_strength(
+        np.abs(level - before_mean), np.maximum(before_std, SALARY_MAD_FLOOR * before_mean)
+    ) * judged
+    salary_gap = np.where(k[starts] > 0, (window - in_paid) / window, 0)
+
+    # ---- EMI ONSET: window EMI against the months before it ----
+    emi = spend[:, list(SPEND_GROUPS).index("emi")]
+    e1, e2 = _prefix(emi), _prefix(emi ** 2)
+    emi_before, emi_before_std = _mean_std(e1[starts], e2[starts], starts)
+    emi_in = (e1[ends] - e1[starts]) / window
+    emi_onset = np.where(
+        emi_before > 0, _ratio(emi_in, emi_before) - 1, (emi_in > 0).astype(float)
+    )
+    onset_strength = np.clip(emi_onset / EMI_ONSET_SCALE, 0, 1) * _z_strength(
+        emi_in - emi_before, np.maximum(emi_before_std, MAD_FLOOR * emi_before)
+    ) * (starts > 0)
+
+    # ---- LARGE ONE-OFF PAYMENT: largest share within the window ----
+    share = _ratio(matrix["largest"], matrix["total_spend"])
+    large_share = np.lib.stride_tricks.sliding_window_view(share, window).max(axis=1)
+
+    columns = {
+        "salary_shift": shift_strength,
+        "salary_gap": salary_gap,
+        "large_payment": (large_share - LARGE_PAYMENT_FLOOR) / (1 - LARGE_PAYMENT_FLOOR),
+        "emi_onset": onset_strength,
+        **{f"{g}_spike": spike_strength[:, i] for i, g in enumerate(SPEND_GROUPS)},
+    }
+    return np.clip(np.column_stack([columns[f] for f in FEATURES]), 0, 1)
+
+
+def life_event_timeline(matrix: dict, window: int = WINDOW_MONTHS) -> list:
+    """
+    Dated life events across a statement's event_matrix:
+    [{"event", "start", "end", "confidence", "signals"}, ...] in date
+    order, where start / end are the first and last month of the
+    best-scoring window of each occurrence.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1 month")
+
+    months = matrix["months"]
+    if len(months) <= window:
+        return []
+
+    values = window_features(matrix, window)
+    scores = values @ WEIGHTS.T
+    best = scores.argmax(axis=1)
+    label = np.where(scores.max(axis=1) >= MIN_EVENT_SCORE, best, -1)
+
+    timeline = []
+    runs = np.split(np.arange(len(label)), np.flatnonzero(np.diff(label)) + 1)
+    for run in runs:
+        event = label[run[0]]
+        if event < 0:
+            continue
+        peak = run[scores[run, event].argmax()]
+        contributions = WEIGHTS[event] * values[peak]
+        timeline.append({
+            "event": EVENTS[event],
+            "start": str(months[peak]),
+            "end": str(months[peak + window - 1]),
+            "confidence": round(float(scores[peak, event]), 3),
+            "signals": [FEATURES[i] for i in np.argsort(-contributions) if contributions[i] > 0][:3],
+        })
+    return timeline
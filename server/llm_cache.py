@@ -0,0 +1,192 @@
+# server/llm_cache.py
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# =============================================================================
+# LLM response cache
+# =============================================================================
+# The analysis prompts are deterministic functions of the statement and the
+# risk value, so re-analysing the same statement would otherwise pay for and
+# wait on identical Sarvam calls. Responses are cached under a fingerprint of
+# everything that determines them (model, messages, sampling parameters):
+#   - an in-memory LRU tier for the hot entries of this process;
+#   - optionally (LLM_CACHE_DISK=1), a SQLite tier on disk, shared by
+#     workers and kept across restarts, bounded by size with
+#     least-recently-used eviction. It holds prompt/response text about
+#     users' finances, so it is off unless asked for.
+# Entries expire after a TTL in both tiers; expired disk rows are swept on
+# every write, not only when they are read again. A disk tier that cannot
+# be opened (read-only filesystem, permissions) falls back to memory only.
+
+CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") != "0"
+CACHE_DISK_ENABLED = os.getenv("LLM_CACHE_DISK", "0") == "1"
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(".cache", "llm_responses.sqlite"))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_MB", "64")) * 1024 * 1024
+
+
+def fingerprint(payload: dict) -> str:
+    """
+    SHA-256 of the canonical JSON of a chat-completions body.
+    """
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS,
+                 memory_entries=CACHE_MEMORY_ENTRIES, max_bytes=CACHE_MAX_BYTES,
+                 disk=CACHE_DISK_ENABLED):
+        self.path = path
+        self.disk = disk
+        self.ttl = ttl
+        self.memory_entries = memory_entries
+        self.max_bytes = max_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0,
+            "stores": 0, "expired": 0, "evicted": 0,
+        }
+
+    # ---- DISK TIER ----
+
+    def _connection(self):
+        if self._db is None:
+            try:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                db = sqlite3.connect(self.path, check_same_thread=False)
+                db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                    " created REAL NOT NULL, accessed REAL NOT NULL, size INTEGER NOT NULL)"
+                )
+                db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+                db.execute("CREATE INDEX IF NOT EXISTS responses_created ON responses (created)")
+                db.commit()
+            except (OSError, sqlite3.Error) as e:
+                logger.warning(f"LLM cache disk tier unavailable, using memory only: {e}")
+                self.disk = False
+                raise
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key, now):
+        db = self._connection()
+        row = db.execute("SELECT value, created FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        value, created = row
+        if now - created > self.ttl:
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            db.commit()
+            self.counters["expired"] += 1
+            return None
+        db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+        db.commit()
+        return value, created
+
+    def _disk_put(self, key, value, now):
+        db = self._connection()
+        db.execute(
+            "INSERT OR REPLACE INTO responses (key, value, created, accessed, size) VALUES (?, ?, ?, ?, ?)",
+            (key, value, now, now, len(value.encode("utf-8")))
+        )
+        self.counters["expired"] += db.execute(
+            "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+        ).rowcount
+        # Least recently used entries go first once the tier is over budget
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total > self.max_bytes:
+            for old_key, size in db.execute(
+                "SELECT key, size FROM responses ORDER BY accessed"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                db.execute("DELETE FROM responses WHERE key = ?", (old_key,))
+                total -= size
+                self.counters["evicted"] += 1
+        db.commit()
+
+    # ---- MEMORY TIER ----
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    # ---- API ----
+
+    def get(self, key):
+        """
+        Cached response text for `key`, or None. Never raises: a broken
+        cache only costs a network call.
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[1] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                del self._memory[key]
+            entry = None
+            if self.disk:
+                try:
+                    entry = self._disk_get(key, now)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"LLM cache read failed: {e}")
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._remember(key, *entry)
+            self.counters["disk_hits"] += 1
+            return entry[0]
+
+    def put(self, key, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self.disk:
+                try:
+                    self._disk_put(key, value, now)
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning(f"LLM cache write failed: {e}")
+            self.counters["stores"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self.disk:
+                self._connection().execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.counters["memory_hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            hits = lookups - self.counters["misses"]
+            return {
+                **self.counters,
+                "memory_entries": len(self._memory),
+                "disk_enabled": self.disk,
+                "hit_rate": round(hits / lookups, 4) if lookups else None,
+            }
+
+
+response_cache = ResponseCache()
@@ -1,24 +1,46 @@
 from dotenv import load_dotenv
 load_dotenv()
 from fastapi import FastAPI, HTTPException
-from chatbot import report_chat_with_sarvam 
+from chatbot import answer_report_question, stream_report_chat
+from report_answers import answer_locally
+from report_sessions import (
+    SESSION_TTL_SECONDS, create_session, delete_session, get_session, record_turn
+)
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 import json
 from pydantic import BaseModel
 import pandas as pd
-import torch
-# import faiss
-from sentence_transformers import SentenceTransformer, util
 import math
 from fastapi import FastAPI, UploadFile, File, HTTPException
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import os
 import time
 import logging
 import numpy as np
-from event_detection import analyze_transactions_api
-from tax_snapshot import extract_tax_snapshot 
+from event_detection import (
+    API_SECTIONS, LOCAL_SECTIONS, REPORT_DATA_SECTIONS, api_analysis, generate_sip_recommendation,
+    life_event_analysis_async, statement_life_event_timeline
+)
+from life_events import WINDOW_MONTHS
+from incremental import INCREMENTAL_ENABLED, store as incremental_store
+from llm_cache import response_cache
+from sarvam_client import (
+    chat_completion_async, chat_completion_stream_async, close_async_client, close_client
+)
+import asyncio
+import httpx
+import re
+from tax_snapshot import extract_tax_snapshot, tax_snapshot_from_statement
+from statement_cache import parse_statement_cached
+from recommendation import generate_recommendations, generate_recommendations_batch
+from goal_simulator import DEFAULT_PATHS, DEFAULT_SEED, simulate_recommendation
+from batch import MAX_BATCH_BYTES, MAX_BATCH_FILES, analyze_batch, shutdown_pool
+from tax_optimiser import DEFAULT_GRID_STEPS, optimise_deductions
+from tax_regimes import DEFAULT_FINANCIAL_YEAR
+from typing import List
 import os
 # Define request models
 class DetailRequest(BaseModel):
@@ -26,7 +48,6 @@ class DetailRequest(BaseModel):
 
 class ChatRequest(BaseModel):
     message: str
-    chat_history: list = []
 
 class ChatResponse(BaseModel):
     response: str
@@ -47,6 +68,12 @@ app.add_middleware(
 class DetailRequest(BaseModel):
     detail: str
 
+# Needs torch / sentence_transformers (and faiss), imported here rather than
+# at module level so batch.py's spawned workers do not load them:
+# import torch
+# import faiss
+# from sentence_transformers import SentenceTransformer, util
+#
 # @app.post("/get_similarity/")
 # def get_similarity_score(request: DetailRequest):
 #     # Load dataset
@@ -88,314 +115,66 @@ class DetailRequest(BaseModel):
 #         return {"message": "No similar details found with a confidence of 75% or higher."}
 
 
-# =============================================================================
-# Base Plan Library (Dezerv Plans)
-# =============================================================================
-# Each base plan includes:
-# - plan_name: Name of the plan.
-# - default_allocation: Dummy percentages for each asset class.
-# - expected_return: Annual expected return (as decimal, e.g., 0.12 for 12%).
-# - ideal_holding: Ideal holding period in years (numeric).
-base_plans = [
-    {
-        "plan_name": "Equity Revival",
-        "default_allocation": {"equity": 0.65, "debt": 0.25, "gold": 0.05, "liquid": 0.05},
-        "expected_return": 0.12,
-        "ideal_holding": 3  # Ideal holding: 3+ years
-    },
-    {
-        "plan_name": "Alpha Focused",
-        "default_allocation": {"equity": 0.80, "debt": 0.10, "gold": 0.05, "liquid": 0.05},
-        "expected_return": 0.15,
-        "ideal_holding": 5  # Ideal holding: 5+ years
-    },
-    {
-        "plan_name": "Dynamic Debt +",
-        "default_allocation": {"equity": 0.10, "debt": 0.80, "gold": 0.05, "liquid": 0.05},
-        "expected_return": 0.11,
-        "ideal_holding": 2  # Ideal holding: 2+ years
-    },
-    {
-        "plan_name": "Private Credit AIF",
-        "default_allocation": {"equity": 0.0, "debt": 0.95, "gold": 0.0, "liquid": 0.05},
-        "expected_return": 0.10,
-        "ideal_holding": 4  # Ideal holding: 4+ years
-    }
-]
 
-# =============================================================================
-# Mapping Goal Names to Base Plans
-# =============================================================================
-def get_base_plan(goal_name, risk_profile):
-    """
-    Map a goal (by its name) to a base plan.
-    For example:
-      - If goal name contains "Home Purchase", use Equity Revival.
-      - If goal name contains "Emergency Fund", use Dynamic Debt +.
-      - If goal name contains "Child Education", then if risk is aggressive use Alpha Focused;
-        otherwise use Equity Revival.
-      - If goal name contains "Car", use Dynamic Debt +.
-      - Else default to Equity Revival.
-    """
-    goal_lower = goal_name.lower()
-    if "home purchase" in goal_lower or "joint savings" in goal_lower:
-        return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
-    elif "emergency fund" in goal_lower:
-        return next(plan for plan in base_plans if plan["plan_name"] == "Dynamic Debt +")
-    elif "child education" in goal_lower:
-        if risk_profile.lower() == "aggressive":
-            return next(plan for plan in base_plans if plan["plan_name"] == "Alpha Focused")
-        else:
-            return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
-    elif "car" in goal_lower:
-        return next(plan for plan in base_plans if plan["plan_name"] == "Dynamic Debt +")
-    else:
-        return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
+        
+@app.post("/recommendation")
+def get_recommendation(user_input: dict):
+    try:
+        return generate_recommendations(user_input)
+    except Exception as e:
+        logger.error(f"Recommendation failed: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
 
-# =============================================================================
-# Utility: Normalize Allocation Dictionary
-# =============================================================================
-def normalize_allocation(allocation):
-    total = sum(allocation.values())
-    if total == 0:
-        return allocation
-    return {k: round(v / total, 2) for k, v in allocation.items()}
 
-# =============================================================================
-# Time Horizon Adjustment
-# =============================================================================
-def adjust_for_time_horizon(allocation, target_years, ideal_holding):
+@app.post("/recommendation/batch")
+def get_recommendations_batch(payload: dict):
     """
-    Adjust allocation based on the difference between the ideal holding period and the user's target horizon.
-    
-    Rule:
-      - If target horizon is shorter than ideal (diff > 0), reduce equity by 5% per year difference,
-        and add that percentage to liquid assets.
-      - If target horizon is longer than ideal, increase equity by 2% per extra year and reduce debt by same.
+    Recommendations for many users in one call, e.g. an advisor's whole
+    client book: {"clients": [<same body as /recommendation>, ...]}.
+    Results come back in the same order, each shaped like /recommendation's.
     """
-    diff = ideal_holding - target_years  # positive if target is shorter
-    adjusted = allocation.copy()
-    if diff > 0:
-        reduction = min(diff * 0.05, adjusted["equity"])  # cap reduction to available equity
-        adjusted["equity"] -= reduction
-        adjusted["liquid"] += reduction
-    elif diff < 0:
-        increase = abs(diff) * 0.02  # add 2% per extra year
-        reduction_from_debt = min(increase, adjusted["debt"])
-        adjusted["equity"] += increase
-        adjusted["debt"] -= reduction_from_debt
-    return normalize_allocation(adjusted)
+    clients = payload.get("clients")
+    if not isinstance(clients, list):
+        raise HTTPException(status_code=400, detail="'clients' must be a list")
+    try:
+        return {"results": generate_recommendations_batch(clients)}
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-# =============================================================================
-# Risk Profile Adjustment
-# =============================================================================
-def adjust_for_risk(allocation, risk_profile):
-    """
-    Adjust allocation based on risk profile:
-      - Aggressive: Increase equity by 5% (reduce debt by 5%).
-      - Conservative: Decrease equity by 5% (increase liquid by 5%).
-      - Moderate: No change.
-    """
-    adjusted = allocation.copy()
-    if risk_profile.lower() == "aggressive":
-        adjustment = 0.05
-        if adjusted["debt"] >= adjustment:
-            adjusted["equity"] += adjustment
-            adjusted["debt"] -= adjustment
-    elif risk_profile.lower() == "conservative":
-        adjustment = 0.05
-        if adjusted["equity"] >= adjustment:
-            adjusted["equity"] -= adjustment
-            adjusted["liquid"] += adjustment
-    return normalize_allocation(adjusted)
 
-# =============================================================================
-# SIP Calculation using Future Value of Annuity Formula
-# =============================================================================
-def compute_sip(target_amount, target_years, expected_return):
+@app.post("/recommendation/simulate")
+def simulate_recommendations(user_input: dict):
     """
-    Calculate the required monthly SIP using:
-    
-      SIP = target_amount / [((1 + r/12)^(n) - 1) / (r/12)]
-      
-    where r is annual expected return and n is the total number of months.
+    /recommendation plus a Monte Carlo check of every goal: the probability
+    of reaching the target with the recommended SIP and allocation, and
+    corpus percentile bands (see goal_simulator.py). Optional body keys:
+    "paths" (default 10000) and "seed" (default 42).
     """
-    monthly_rate = expected_return / 12
-    n = target_years * 12
-    factor = ( (1 + monthly_rate)**n - 1 ) / monthly_rate
-    if factor == 0:
-        return 0
-    sip = target_amount / factor
-    return round(sip, 2)
+    try:
+        paths = int(user_input.get("paths", DEFAULT_PATHS))
+        seed = int(user_input.get("seed", DEFAULT_SEED))
+        result = generate_recommendations(user_input)
+        for goal in result["goals"]:
+            goal["simulation"] = simulate_recommendation(goal, paths=paths, seed=seed)
+        return result
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 # =============================================================================
-# Generate Personalized Recommendation for a Single Goal
+# Upload ingestion
 # =============================================================================
-def generate_recommendation_for_goal(goal_input, risk_profile):
-
-    target_amount = goal_input.get("target_amount")
-    target_years = goal_input.get("target_years")
-
-    # ✅ HARD GUARD
-    if target_amount is None or target_years is None:
-        return {
-            "goal_name": goal_input.get("goal_name", "general"),
-            "base_plan": "General Planning",
-            "recommendation": "General financial advice based on risk profile",
-            "risk_profile": risk_profile,
-            "note": "No goal amount or duration provided, skipping goal-based calculations"
-        }
-
-    # ---------------- normal logic below ----------------
-
-    base_plan = get_base_plan(goal_input["goal_name"], risk_profile)
-    base_alloc = base_plan["default_allocation"]
-    expected_return = base_plan["expected_return"]
-    ideal_holding_numeric = base_plan["ideal_holding"]
-
-    adjusted_alloc = adjust_for_time_horizon(
-        base_alloc,
-        target_years,
-        ideal_holding_numeric
-    )
-
-    final_alloc = adjust_for_risk(adjusted_alloc, risk_profile)
-    final_alloc = normalize_allocation(final_alloc)
-
-    recommended_sip = compute_sip(
-        target_amount,
-        target_years,
-        expected_return
-    )
-
-    return {
-        "goal_name": goal_input["goal_name"],
-        "base_plan": base_plan["plan_name"],
-        "ideal_holding": f"{ideal_holding_numeric}+ years",
-        "adjusted_allocation": final_alloc,
-        "target_amount": target_amount,
-        "target_horizon_years": target_years,
-        "recommended_sip": recommended_sip,
-        "expected_return": f"{expected_return*100:.0f}% p.a."
-    }
+def parse_upload(file: UploadFile):
     """
-    goal_input: dict with keys:
-        - goal_name: e.g., "Joint Savings for Home Purchase" or "Emergency Fund"
-        - target_amount: numeric value (e.g., 2000000 for ₹2,000,000)
-        - target_years: numeric (e.g., 4)
-    risk_profile: overall user's risk profile: "aggressive", "moderate", or "conservative".
-    
-    Returns a dictionary with:
-      - goal_name
-      - base_plan (name)
-      - ideal_holding (string with '+' notation)
-      - adjusted_allocation (asset percentages)
-      - target_amount
-      - target_horizon_years
-      - recommended_sip (monthly contribution)
-      - expected_return (string with percentage and "p.a.")
-      - rationale (text explaining adjustments)
+    Parse an uploaded statement directly from its (in-memory or spooled)
+    stream, reusing the cached parse when the same bytes were uploaded
+    before. Returns (statement, size_in_bytes).
     """
-    # Get base plan using the goal name and risk profile
-    base_plan = get_base_plan(goal_input["goal_name"], risk_profile)
-    base_alloc = base_plan["default_allocation"]
-    expected_return = base_plan["expected_return"]
-    ideal_holding_numeric = base_plan["ideal_holding"]
-    
-    # Map ideal holding to string for output:
-    ideal_holding_str = {
-        3: "3+ years",
-        5: "5+ years",
-        2: "2+ years",
-        4: "4+ years"
-    }.get(ideal_holding_numeric, f"{ideal_holding_numeric}+ years")
-    
-    rationale_parts = []
-    rationale_parts.append(f"Base plan '{base_plan['plan_name']}' with default allocation {base_alloc} and expected return {expected_return*100:.0f}% was selected.")
-    
-    # Adjust allocation for time horizon
-    adjusted_alloc = adjust_for_time_horizon(base_alloc, goal_input["target_years"], ideal_holding_numeric)
-    diff = ideal_holding_numeric - goal_input["target_years"]
-    if diff > 0:
-        rationale_parts.append(f"Target horizon ({goal_input['target_years']} yrs) is shorter than ideal holding period ({ideal_holding_numeric}+ yrs); reduced equity by {diff*5:.0f}% and increased liquid assets accordingly.")
-    elif diff < 0:
-        rationale_parts.append(f"Target horizon ({goal_input['target_years']} yrs) is longer than ideal; increased equity by {abs(diff)*2:.0f}% for additional growth.")
-    
-    # Apply risk adjustment
-    final_alloc = adjust_for_risk(adjusted_alloc, risk_profile)
-    if risk_profile.lower() == "aggressive":
-        rationale_parts.append("Aggressive risk profile: increased equity by 5% and reduced debt by 5%.")
-    elif risk_profile.lower() == "conservative":
-        rationale_parts.append("Conservative risk profile: decreased equity by 5% and increased liquid assets by 5%.")
-    else:
-        rationale_parts.append("Moderate risk profile: minimal adjustments applied.")
-    
-    final_alloc = normalize_allocation(final_alloc)
-    
-    # Calculate SIP using the expected return from the base plan.
-    recommended_sip = compute_sip(goal_input["target_amount"], goal_input["target_years"], expected_return)
-    
-    rationale = " ".join(rationale_parts)
-    
-    return {
-        "goal_name": goal_input["goal_name"],
-        "base_plan": base_plan["plan_name"],
-        "ideal_holding": ideal_holding_str,
-        "adjusted_allocation": final_alloc,
-        "target_amount": goal_input["target_amount"],
-        "target_horizon_years": goal_input["target_years"],
-        "recommended_sip": recommended_sip,
-        "expected_return": f"{expected_return*100:.0f}% p.a.",
-        "rationale": rationale
-    }
-
-# =============================================================================
-# Generate Recommendations for Multiple Goals
-# =============================================================================
-def generate_recommendations(user_input):
-    recommendations = []
-
-    # ✅ SAFE access (goals is optional)
-    goals = user_input.get("goals")
-
-    risk_profile = user_input.get("risk_profile", "moderate")
-
-    # ✅ If no goals provided → general recommendation
-    if not goals:
-        rec = generate_recommendation_for_goal(
-            {
-                "goal_name": "general_financial_planning",
-                "target_amount": None,
-                "target_years": None
-            },
-            risk_profile
-        )
-        recommendations.append(rec)
-    else:
-        for goal in goals:
-            rec = generate_recommendation_for_goal(goal, risk_profile)
-            recommendations.append(rec)
-
-    return {
-        "user_id": user_input.get("user_id"),
-        "goals": recommendations
-    }
+    stream = file.file
+    stream.seek(0, os.SEEK_END)
+    file_size = stream.tell()
+    stream.seek(0)
+    return parse_statement_cached(stream), file_size
 
-        
-@app.post("/recommendation")
-def get_recommendation(user_input: dict):
-    try:
-        print("Received request at /recommendation endpoint")
-        print("Request body:", user_input)
-        print("Request type:", type(user_input))
-        print("Request keys:", user_input.keys() if isinstance(user_input, dict) else "Not a dictionary")
-        
-        result = generate_recommendations(user_input)
-        print("Generated recommendations:", result)
-        return result
-    except Exception as e:
-        print("Error in recommendation endpoint:", str(e))
-        raise HTTPException(status_code=400, detail=str(e))
 # Health check endpoints
 @app.get("/health")
 async def health_check():
@@ -403,42 +182,29 @@ async def health_check():
 
 @app.get("/service-status")
 async def service_status():
-    return {"status": "operational", "timestamp": time.time()}
+    return {"status": "operational", "timestamp": time.time(), "llm_cache": response_cache.stats()}
 
 @app.post("/hello")
 async def hello_world(file: UploadFile = File(...)):
     try:
         logger.info(f"Receiving file: {file.filename}")
         
-        # Create uploads directory if it doesn't exist
-        os.makedirs("uploads", exist_ok=True)
-        
-        # Read file in chunks to avoid memory issues with large files
-        file_size = 0
-        file_path = f"uploads/data.csv"
-        
-        with open(file_path, "wb") as buffer:
-            # Read and write in chunks of 1MB
-            chunk_size = 1024 * 1024  # 1MB
-            while True:
-                chunk = await file.read(chunk_size)
-                if not chunk:
-                    break
-                buffer.write(chunk)
-                file_size += len(chunk)
-                
-        logger.info(f"File saved successfully: {file.filename}, size: {file_size} bytes at {file_path}")
+        # Parse straight from the spooled upload stream (nothing is written
+        # to a shared path on disk, so concurrent uploads cannot collide)
+        statement, file_size = await run_in_threadpool(parse_upload, file)
+        logger.info(f"File parsed successfully: {file.filename}, size: {file_size} bytes")
         
-        # Process the uploaded file with analyze_transactions_api function
+        # Numbers in a worker thread, then the life event (the advisory
+        # narrative is not part of this response)
         logger.info("Starting transaction analysis and life event detection...")
-        analysis_result = analyze_transactions_api()
+        analysis = await run_in_threadpool(api_analysis, statement=statement)
+        analysis_result = await life_event_analysis_async(analysis)
         # Log and print the life event detection results
-        if "event_detection" in analysis_result and "eventName" in analysis_result["event_detection"]:
-            event_name = analysis_result["event_detection"]["eventName"]
-            reasoning = analysis_result["event_detection"]["reasoning"]
-            logger.info(f"Life event detected: {event_name}")
-            print(f"Life Event Detection: {event_name}")
-            print(f"Reasoning: {reasoning}")
+        life_event = analysis_result["life_event"]
+        if life_event["event"] != "none":
+            logger.info(f"Life event detected: {life_event['event']}")
+            print(f"Life Event Detection: {life_event['event']}")
+            print(f"Reasoning: {life_event['reason']}")
         else:
             logger.info("No clear life event detected")
             print("No clear life event detected in the data")
@@ -447,7 +213,6 @@ async def hello_world(file: UploadFile = File(...)):
             "message": "File uploaded and analyzed successfully", 
             "filename": file.filename,
             "size": file_size,
-            "path": file_path,
             "analysis_result": analysis_result
         }
         
@@ -457,17 +222,7 @@ async def hello_world(file: UploadFile = File(...)):
     
 from fastapi import Form
 
-import requests
-
-def generate_full_ai_report(analysis_payload: dict, risk_percentage: int):
-    """
-    Generates a fully AI-written, structured financial report using Sarvam AI
-    """
-
-    SARVAM_API_KEY = os.environ.get("SARVAM_API_KEY")
-    if not SARVAM_API_KEY:
-        raise Exception("SARVAM_API_KEY not set")
-
+def _full_report_request(analysis_payload: dict, risk_percentage: int) -> dict:
     prompt = f"""
 You are a senior personal finance analyst for Indian users.
 
@@ -488,7 +243,7 @@ STRICT RULES:
 Risk preference (0–100): {risk_percentage}
 
 ANALYSIS DATA:
-{json.dumps(analysis_payload, indent=2)}
+{json.dumps({k: v for k, v in analysis_payload.items() if k not in LOCAL_SECTIONS}, indent=2)}
 
 Return STRICT JSON ONLY in this format:
 
@@ -514,28 +269,17 @@ Return STRICT JSON ONLY in this format:
 }}
 """
 
-    response = requests.post(
-        "https://api.sarvam.ai/v1/chat/completions",
-        headers={
-            "Authorization": f"Bearer {SARVAM_API_KEY}",
-            "Content-Type": "application/json"
-        },
-        json={
-            "model": "sarvam-m",
-            "messages": [
-                {"role": "system", "content": "You are a careful financial analyst."},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": 0.3
-        },
-        timeout=60
-    )
-
-    if response.status_code != 200:
-        raise Exception(f"Sarvam API error: {response.text}")
+    return {
+        "model": "sarvam-m",
+        "messages": [
+            {"role": "system", "content": "You are a careful financial analyst."},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": 0.3
+    }
 
-    raw_text = response.json()["choices"][0]["message"]["content"]
 
+def _full_report_result(raw_text: str) -> dict:
     try:
         return json.loads(raw_text)
     except Exception:
@@ -550,6 +294,83 @@ Return STRICT JSON ONLY in this format:
         }
 
 
+async def generate_full_ai_report(analysis_payload: dict, risk_percentage: int):
+    """
+    Generates a fully AI-written, structured financial report using Sarvam AI
+    """
+
+    SARVAM_API_KEY = os.environ.get("SARVAM_API_KEY")
+    if not SARVAM_API_KEY:
+        raise Exception("SARVAM_API_KEY not set")
+
+    try:
+        raw_text = await chat_completion_async(
+            _full_report_request(analysis_payload, risk_percentage),
+            timeout=60
+        )
+    except httpx.HTTPStatusError as e:
+        raise Exception(f"Sarvam API error: {e.response.text}")
+
+    return _full_report_result(raw_text)
+
+
+_SECTIONS_START = re.compile(r'"sections"\s*:\s*\[')
+_json_decoder = json.JSONDecoder()
+
+
+def _completed_sections(raw_text: str, pos: int):
+    """
+    Section objects of the report JSON that are complete in the text
+    streamed so far, starting at `pos` (0 before the sections array was
+    found). Returns (sections, position to resume from).
+    """
+    if not pos:
+        match = _SECTIONS_START.search(raw_text)
+        if not match:
+            return [], 0
+        pos = match.end()
+
+    sections = []
+    while True:
+        while pos < len(raw_text) and raw_text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(raw_text) or raw_text[pos] != "{":
+            return sections, pos
+        try:
+            section, end = _json_decoder.raw_decode(raw_text, pos)
+        except json.JSONDecodeError:
+            return sections, pos
+        sections.append(section)
+        pos = end
+
+
+async def stream_full_ai_report(analysis_payload: dict, risk_percentage: int):
+    """
+    generate_full_ai_report as it is written: yields ("ai_report_delta",
+    {"text": ...}) for every streamed piece, ("ai_report_section", section)
+    as each section object completes, then ("ai_report", report).
+    """
+    if not os.environ.get("SARVAM_API_KEY"):
+        raise Exception("SARVAM_API_KEY not set")
+
+    parts = []
+    pos = 0
+    try:
+        async for piece in chat_completion_stream_async(
+            _full_report_request(analysis_payload, risk_percentage),
+            timeout=60
+        ):
+            parts.append(piece)
+            yield "ai_report_delta", {"text": piece}
+            sections, pos = _completed_sections("".join(parts), pos)
+            for section in sections:
+                yield "ai_report_section", section
+    except httpx.HTTPStatusError as e:
+        raise Exception(f"Sarvam API error: {e.response.text}")
+
+    yield "ai_report", _full_report_result("".join(parts))
+
+
 def make_json_safe(obj):
     if isinstance(obj, dict):
         return {k: make_json_safe(v) for k, v in obj.items()}
@@ -567,38 +388,96 @@ def make_json_safe(obj):
 
 
 
+# ================= DASHBOARD METRICS =================
+def dashboard_metrics(sip_recommendation: dict, net_savings: float, risk: int) -> dict:
+    if sip_recommendation["sip_amount"] <= 500:
+         investment_readiness = "Low"
+    elif sip_recommendation["sip_amount"] < 30000:
+         investment_readiness = "Medium"
+    else:
+         investment_readiness = "High"
+
+    if net_savings >= 0:
+         cash_flow_health = "Stable"
+    else:
+        cash_flow_health = "Stressed"
+
+    risk_exposure = (
+        "Low" if risk < 35 else
+        "Moderate" if risk < 70 else
+        "High"
+    )
+
+    return {
+        "cash_flow_health": cash_flow_health,
+        "risk_exposure": risk_exposure,
+        "investment_readiness": investment_readiness
+    }
+
+
+# ---- Incremental analysis history ----
+# Repeat uploads can re-aggregate only the months that changed (see
+# incremental.py). A history is started here and identified by the opaque
+# token returned; /analyze and /analyze/stream take it as `history_token`.
+
+def _check_history(history_token):
+    if not history_token:
+        return
+    if not INCREMENTAL_ENABLED:
+        raise HTTPException(status_code=400, detail="Incremental analysis is disabled.")
+    if history_token not in incremental_store:
+        raise HTTPException(status_code=404, detail="Analysis history not found or expired.")
+
+
+@app.post("/analyze/history")
+def start_analysis_history():
+    if not INCREMENTAL_ENABLED:
+        raise HTTPException(status_code=404, detail="Incremental analysis is disabled.")
+    return {"history_token": incremental_store.create()}
+
+
+@app.delete("/analyze/history/{history_token}")
+def end_analysis_history(history_token: str):
+    if not incremental_store.forget(history_token):
+        raise HTTPException(status_code=404, detail="Analysis history not found or expired.")
+    return {"deleted": True}
+
+
 @app.post("/analyze")
 async def analyze_bank_statement(
     file: UploadFile = File(...),
     risk: int = Form(50),
+    history_token: str = Form(None),
 ):
     if not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="Only CSV files supported")
-
-    os.makedirs("uploads", exist_ok=True)
-    file_path = f"uploads/{file.filename}"
-
-    with open(file_path, "wb") as f:
-        f.write(await file.read())
+    _check_history(history_token)
 
     try:
-        analysis_payload = analyze_transactions_api(
-            csv_path=file_path,
-            risk=risk
+        # Parse once, straight from the upload stream; analysis and tax
+        # snapshot share the same frame
+        statement, _ = await run_in_threadpool(parse_upload, file)
+
+        analysis = await run_in_threadpool(
+            api_analysis,
+            statement=statement,
+            history_token=history_token,
+            sections=API_SECTIONS + REPORT_DATA_SECTIONS
         )
+        report_data = {name: analysis.pop(name) for name in REPORT_DATA_SECTIONS}
 
-        tax_snapshot = extract_tax_snapshot(file_path)
+        # The tax snapshot runs alongside life event -> full report (see
+        # _report_input)
+        (analysis_payload, ai_report), tax_snapshot = await asyncio.gather(
+            _life_event_then_report(analysis, risk),
+            run_in_threadpool(tax_snapshot_from_statement, statement),
+        )
 
         life_event = analysis_payload.get("life_event", {
             "event": "Not detected",
-            "confidence": "N/A"
+            "confidence": None
         })
 
-        ai_report = generate_full_ai_report(
-            analysis_payload=analysis_payload,
-            risk_percentage=risk
-        )
-
         sip_recommendation = analysis_payload.get(
             "sip_recommendation",
             {
@@ -607,39 +486,17 @@ async def analyze_bank_statement(
             }
         )
 
-     # ================= DASHBOARD METRICS =================
-
-        if sip_recommendation["sip_amount"] <= 500:
-             investment_readiness = "Low"
-        elif sip_recommendation["sip_amount"] < 30000:
-             investment_readiness = "Medium"
-        else:
-             investment_readiness = "High"
-
         net_savings = analysis_payload.get("cash_flow", {}).get("net_savings", 0)
 
-        if net_savings >= 0:
-             cash_flow_health = "Stable"
-        else:
-            cash_flow_health = "Stressed"
-
-
-        risk_exposure = (
-            "Low" if risk < 35 else
-            "Moderate" if risk < 70 else
-            "High"
-        )
-
         response = {
     "life_event": life_event,
     "ai_report": ai_report,
     "sip_recommendation": sip_recommendation,
     "tax_snapshot": tax_snapshot,
-    "dashboard_metrics": {
-        "cash_flow_health": cash_flow_health,
-        "risk_exposure": risk_exposure,
-        "investment_readiness": investment_readiness
-    }
+    "dashboard_metrics": dashboard_metrics(sip_recommendation, net_savings, risk),
+    # Structured data for report chat lookups (report_answers.py)
+    "monthly_summary": analysis["monthly_summary"],
+    **report_data
 }
 
         return make_json_safe(response)
@@ -649,6 +506,232 @@ async def analyze_bank_statement(
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
     
+def _report_input(analysis: dict, narrated: dict) -> dict:
+    """
+    What the full report is written from: the deterministic analysis plus
+    the detected life event, SIP recommendation and SIP analysis, so the
+    report still sees the event and SIP context it used to get from the
+    narrated payload. The old facts -> advisory summary of the monthly
+    numbers is not needed: the report gets the numbers themselves.
+    """
+    return {**analysis, **narrated}
+
+
+async def _life_event_then_report(analysis: dict, risk: int):
+    """
+    (narrated life event / SIP, full report). The life event is scored
+    locally unless ambiguous, so the report usually starts straight away.
+    """
+    narrated = await life_event_analysis_async(analysis, risk=risk)
+    ai_report = await generate_full_ai_report(
+        analysis_payload=_report_input(analysis, narrated),
+        risk_percentage=risk
+    )
+    return narrated, ai_report
+
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(make_json_safe(data))}\n\n"
+
+
+async def _analysis_events(statement, analysis: dict, risk: int):
+    """
+    The /analyze response as (event, data) pairs in the order the parts
+    become ready. Deterministic numbers come first; the SIP depends on the
+    life event, so the first sip_recommendation / dashboard_metrics assume
+    no event and are re-sent if the detected event changes them.
+    """
+    net_savings = analysis.get("cash_flow", {}).get("net_savings", 0)
+    sip_recommendation = generate_sip_recommendation(
+        analysis["monthly_income"], analysis["monthly_expenses"], "none", risk
+    )
+    metrics = dashboard_metrics(sip_recommendation, net_savings, risk)
+    yield "sip_recommendation", sip_recommendation
+    yield "dashboard_metrics", metrics
+
+    # Every other stage feeds one queue, drained as items arrive
+    queue = asyncio.Queue()
+    # The report is written with the life event in view (see _report_input)
+    narrated_ready = asyncio.get_running_loop().create_future()
+
+    async def tax_stage():
+        await queue.put(("tax_snapshot", await run_in_threadpool(tax_snapshot_from_statement, statement)))
+
+    async def life_event_stage():
+        try:
+            narrated = await life_event_analysis_async(analysis, risk=risk)
+        except Exception:
+            narrated_ready.set_result({})
+            raise
+        narrated_ready.set_result(narrated)
+        await queue.put(("life_event", narrated["life_event"]))
+        if narrated["sip_recommendation"] != sip_recommendation:
+            await queue.put(("sip_recommendation", narrated["sip_recommendation"]))
+            revised = dashboard_metrics(narrated["sip_recommendation"], net_savings, risk)
+            if revised != metrics:
+                await queue.put(("dashboard_metrics", revised))
+
+    async def report_stage():
+        narrated = await narrated_ready
+        async for item in stream_full_ai_report(_report_input(analysis, narrated), risk):
+            await queue.put(item)
+
+    async def run(name, stage):
+        try:
+            await stage()
+        except Exception as e:
+            logger.error(f"Streaming stage {name} failed: {str(e)}")
+            await queue.put(("error", {"stage": name, "detail": str(e)}))
+        finally:
+            await queue.put(None)
+
+    stages = {"tax_snapshot": tax_stage, "life_event": life_event_stage, "ai_report": report_stage}
+    tasks = [asyncio.create_task(run(name, stage)) for name, stage in stages.items()]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            item = await queue.get()
+            if item is None:
+                remaining -= 1
+            else:
+                yield item
+    finally:
+        # Client gone or generator closed early: stop the upstream calls
+        for task in tasks:
+            task.cancel()
+
+
+@app.post("/analyze/stream")
+async def analyze_bank_statement_stream(
+    file: UploadFile = File(...),
+    risk: int = Form(50),
+    history_token: str = Form(None),
+):
+    """
+    /analyze as server-sent events: one event per response section as soon
+    as it is ready (monthly_summary, category_breakdown, sip_recommendation,
+    dashboard_metrics, tax_snapshot, life_event, ai_report), with the full
+    report also streamed as ai_report_delta / ai_report_section events while
+    it is written. A failed stage sends an error event; the stream ends with
+    a done event.
+    """
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files supported")
+    _check_history(history_token)
+
+    try:
+        statement, _ = await run_in_threadpool(parse_upload, file)
+        analysis = await run_in_threadpool(
+            api_analysis,
+            statement=statement,
+            history_token=history_token,
+            sections=API_SECTIONS + REPORT_DATA_SECTIONS
+        )
+        report_data = {name: analysis.pop(name) for name in REPORT_DATA_SECTIONS}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    async def events():
+        yield _sse("monthly_summary", analysis["monthly_summary"])
+        for name, data in report_data.items():
+            yield _sse(name, data)
+        async for event, data in _analysis_events(statement, analysis, risk):
+            yield _sse(event, data)
+        yield _sse("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/analyze/batch")
+async def analyze_bank_statements_batch(
+    files: List[UploadFile] = File(...),
+    risk: int = Form(50),
+    narrative: bool = Form(False),
+):
+    """
+    Analyses many statements in one request. The per-statement pipelines run
+    in parallel on the batch process pool (see batch.py); the LLM narrative
+    stages only run when `narrative` is set. At most MAX_BATCH_FILES files
+    and MAX_BATCH_BYTES in total per request.
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per batch")
+
+    uploads = []
+    remaining = MAX_BATCH_BYTES
+    for file in files:
+        if not file.filename.endswith(".csv"):
+            raise HTTPException(status_code=400, detail=f"Only CSV files supported: {file.filename}")
+        # Read one byte past the budget so an oversized batch is caught
+        # without reading the rest of it
+        data = await file.read(remaining + 1)
+        if len(data) > remaining:
+            raise HTTPException(status_code=413, detail=f"Batch larger than {MAX_BATCH_BYTES} bytes")
+        remaining -= len(data)
+        uploads.append((file.filename, data))
+
+    results = await analyze_batch(uploads, risk=risk, narrative=narrative)
+    return make_json_safe({
+        "count": len(results),
+        "failed": sum(1 for r in results if r["status"] != "ok"),
+        "results": results,
+    })
+
+
+@app.post("/tax/optimise")
+async def optimise_tax_deductions(
+    file: UploadFile = File(...),
+    steps: int = Form(DEFAULT_GRID_STEPS),
+    financial_year: str = Form(DEFAULT_FINANCIAL_YEAR),
+):
+    """
+    What-if sweep of extra 80C / 80D / home-loan interest on top of the
+    statement's tax snapshot (see tax_optimiser.py).
+    """
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files supported")
+    if not 2 <= steps <= 101:
+        raise HTTPException(status_code=400, detail="steps must be between 2 and 101")
+
+    try:
+        statement, _ = await run_in_threadpool(parse_upload, file)
+        result = await run_in_threadpool(optimise_deductions, statement, steps, financial_year)
+        return make_json_safe(result)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/life-events/timeline")
+async def life_events_timeline(
+    file: UploadFile = File(...),
+    window: int = Form(WINDOW_MONTHS),
+):
+    """
+    Dated life events across the statement, from every rolling window of
+    `window` months (see life_events.py).
+    """
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files supported")
+
+    try:
+        statement, _ = await run_in_threadpool(parse_upload, file)
+        timeline = await run_in_threadpool(statement_life_event_timeline, statement, window)
+        return make_json_safe({"window_months": window, "timeline": timeline})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.on_event("shutdown")
+async def stop_background_clients():
+    shutdown_pool()
+    close_client()
+    await close_async_client()
+
+
 from fastapi import Body
 
 @app.post("/report-chat")
@@ -659,9 +742,135 @@ def report_chat(payload: dict = Body(...)):
     if not question or not report:
         return {"response": "Invalid request."}
 
-    answer = report_chat_with_sarvam(report, question)
+    answer, source = answer_report_question(report, question)
+
+    return {"response": answer, "source": source}
+
+
+@app.post("/report-chat/stream")
+async def report_chat_stream(payload: dict = Body(...)):
+    """
+    /report-chat as server-sent events: a token event ({"text": ...}) per
+    piece of the answer as Sarvam generates it, then a done event with the
+    full response and its source. Factual lookups answered locally come as
+    a single token. If the client disconnects the upstream call is dropped.
+    """
+    question = payload.get("message")
+    report = payload.get("report")
+
+    if not question or not report:
+        raise HTTPException(status_code=400, detail="Invalid request.")
+
+    async def events():
+        local = answer_locally(report, question)
+        if local is not None:
+            yield _sse("token", {"text": local})
+            yield _sse("done", {"response": local, "source": "local"})
+            return
+
+        parts = []
+        try:
+            async for piece in stream_report_chat(report, question):
+                parts.append(piece)
+                yield _sse("token", {"text": piece})
+        except Exception as e:
+            # The response has already started, so failures can only be
+            # reported in-stream
+            logger.error(f"Report chat stream failed: {str(e)}")
+            yield _sse("error", {"detail": str(e)})
+            return
+        yield _sse("done", {"response": "".join(parts), "source": "llm"})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# =============================================================================
+# Report chat sessions
+# =============================================================================
+# The report is posted once to /report-chat/session; each turn then sends
+# only {"message": ...} to /report-chat/session/{session_id} (see
+# report_sessions.py for expiry and history limits).
+
+def _chat_session(session_id: str):
+    session = get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+    return session
+
+
+@app.post("/report-chat/session")
+def start_report_chat_session(payload: dict = Body(...)):
+    report = payload.get("report")
+    if not report:
+        raise HTTPException(status_code=400, detail="Invalid request.")
+    return {"session_id": create_session(report), "expires_in": SESSION_TTL_SECONDS}
+
+
+@app.post("/report-chat/session/{session_id}")
+def report_chat_session(session_id: str, payload: dict = Body(...)):
+    question = payload.get("message")
+    if not question:
+        raise HTTPException(status_code=400, detail="Invalid request.")
+
+    session = _chat_session(session_id)
+    answer, source = answer_report_question(
+        session["report"], question, list(session["history"]), session["summary"]
+    )
+    record_turn(session, question, answer)
+
+    return {"response": answer, "source": source, "session_id": session_id}
+
+
+@app.post("/report-chat/session/{session_id}/stream")
+async def report_chat_session_stream(session_id: str, payload: dict = Body(...)):
+    """
+    Streaming report_chat_session, with the same events as
+    /report-chat/stream. The turn is only added to the history once the
+    answer completed.
+    """
+    question = payload.get("message")
+    if not question:
+        raise HTTPException(status_code=400, detail="Invalid request.")
+
+    session = _chat_session(session_id)
+
+    async def events():
+        answer = answer_locally(session["report"], question)
+        source = "local"
+        if answer is not None:
+            yield _sse("token", {"text": answer})
+        else:
+            parts = []
+            try:
+                async for piece in stream_report_chat(
+                    session["report"], question, list(session["history"]), session["summary"]
+                ):
+                    parts.append(piece)
+                    yield _sse("token", {"text": piece})
+            except Exception as e:
+                logger.error(f"Report chat stream failed: {str(e)}")
+                yield _sse("error", {"detail": str(e)})
+                return
+            answer, source = "".join(parts), "llm"
+        record_turn(session, question, answer)
+        yield _sse("done", {"response": answer, "source": source, "session_id": session_id})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 
-    return {"response": answer}
+@app.delete("/report-chat/session/{session_id}")
+def end_report_chat_session(session_id: str):
+    if not delete_session(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found or expired.")
+    return {"status": "deleted"}
 
 # =============================================================================
 # Example Usage & Expected Output
@@ -0,0 +1,198 @@
+# server/merchant_keys.py
+
+import threading
+
+import numpy as np
+import pandas as pd
+
+# =============================================================================
+# Merchant key normalisation
+# =============================================================================
+# Raw narrations carry per-transaction noise: UPI/NEFT/IMPS reference numbers,
+# dates, VPA handles, IFSC codes and channel prefixes, e.g.
+#   "UPI/471007221478/RAJ KIRANA/okaxis"                -> "raj kirana"
+#   "UPI-SWIGGY-SWIGGY@ICICI-ICIC0000103-412345678901"  -> "swiggy"
+#   "NEFT/ACME CORP SALARY/575314301269"                -> "acme corp salary"
+#   "POS AMAZON 138227633838"                           -> "amazon"
+# Grouping on the raw string makes nearly every row its own group, so
+# recurring payments are missed. merchant_keys() cuts the narration at those
+# ids and keys it on the first segment that names something other than the
+# channel, with a few vectorised regex passes over the *distinct* narrations
+# only, and memoises raw -> key so repeat uploads mostly hit the cache.
+# Narrations made only of channel words and ids map to "unknown".
+
+CHANNEL_WORDS = [
+    "upi", "neft", "imps", "rtgs", "pos", "ach", "nach", "ecs", "atm", "mmt",
+    "bil", "billpay", "inft", "txn", "ref", "refno", "no", "to", "by", "from",
+    "trf", "transfer", "payment", "dr", "cr", "ib", "mb", "vps", "vin",
+    "wdl", "onl", "p2m", "p2a",
+]
+
+# Payment-app / bank handles that trail UPI narrations
+UPI_HANDLES = [
+    "okaxis", "okhdfcbank", "okicici", "oksbi", "ybl", "ibl", "axl",
+    "paytm", "apl", "upi", "icici", "hdfcbank", "sbi", "axisbank",
+]
+
+MAX_KEY_TOKENS = 3
+UNKNOWN_MERCHANT = "unknown"
+MAX_CACHE_SIZE = 500_000
+
+# Ids: VPAs (the handle after "@" is letters only, so a hyphen-delimited
+# narration is not swallowed whole), IFSC codes, UTR/RRN-style references (a
+# short bank prefix then a long digit run), masked card numbers, dates like
+# "01may24", pure digit runs and tokens that are mostly digits (four or more
+# digits, at most two letters). Names that merely contain digits ("7eleven",
+# "shop1234", "24x7") are kept.
+_IDS = (
+    r"[a-z0-9._]+@[a-z]+"
+    r"|\b[a-z]{4}0[a-z0-9]{6}\b"
+    r"|\b[a-z]{3,5}\d{8,}\b"
+    r"|\b\d*x{2,}\d+\b"
+    r"|\b\d{1,2}[a-z]{3}\d{2,4}\b"
+    r"|\b\d+\b"
+    r"|\b(?=(?:[a-z]*\d){4})\d*(?:[a-z]\d*){0,2}\b"
+)
+_SEGMENT_BREAK = "\x1f"
+_NOISE_WORDS = r"\b(?:" + "|".join(CHANNEL_WORDS + UPI_HANDLES) + r")\b"
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _strip_ids(raw: pd.Series) -> pd.Series:
+    """
+    Lowercases and replaces every id (see _IDS) with a segment break. Runs
+    on Arrow strings, so it stays cheap even when almost every narration is
+    distinct.
+    """
+    return (
+        raw.astype("string[pyarrow]")
+           .str.lower()
+           .str.replace(_IDS, _SEGMENT_BREAK, regex=True)
+    )
+
+
+def _first_tokens(text: pd.Series) -> pd.Series:
+    return text.str.split().str[:MAX_KEY_TOKENS].str.join(" ")
+
+
+def _normalise(stripped: pd.Series) -> pd.Series:
+    """
+    Key of each stripped narration: the first tokens of its first segment
+    that has any non-channel word, else "unknown".
+    """
+    segments = stripped.str.split(_SEGMENT_BREAK).explode()
+    words = (
+        segments.str.replace(r"[^a-z0-9]+", " ", regex=True)
+                .str.replace(_NOISE_WORDS, " ", regex=True)
+    )
+    keys = _first_tokens(words)
+    keys = keys[keys.str.len() > 0].groupby(level=0).first()
+    return keys.reindex(stripped.index, fill_value=UNKNOWN_MERCHANT)
+
+
+def merchant_key(raw) -> str:
+    return merchant_keys(pd.Series([raw])).iloc[0]
+
+
+def merchant_keys(details: pd.Series) -> pd.Series:
+    """
+    Normalised merchant key for every transaction detail, aligned with
+    `details`. Missing details map to "unknown".
+    """
+    codes, uniques = pd.factorize(details, use_na_sentinel=True)
+    uniques = pd.Series(uniques, dtype=object)
+
+    with _cache_lock:
+        cached = uniques.map(_cache).astype(object)
+    missing = cached.isna()
+    if missing.any():
+        # Once ids are gone most narrations collapse onto a few strings, so
+        # the remaining passes run on those only
+        stripped_codes, stripped = pd.factorize(_strip_ids(uniques[missing]))
+        computed = _normalise(pd.Series(stripped, dtype=object)).to_numpy(dtype=object)
+        cached[missing] = computed[stripped_codes]
+        with _cache_lock:
+            if len(_cache) + int(missing.sum()) > MAX_CACHE_SIZE:
+                _cache.clear()
+            _cache.update(zip(uniques[missing], cached[missing]))
+
+    keys = np.append(cached.to_numpy(dtype=object), UNKNOWN_MERCHANT)
+    # NaN details have code -1, which picks the trailing "unknown"
+    return pd.Series(keys[codes], index=details.index, dtype=object)
+
+
+# =============================================================================
+# Recurring merchants
+# =============================================================================
+
+def _periodicity(per_month, median_gap):
+    if median_gap >= 2.5:
+        return "quarterly" if median_gap < 4.5 else "irregular"
+    if median_gap > 1.5:
+        return "bi-monthly"
+    if per_month >= 3.5:
+        return "weekly"
+    if per_month >= 1.8:
+        return "fortnightly"
+    return "monthly"
+
+
+def recurring_merchants(merchant_months: pd.DataFrame, min_months: int = 3) -> list:
+    """
+    merchant_months: one row per (merchant, monthyear) with `DetailCount`
+    (rows) and `amount` (sum of absolute amounts).
+
+    Returns merchants active in at least `min_months` distinct months, with
+    their periodicity and how much the monthly spend drifted between the
+    first and last active month. Rows keyed "unknown" (ATM withdrawals,
+    channel-only narrations) are not one merchant and are left out.
+    """
+    if merchant_months is None or merchant_months.empty:
+        return []
+
+    merchant_months = merchant_months[merchant_months["merchant"] != UNKNOWN_MERCHANT]
+    mm = merchant_months.sort_values(["merchant", "monthyear"]).reset_index(drop=True)
+    month_number = mm["monthyear"].dt.year * 12 + mm["monthyear"].dt.month
+    gap = month_number.diff().where(mm["merchant"].eq(mm["merchant"].shift()))
+
+    per_merchant = pd.DataFrame({
+        "merchant": mm["merchant"],
+        "DetailCount": mm["DetailCount"],
+        "amount": mm["amount"],
+        "gap": gap,
+    }).groupby("merchant", sort=False).agg(
+        months_active=("DetailCount", "size"),
+        occurrences=("DetailCount", "sum"),
+        total_amount=("amount", "sum"),
+        first_amount=("amount", "first"),
+        last_amount=("amount", "last"),
+        median_gap=("gap", "median"),
+    )
+    per_merchant = per_merchant[per_merchant["months_active"] >= min_months]
+    if per_merchant.empty:
+        return []
+
+    per_month = per_merchant["occurrences"] / per_merchant["months_active"]
+    drift = (
+        (per_merchant["last_amount"] - per_merchant["first_amount"])
+        / per_merchant["first_amount"].replace(0, np.nan)
+    ) * 100
+
+    result = pd.DataFrame({
+        "merchant": per_merchant.index,
+        "months_active": per_merchant["months_active"].to_numpy(),
+        "occurrences": per_merchant["occurrences"].to_numpy(),
+        "periodicity": [
+            _periodicity(p, g) for p, g in zip(per_month, per_merchant["median_gap"].fillna(1))
+        ],
+        "avg_amount": (per_merchant["total_amount"] / per_merchant["occurrences"]).round(2).to_numpy(),
+        "amount_drift_pct": drift.round(1).to_numpy(),
+    }).sort_values(["months_active", "occurrences"], ascending=False)
+
+    records = result.to_dict(orient="records")
+    for record in records:
+        if pd.isna(record["amount_drift_pct"]):
+            record["amount_drift_pct"] = None
+    return records
@@ -0,0 +1,393 @@
+# server/recommendation.py
+
+from functools import lru_cache
+
+import numpy as np
+
+# =============================================================================
+# Base Plan Library (Dezerv Plans)
+# =============================================================================
+# Each base plan includes:
+# - plan_name: Name of the plan.
+# - default_allocation: Dummy percentages for each asset class.
+# - expected_return: Annual expected return (as decimal, e.g., 0.12 for 12%).
+# - ideal_holding: Ideal holding period in years (numeric).
+base_plans = [
+    {
+        "plan_name": "Equity Revival",
+        "default_allocation": {"equity": 0.65, "debt": 0.25, "gold": 0.05, "liquid": 0.05},
+        "expected_return": 0.12,
+        "ideal_holding": 3  # Ideal holding: 3+ years
+    },
+    {
+        "plan_name": "Alpha Focused",
+        "default_allocation": {"equity": 0.80, "debt": 0.10, "gold": 0.05, "liquid": 0.05},
+        "expected_return": 0.15,
+        "ideal_holding": 5  # Ideal holding: 5+ years
+    },
+    {
+        "plan_name": "Dynamic Debt +",
+        "default_allocation": {"equity": 0.10, "debt": 0.80, "gold": 0.05, "liquid": 0.05},
+        "expected_return": 0.11,
+        "ideal_holding": 2  # Ideal holding: 2+ years
+    },
+    {
+        "plan_name": "Private Credit AIF",
+        "default_allocation": {"equity": 0.0, "debt": 0.95, "gold": 0.0, "liquid": 0.05},
+        "expected_return": 0.10,
+        "ideal_holding": 4  # Ideal holding: 4+ years
+    }
+]
+
+# =============================================================================
+# Mapping Goal Names to Base Plans
+# =============================================================================
+def get_base_plan(goal_name, risk_profile):
+    """
+    Map a goal (by its name) to a base plan.
+    For example:
+      - If goal name contains "Home Purchase", use Equity Revival.
+      - If goal name contains "Emergency Fund", use Dynamic Debt +.
+      - If goal name contains "Child Education", then if risk is aggressive use Alpha Focused;
+        otherwise use Equity Revival.
+      - If goal name contains "Car", use Dynamic Debt +.
+      - Else default to Equity Revival.
+    """
+    goal_lower = goal_name.lower()
+    if "home purchase" in goal_lower or "joint savings" in goal_lower:
+        return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
+    elif "emergency fund" in goal_lower:
+        return next(plan for plan in base_plans if plan["plan_name"] == "Dynamic Debt +")
+    elif "child education" in goal_lower:
+        if risk_profile.lower() == "aggressive":
+            return next(plan for plan in base_plans if plan["plan_name"] == "Alpha Focused")
+        else:
+            return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
+    elif "car" in goal_lower:
+        return next(plan for plan in base_plans if plan["plan_name"] == "Dynamic Debt +")
+    else:
+        return next(plan for plan in base_plans if plan["plan_name"] == "Equity Revival")
+
+# =============================================================================
+# Utility: Normalize Allocation Dictionary
+# =============================================================================
+def normalize_allocation(allocation):
+    total = sum(allocation.values())
+    if total == 0:
+        return allocation
+    return {k: round(v / total, 2) for k, v in allocation.items()}
+
+# =============================================================================
+# Time Horizon Adjustment
+# =============================================================================
+def adjust_for_time_horizon(allocation, target_years, ideal_holding):
+    """
+    Adjust allocation based on the difference between the ideal holding period and the user's target horizon.
+    
+    Rule:
+      - If target horizon is shorter than ideal (diff > 0), reduce equity by 5% per year difference,
+        and add that percentage to liquid assets.
+      - If target horizon is longer than ideal, increase equity by 2% per extra year and reduce debt by same.
+    """
+    diff = ideal_holding - target_years  # positive if target is shorter
+    adjusted = allocation.copy()
+    if diff > 0:
+        reduction = min(diff * 0.05, adjusted["equity"])  # cap reduction to available equity
+        adjusted["equity"] -= reduction
+        adjusted["liquid"] += reduction
+    elif diff < 0:
+        increase = abs(diff) * 0.02  # add 2% per extra year
+        reduction_from_debt = min(increase, adjusted["debt"])
+        adjusted["equity"] += increase
+        adjusted["debt"] -= reduction_from_debt
+    return normalize_allocation(adjusted)
+
+# =============================================================================
+# Risk Profile Adjustment
+# =============================================================================
+def adjust_for_risk(allocation, risk_profile):
+    """
+    Adjust allocation based on risk profile:
+      - Aggressive: Increase equity by 5% (reduce debt by 5%).
+      - Conservative: Decrease equity by 5% (increase liquid by 5%).
+      - Moderate: No change.
+    """
+    adjusted = allocation.copy()
+    if risk_profile.lower() == "aggressive":
+        adjustment = 0.05
+        if adjusted["debt"] >= adjustment:
+            adjusted["equity"] += adjustment
+            adjusted["debt"] -= adjustment
+    elif risk_profile.lower() == "conservative":
+        adjustment = 0.05
+        if adjusted["equity"] >= adjustment:
+            adjusted["equity"] -= adjustment
+            adjusted["liquid"] += adjustment
+    return normalize_allocation(adjusted)
+
+# =============================================================================
+# SIP Calculation using Future Value of Annuity Formula
+# =============================================================================
+def compute_sip(target_amount, target_years, expected_return):
+    """
+    Calculate the required monthly SIP using:
+    
+      SIP = target_amount / [((1 + r/12)^(n) - 1) / (r/12)]
+      
+    where r is annual expected return and n is the total number of months.
+    """
+    monthly_rate = expected_return / 12
+    n = target_years * 12
+    factor = ( (1 + monthly_rate)**n - 1 ) / monthly_rate
+    if factor == 0:
+        return 0
+    sip = target_amount / factor
+    return round(sip, 2)
+
+# =============================================================================
+# Generate Personalized Recommendation for a Single Goal
+# =============================================================================
+def generate_recommendation_for_goal(goal_input, risk_profile):
+    """
+    goal_input: dict with keys:
+        - goal_name: e.g., "Joint Savings for Home Purchase" or "Emergency Fund"
+        - target_amount: numeric value (e.g., 2000000 for ₹2,000,000)
+        - target_years: numeric (e.g., 4)
+    risk_profile: overall user's risk profile: "aggressive", "moderate", or "conservative".
+
+    Returns a dictionary with:
+      - goal_name
+      - base_plan (name)
+      - ideal_holding (string with '+' notation)
+      - adjusted_allocation (asset percentages)
+      - target_amount
+      - target_horizon_years
+      - recommended_sip (monthly contribution)
+      - expected_return (string with percentage and "p.a.")
+    or, without a target amount or horizon, a general-planning note.
+    """
+    target_amount = goal_input.get("target_amount")
+    target_years = goal_input.get("target_years")
+
+    # ✅ HARD GUARD
+    if target_amount is None or target_years is None:
+        return {
+            "goal_name": goal_input.get("goal_name", "general"),
+            "base_plan": "General Planning",
+            "recommendation": "General financial advice based on risk profile",
+            "risk_profile": risk_profile,
+            "note": "No goal amount or duration provided, skipping goal-based calculations"
+        }
+
+    # ---------------- normal logic below ----------------
+
+    base_plan = get_base_plan(goal_input["goal_name"], risk_profile)
+    base_alloc = base_plan["default_allocation"]
+    expected_return = base_plan["expected_return"]
+    ideal_holding_numeric = base_plan["ideal_holding"]
+
+    adjusted_alloc = adjust_for_time_horizon(
+        base_alloc,
+        target_years,
+        ideal_holding_numeric
+    )
+
+    final_alloc = adjust_for_risk(adjusted_alloc, risk_profile)
+    final_alloc = normalize_allocation(final_alloc)
+
+    recommended_sip = compute_sip(
+        target_amount,
+        target_years,
+        expected_return
+    )
+
+    return {
+        "goal_name": goal_input["goal_name"],
+        "base_plan": base_plan["plan_name"],
+        "ideal_holding": f"{ideal_holding_numeric}+ years",
+        "adjusted_allocation": final_alloc,
+        "target_amount": target_amount,
+        "target_horizon_years": target_years,
+        "recommended_sip": recommended_sip,
+        "expected_return": f"{expected_return*100:.0f}% p.a."
+    }
+
+# =============================================================================
+# Generate Recommendations for Multiple Goals
+# =============================================================================
+def generate_recommendations(user_input):
+    recommendations = []
+
+    # ✅ SAFE access (goals is optional)
+    goals = user_input.get("goals")
+
+    risk_profile = user_input.get("risk_profile", "moderate")
+
+    # ✅ If no goals provided → general recommendation
+    if not goals:
+        rec = generate_recommendation_for_goal(
+            {
+                "goal_name": "general_financial_planning",
+                "target_amount": None,
+                "target_years": None
+            },
+            risk_profile
+        )
+        recommendations.append(rec)
+    else:
+        for goal in goals:
+            rec = generate_recommendation_for_goal(goal, risk_profile)
+            recommendations.append(rec)
+
+    return {
+        "user_id": user_input.get("user_id"),
+        "goals": recommendations
+    }
+
+# =============================================================================
+# Batch Goal Solver
+# =============================================================================
+# Same rules as generate_recommendation_for_goal, evaluated for every goal of
+# every client at once: plans come from a precomputed goal -> plan index,
+# allocations are an (n_goals x n_assets) array adjusted with masks, and the
+# SIP annuity formula runs over arrays. Rounding reproduces Python's round()
+# exactly so the output is identical to the per-goal path.
+
+ASSET_CLASSES = list(base_plans[0]["default_allocation"])
+
+PLAN_INDEX = {plan["plan_name"]: i for i, plan in enumerate(base_plans)}
+PLAN_ALLOCATIONS = np.array(
+    [[plan["default_allocation"][asset] for asset in ASSET_CLASSES] for plan in base_plans]
+)
+PLAN_RETURNS = np.array([plan["expected_return"] for plan in base_plans])
+PLAN_IDEAL_HOLDING = np.array([plan["ideal_holding"] for plan in base_plans])
+PLAN_LABELS = [
+    (plan["plan_name"], f"{plan['ideal_holding']}+ years", f"{plan['expected_return']*100:.0f}% p.a.")
+    for plan in base_plans
+]
+
+EQUITY, DEBT, LIQUID = (ASSET_CLASSES.index(a) for a in ("equity", "debt", "liquid"))
+
+
+@lru_cache(maxsize=4096)
+def _plan_for_goal(goal_name, risk_profile):
+    return PLAN_INDEX[get_base_plan(goal_name, risk_profile)["plan_name"]]
+
+
+def _round2(values):
+    """
+    Element-wise round(x, 2). np.round can differ from Python's round()
+    when x * 100 lands within float error of a .5 tie; those few entries
+    are rounded with round() itself.
+    """
+    rounded = np.round(values, 2)
+    scaled = values * 100
+    ties = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    if ties.any():
+        rounded[ties] = [round(float(v), 2) for v in values[ties]]
+    return rounded
+
+
+def _normalize_allocations(alloc):
+    total = alloc.sum(axis=1, keepdims=True)
+    safe_total = np.where(total == 0, 1, total)
+    return np.where(total == 0, alloc, _round2(alloc / safe_total))
+
+
+def _adjust_for_time_horizon(alloc, target_years, ideal_holding):
+    alloc = alloc.copy()
+    diff = ideal_holding - target_years
+
+    shorter = diff > 0
+    reduction = np.minimum(diff * 0.05, alloc[:, EQUITY])
+    alloc[shorter, EQUITY] -= reduction[shorter]
+    alloc[shorter, LIQUID] += reduction[shorter]
+
+    longer = diff < 0
+    increase = np.abs(diff) * 0.02
+    reduction_from_debt = np.minimum(increase, alloc[:, DEBT])
+    alloc[longer, EQUITY] += increase[longer]
+    alloc[longer, DEBT] -= reduction_from_debt[longer]
+    return _normalize_allocations(alloc)
+
+
+def _adjust_for_risk(alloc, risk_profiles):
+    alloc = alloc.copy()
+    aggressive = (risk_profiles == "aggressive") & (alloc[:, DEBT] >= 0.05)
+    alloc[aggressive, EQUITY] += 0.05
+    alloc[aggressive, DEBT] -= 0.05
+
+    conservative = (risk_profiles == "conservative") & (alloc[:, EQUITY] >= 0.05)
+    alloc[conservative, EQUITY] -= 0.05
+    alloc[conservative, LIQUID] += 0.05
+    return _normalize_allocations(alloc)
+
+
+def compute_sip_batch(target_amounts, target_years, expected_returns):
+    """
+    Vectorised compute_sip over arrays of goals.
+    """
+    monthly_rate = np.asarray(expected_returns, dtype=float) / 12
+    n = np.asarray(target_years, dtype=float) * 12
+    factor = ((1 + monthly_rate) ** n - 1) / monthly_rate
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sip = np.asarray(target_amounts, dtype=float) / factor
+    return np.where(factor == 0, 0, _round2(np.where(factor == 0, 0, sip)))
+
+
+def generate_recommendations_batch(user_inputs):
+    """
+    generate_recommendations for many users (e.g. an advisor's client book)
+    in one vectorised pass. Returns one result per user input, in order.
+    """
+    owners, goals, risks = [], [], []
+    results = []
+    for i, user_input in enumerate(user_inputs):
+        risk_profile = user_input.get("risk_profile", "moderate")
+        user_goals = user_input.get("goals") or [{
+            "goal_name": "general_financial_planning",
+            "target_amount": None,
+            "target_years": None
+        }]
+        results.append({"user_id": user_input.get("user_id"), "goals": [None] * len(user_goals)})
+        for j, goal in enumerate(user_goals):
+            owners.append((i, j))
+            goals.append(goal)
+            risks.append(risk_profile)
+
+    # Goals without an amount or horizon get the general recommendation
+    solvable = []
+    for (i, j), goal, risk_profile in zip(owners, goals, risks):
+        if goal.get("target_amount") is None or goal.get("target_years") is None:
+            results[i]["goals"][j] = generate_recommendation_for_goal(goal, risk_profile)
+        else:
+            solvable.append(((i, j), goal, risk_profile))
+
+    if not solvable:
+        return results
+
+    plan_ids = np.array([_plan_for_goal(goal["goal_name"], risk) for _, goal, risk in solvable])
+    risk_profiles = np.array([risk.lower() for _, _, risk in solvable])
+    target_amounts = [goal["target_amount"] for _, goal, _ in solvable]
+    target_years = np.array([goal["target_years"] for _, goal, _ in solvable], dtype=float)
+
+    alloc = _adjust_for_time_horizon(
+        PLAN_ALLOCATIONS[plan_ids], target_years, PLAN_IDEAL_HOLDING[plan_ids]
+    )
+    alloc = _normalize_allocations(_adjust_for_risk(alloc, risk_profiles))
+    sips = compute_sip_batch(target_amounts, target_years, PLAN_RETURNS[plan_ids])
+
+    rows = zip(solvable, plan_ids.tolist(), alloc.tolist(), sips.tolist())
+    for ((i, j), goal, _), plan_id, goal_alloc, sip in rows:
+        plan_name, ideal_holding, expected_return = PLAN_LABELS[plan_id]
+        results[i]["goals"][j] = {
+            "goal_name": goal["goal_name"],
+            "base_plan": plan_name,
+            "ideal_holding": ideal_holding,
+            "adjusted_allocation": dict(zip(ASSET_CLASSES, goal_alloc)),
+            "target_amount": goal["target_amount"],
+            "target_horizon_years": goal["target_years"],
+            "recommended_sip": sip,
+            "expected_return": expected_return
+        }
+    return results
@@ -0,0 +1,257 @@
+# server/report_answers.py
+
+import re
+
+# =============================================================================
+# Local answers for factual report-chat questions
+# =============================================================================
+# Most chat questions are lookups ("what was my income in March", "biggest
+# expense category", "how much 80C is left"). When the report carries the
+# structured fields (monthly_summary, category_breakdown, tax_snapshot) they
+# are answered here, instantly and with the exact numbers. Anything
+# open-ended, or a lookup the report has no data for, returns None and goes
+# to the LLM as before.
+
+MONTH_NAMES = [
+    "January", "February", "March", "April", "May", "June", "July",
+    "August", "September", "October", "November", "December",
+]
+MONTH_NUMBERS = {name.lower(): i + 1 for i, name in enumerate(MONTH_NAMES)}
+MONTH_NUMBERS.update({name[:3].lower(): i + 1 for i, name in enumerate(MONTH_NAMES)})
+MONTH_NUMBERS["sept"] = 9
+
+METRICS = {
+    "income": re.compile(r"\b(income|earn\w*|salary|inflow|credit\w*)\b"),
+    "expenses": re.compile(r"\b(expense\w*|spen[dt]\w*|outflow|debit\w*)\b"),
+    "savings": re.compile(r"\b(saving\w*|saved|surplus|net)\b"),
+}
+
+OPEN_ENDED = re.compile(
+    r"\b(why|should|could|explain|advice|advise|suggest\w*|recommend\w*|improve|reduce|plan|what if|help me)\b"
+)
+HIGHEST = re.compile(r"\b(highest|most|max\w*|biggest|largest|top|peak)\b")
+LOWEST = re.compile(r"\b(lowest|least|min\w*|smallest)\b")
+TOTAL = re.compile(r"\b(total|overall|altogether|sum)\b")
+AVERAGE = re.compile(r"\b(average|avg|mean|typical)\b")
+CATEGORY = re.compile(r"\b(categor\w*|where .* money)\b")
+REMAINING = re.compile(r"\b(left|remaining|remain|room|more|unused|gap)\b")
+REGIME = re.compile(r"\bregime\b")
+TAX = re.compile(r"\btax\w*\b")
+TAX_AMOUNT = re.compile(r"\b(how much|what(?:'s| is| was| will)|total|estimate\w*|owe|pay\w*|liabilit\w*)\b")
+PERIOD = re.compile(r"\b(month\w*|quarter\w*|week\w*)\b")
+# "how much tax can I save" asks for a saving, not the estimate
+TAX_SAVING = re.compile(r"\b(save\w*|saving\w*|reduc\w*|lower\w*|cut\w*|minimi[sz]\w*)\b")
+_MONTH = re.compile(
+    r"\b(" + "|".join(sorted(MONTH_NUMBERS, key=len, reverse=True)) + r")\b"
+    r"(?:\s*[,-]?\s*(\d{4})\b|\s*['-](\d{2})\b)?"
+)
+_TOP_N = re.compile(r"\btop\s+(\d+)\b")
+
+
+def format_inr(amount) -> str:
+    """
+    ₹ with Indian digit grouping (₹3,18,899 / ₹12,34,567.50).
+    """
+    amount = round(float(amount), 2)
+    sign = "-" if amount < 0 else ""
+    whole, _, paise = f"{abs(amount):.2f}".partition(".")
+    head, tail = whole[:-3], whole[-3:]
+    groups = []
+    while len(head) > 2:
+        groups.insert(0, head[-2:])
+        head = head[:-2]
+    if head:
+        groups.insert(0, head)
+    grouped = ",".join(groups + [tail])
+    return f"{sign}₹{grouped}" + ("" if paise == "00" else f".{paise}")
+
+
+def format_month(month: str) -> str:
+    """
+    "2024-03" -> "March 2024".
+    """
+    year, _, number = str(month).partition("-")
+    if number.isdigit() and 1 <= int(number) <= 12:
+        return f"{MONTH_NAMES[int(number) - 1]} {year}"
+    return str(month)
+
+
+# ==============================
+# QUESTION PARSING
+# ==============================
+
+def _verb(metric: str) -> str:
+    return "was" if metric == "income" else "were"
+
+
+def _metrics(question: str) -> list:
+    return [name for name, pattern in METRICS.items() if pattern.search(question)]
+
+
+def _names_period(question: str) -> bool:
+    """
+    Whether the question is scoped to a month or other part of the year.
+    """
+    return bool(_MONTH.search(question) or PERIOD.search(question))
+
+
+def _months(question: str, available: list) -> list:
+    """
+    Statement months ("YYYY-MM") the question names. A month without a
+    year means its latest occurrence in the statement; "last month" /
+    "latest month" the last one.
+    """
+    if re.search(r"\b(last|latest|recent|previous)\s+month\b", question) and available:
+        return [available[-1]]
+
+    months = []
+    for name, long_year, short_year in _MONTH.findall(question):
+        year = long_year or (f"20{short_year}" if short_year else "")
+        # "may" is only a month when a year follows or the context is clear
+        if name == "may" and not year and not re.search(r"\b(in|for|of|during)\s+may\b", question):
+            continue
+        number = f"{MONTH_NUMBERS[name]:02d}"
+        if year:
+            candidates = [m for m in available if m == f"{year}-{number}"]
+        else:
+            candidates = [m for m in available if str(m).endswith(f"-{number}")]
+        if candidates and candidates[-1] not in months:
+            months.append(candidates[-1])
+    return months
+
+
+# ==============================
+# ANSWERS
+# ==============================
+
+def _monthly_answer(question: str, report: dict):
+    summary = report.get("monthly_summary")
+    if not isinstance(summary, list) or not summary:
+        return None
+    # "total income tax" is a tax question, not one about income
+    if TAX.search(question):
+        return None
+    metrics = _metrics(question)
+    if not metrics:
+        return None
+
+    by_month = {row["month"]: row for row in summary}
+    months = _months(question, list(by_month))
+
+    if months:
+        return " ".join(
+            f"In {format_month(m)} your "
+            + ", ".join(f"{metric} {_verb(metric)} {format_inr(by_month[m][metric])}"
+                        for metric in metrics)
+            + "."
+            for m in months
+        )
+
+    metric = metrics[0]
+    values = [row[metric] for row in summary]
+    span = f"{format_month(summary[0]['month'])} to {format_month(summary[-1]['month'])}"
+
+    if HIGHEST.search(question) or LOWEST.search(question):
+        pick = max if HIGHEST.search(question) else min
+        row = pick(summary, key=lambda r: r[metric])
+        word = "highest" if pick is max else "lowest"
+        return f"Your {word} {metric} {_verb(metric)} in {format_month(row['month'])}: {format_inr(row[metric])}."
+    if AVERAGE.search(question):
+        return (f"Your average monthly {metric} from {span} {_verb(metric)} "
+                f"{format_inr(sum(values) / len(values))} over {len(values)} months.")
+    if TOTAL.search(question):
+        return f"Your total {metric} from {span} {_verb(metric)} {format_inr(sum(values))}."
+    return None
+
+
+def _category_answer(question: str, report: dict):
+    breakdown = report.get("category_breakdown")
+    if not isinstance(breakdown, dict) or not breakdown or not CATEGORY.search(question):
+        return None
+    if not (HIGHEST.search(question) or LOWEST.search(question)):
+        return None
+
+    months = _months(question, list(breakdown))
+    totals = {}
+    for month in months or breakdown:
+        for item in breakdown[month]:
+            totals[item["category"]] = totals.get(item["category"], 0) + item["amount"]
+    if not totals:
+        return None
+
+    period = (
+        " in " + " and ".join(format_month(m) for m in months) if months
+        else f" from {format_month(min(breakdown))} to {format_month(max(breakdown))}"
+    )
+    ranked = sorted(totals.items(), key=lambda kv: kv[1], reverse=not LOWEST.search(question))
+    top_n = _TOP_N.search(question)
+    if top_n:
+        listed = ", ".join(f"{c} ({format_inr(a)})" for c, a in ranked[:int(top_n.group(1))])
+        return f"Your top expense categories{period} were: {listed}."
+    category, amount = ranked[0]
+    word = "smallest" if LOWEST.search(question) else "biggest"
+    return f"Your {word} expense category{period} was {category} at {format_inr(amount)}."
+
+
+def _tax_answer(question: str, report: dict):
+    snapshot = report.get("tax_snapshot")
+    if not isinstance(snapshot, dict):
+        return None
+    # The snapshot is annual; "tax paid in March" is not answerable from it
+    if _names_period(question):
+        return None
+    # Savings questions depend on what the user would change; the LLM
+    # answers them from the tax gaps rather than a lookup quoting the estimate
+    if TAX_SAVING.search(question):
+        return None
+
+    section = re.search(r"\b80\s*(c|d)\b", question)
+    if section:
+        name = f"80{section.group(1).upper()}"
+        if REMAINING.search(question):
+            remaining = snapshot.get("tax_gaps", {}).get(f"potential_{name}_remaining")
+            if remaining is None:
+                return None
+            return f"You can still claim up to {format_inr(remaining)} under section {name}."
+        claimed = snapshot.get("tax_base", {}).get("deductions_claimed", {}).get(name)
+        if claimed is None:
+            return None
+        return f"Your statement shows {format_inr(claimed)} of section {name} deductions claimed."
+
+    estimate = snapshot.get("tax_estimate")
+    if not isinstance(estimate, dict) or not (TAX.search(question) or REGIME.search(question)):
+        return None
+    old = estimate.get("old_regime", {}).get("estimated_tax")
+    new = estimate.get("new_regime", {}).get("estimated_tax")
+    if old is None or new is None:
+        return None
+    if REGIME.search(question):
+        return (f"The {estimate['recommended_regime']} regime is cheaper for you: estimated tax is "
+                f"{format_inr(old)} under the old regime and {format_inr(new)} under the new regime.")
+    if TAX_AMOUNT.search(question):
+        return (f"Your estimated tax is {format_inr(min(old, new))} under the "
+                f"{estimate['recommended_regime']} regime ({format_inr(old)} old, {format_inr(new)} new).")
+    return None
+
+
+ANSWERERS = [_tax_answer, _category_answer, _monthly_answer]
+
+
+def answer_locally(report, question: str):
+    """
+    Exact answer to a factual question from the report's structured
+    fields, or None when the question needs the LLM.
+    """
+    if not isinstance(report, dict) or not question:
+        return None
+    question = question.lower()
+    if OPEN_ENDED.search(question):
+        return None
+    for answerer in ANSWERERS:
+        try:
+            answer = answerer(question, report)
+        except (KeyError, TypeError, ValueError):
+            answer = None
+        if answer:
+            return answer
+    return None
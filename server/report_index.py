@@ -0,0 +1,241 @@
+# server/report_index.py
+
+import json
+import os
+import re
+import threading
+from collections import Counter, OrderedDict
+
+import numpy as np
+
+from llm_cache import fingerprint
+
+# =============================================================================
+# Retrieval over a report for report chat
+# =============================================================================
+# Report chat used to paste the whole report into every prompt. Instead the
+# report is split into chunks (one per report section / JSON field, and long
+# sections further split per month mentioned), indexed with BM25 in memory,
+# and only the top-k chunks for the question are sent. Short reports are
+# still sent whole: retrieval cannot make them meaningfully cheaper.
+# Indexes are kept per report, so follow-up questions on the same report do
+# not re-chunk it.
+
+TOP_K = int(os.getenv("REPORT_CHAT_TOP_K", "4"))
+FULL_REPORT_CHARS = int(os.getenv("REPORT_CHAT_FULL_CHARS", "3000"))
+MAX_CHUNK_CHARS = 800
+MAX_INDEXES = 128
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+MONTHS = {
+    "january": "jan", "february": "feb", "march": "mar", "april": "apr",
+    "may": "may", "june": "jun", "july": "jul", "august": "aug",
+    "september": "sep", "sept": "sep", "october": "oct", "november": "nov",
+    "december": "dec",
+}
+MONTHS.update({short: short for short in set(MONTHS.values())})
+
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "is", "was",
+    "were", "are", "be", "my", "me", "i", "what", "which", "how", "much",
+    "many", "did", "do", "does", "it", "this", "that", "with", "at", "by",
+    "from", "as", "your", "you", "can", "tell", "about", "there",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_BLANK_LINES = re.compile(r"\n\s*\n")
+
+
+def tokenize(text: str) -> list:
+    """
+    Lowercase word tokens with stopwords dropped, month names folded to
+    their three-letter form and a trailing plural "s" stripped.
+    """
+    tokens = []
+    for token in _TOKEN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        if token in MONTHS:
+            token = MONTHS[token]
+        elif len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def _month_of(sentence: str):
+    for token in _TOKEN.findall(sentence.lower()):
+        if token in MONTHS and token != "may":
+            return MONTHS[token]
+    return None
+
+
+# ==============================
+# CHUNKING
+# ==============================
+
+def _split_by_month(title: str, text: str) -> list:
+    """
+    A long section as sentence runs, starting a new chunk whenever a
+    sentence names a different month or the chunk would grow too long.
+    Every chunk keeps the section title.
+    """
+    if len(text) <= MAX_CHUNK_CHARS:
+        return [(title, text)]
+
+    chunks, current, month = [], [], None
+    for sentence in _SENTENCE_END.split(text):
+        sentence_month = _month_of(sentence)
+        size = sum(len(s) for s in current) + len(sentence)
+        if current and (
+            (sentence_month and month and sentence_month != month) or size > MAX_CHUNK_CHARS
+        ):
+            chunks.append((title, " ".join(current)))
+            current, month = [], None
+        current.append(sentence)
+        month = sentence_month or month
+    if current:
+        chunks.append((title, " ".join(current)))
+    return chunks
+
+
+def _text_chunks(report: str) -> list:
+    chunks = []
+    for block in _BLANK_LINES.split(report):
+        block = block.strip()
+        if not block:
+            continue
+        title, _, body = block.partition("\n")
+        chunks.extend(_split_by_month(title.strip(), body.strip() or title.strip()))
+    return chunks
+
+
+def _json_chunks(value, title: str) -> list:
+    if isinstance(value, dict):
+        sections = value.get("sections")
+        if isinstance(sections, list) and all(isinstance(s, dict) for s in sections):
+            chunks = []
+            for section in sections:
+                chunks.extend(_split_by_month(
+                    f"{title} > {section.get('title', '')}".strip(" >"),
+                    str(section.get("content", ""))
+                ))
+            rest = {k: v for k, v in value.items() if k != "sections"}
+            return chunks + (_json_chunks(rest, title) if rest else [])
+    if isinstance(value, str):
+        return _split_by_month(title, value)
+
+    text = json.dumps(value, ensure_ascii=False, default=str)
+    if len(text) <= MAX_CHUNK_CHARS or not isinstance(value, (dict, list)):
+        return [(title, text)]
+
+    # Too big for one chunk: one per field / list item (month records are
+    # titled by their month)
+    if isinstance(value, dict):
+        items = [(f"{title} > {key}".strip(" >"), item) for key, item in value.items()]
+    else:
+        items = [
+            (f"{title} > {item.get('month', item.get('monthyear', i))}"
+             if isinstance(item, dict) else f"{title} > {i}", item)
+            for i, item in enumerate(value)
+        ]
+    chunks = []
+    for item_title, item in items:
+        chunks.extend(_json_chunks(item, item_title))
+    return chunks
+
+
+def chunk_report(report) -> list:
+    """
+    (title, text) chunks of a report: plain text (blank-line separated
+    blocks, first line as title) or the JSON /analyze returns.
+    """
+    if isinstance(report, str):
+        return _text_chunks(report)
+    return _json_chunks(report, "")
+
+
+def report_text(report) -> str:
+    return report if isinstance(report, str) else json.dumps(report, indent=2)
+
+
+# ==============================
+# BM25 INDEX
+# ==============================
+
+class ReportIndex:
+
+    def __init__(self, chunks: list):
+        self.chunks = chunks
+        counts = [Counter(tokenize(f"{title} {text}")) for title, text in chunks]
+        lengths = np.array([sum(c.values()) for c in counts], dtype=float)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(lengths.mean(), 1.0))
+
+        # Postings: term -> (chunk indices, precomputed BM25 term weights)
+        postings = {}
+        for i, c in enumerate(counts):
+            for term, tf in c.items():
+                postings.setdefault(term, ([], []))
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+
+        n = len(chunks)
+        self.postings = {}
+        for term, (rows, tfs) in postings.items():
+            rows = np.array(rows)
+            tfs = np.array(tfs, dtype=float)
+            idf = np.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            self.postings[term] = (rows, idf * tfs * (BM25_K1 + 1) / (tfs + norm[rows]))
+
+    def search(self, question: str, k: int = TOP_K) -> list:
+        """
+        Indices of the k best-scoring chunks for the question, in report
+        order. With no overlapping terms, the first k chunks.
+        """
+        scores = np.zeros(len(self.chunks))
+        for term in set(tokenize(question)):
+            if term in self.postings:
+                rows, weights = self.postings[term]
+                scores[rows] += weights
+        if not scores.any():
+            return list(range(min(k, len(self.chunks))))
+        best = np.argsort(-scores, kind="stable")[:k]
+        return sorted(int(i) for i in best if scores[i] > 0)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(report) -> ReportIndex:
+    key = fingerprint(report)
+    with _indexes_lock:
+        if key in _indexes:
+            _indexes.move_to_end(key)
+            return _indexes[key]
+
+    index = ReportIndex(chunk_report(report))
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+    return index
+
+
+def report_context(report, question: str, k: int = TOP_K) -> str:
+    """
+    The part of the report to send with a chat question: the whole report
+    when it is short, otherwise the top-k chunks for the question.
+    """
+    text = report_text(report)
+    if len(text) <= FULL_REPORT_CHARS:
+        return text
+
+    index = get_index(report)
+    return "\n\n".join(
+        f"[{index.chunks[i][0]}]\n{index.chunks[i][1]}" if index.chunks[i][0] else index.chunks[i][1]
+        for i in index.search(question, k)
+    )
@@ -0,0 +1,111 @@
+# server/report_sessions.py
+
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+from report_index import get_index
+
+# =============================================================================
+# Report chat sessions
+# =============================================================================
+# The client used to re-post the whole report with every chat message. A
+# session stores the report once, server-side, under a random id; each turn
+# then sends only the new message. Sessions expire after a TTL of inactivity
+# and the oldest are dropped beyond MAX_SESSIONS.
+#
+# History is bounded: the last MAX_HISTORY_MESSAGES messages are kept
+# verbatim and older turns are folded into a short running summary (one
+# line per turn, no LLM call), itself capped at MAX_SUMMARY_CHARS.
+
+SESSION_TTL_SECONDS = float(os.getenv("REPORT_SESSION_TTL_SECONDS", "3600"))
+MAX_SESSIONS = int(os.getenv("REPORT_SESSION_MAX", "1000"))
+MAX_HISTORY_MESSAGES = 6
+MAX_SUMMARY_CHARS = 1000
+SUMMARY_LINE_CHARS = 160
+
+_sessions = OrderedDict()
+_lock = threading.Lock()
+
+
+def _expire(now):
+    while _sessions:
+        session_id, session = next(iter(_sessions.items()))
+        if now - session["last_used"] <= SESSION_TTL_SECONDS and len(_sessions) <= MAX_SESSIONS:
+            break
+        del _sessions[session_id]
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+def create_session(report) -> str:
+    """
+    Stores a report and returns its session id. The report's retrieval
+    index is built now, so the first question does not pay for it.
+    """
+    get_index(report)
+    session_id = secrets.token_urlsafe(16)
+    now = time.time()
+    with _lock:
+        _sessions[session_id] = {
+            "report": report,
+            "history": [],
+            "summary": "",
+            "last_used": now,
+        }
+        _expire(now)
+    return session_id
+
+
+def get_session(session_id: str):
+    """
+    The session (refreshing its TTL), or None if unknown or expired.
+    """
+    now = time.time()
+    with _lock:
+        _expire(now)
+        session = _sessions.get(session_id)
+        if session is None:
+            return None
+        session["last_used"] = now
+        _sessions.move_to_end(session_id)
+        return session
+
+
+def delete_session(session_id: str) -> bool:
+    with _lock:
+        return _sessions.pop(session_id, None) is not None
+
+
+def record_turn(session: dict, question: str, answer: str):
+    """
+    Appends a question/answer pair, folding turns that fall out of the
+    verbatim window into the summary.
+    """
+    with _lock:
+        history = session["history"]
+        history.append({"role": "user", "content": question})
+        history.append({"role": "assistant", "content": answer})
+
+        lines = []
+        while len(history) > MAX_HISTORY_MESSAGES:
+            asked = history.pop(0)["content"]
+            answered = history.pop(0)["content"]
+            lines.append(_clip(f"Q: {asked} A: {answered}", SUMMARY_LINE_CHARS))
+
+        if lines:
+            summary = "\n".join(filter(None, [session["summary"], *lines]))
+            # Keep the most recent lines within the cap
+            while len(summary) > MAX_SUMMARY_CHARS and "\n" in summary:
+                summary = summary.split("\n", 1)[1]
+            session["summary"] = summary[-MAX_SUMMARY_CHARS:]
+
+
+def session_count() -> int:
+    with _lock:
+        return len(_sessions)
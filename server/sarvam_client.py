@@ -0,0 +1,212 @@
+# server/sarvam_client.py
+
+import asyncio
+import json
+import os
+import threading
+
+import httpx
+
+from llm_cache import CACHE_ENABLED, fingerprint, response_cache
+
+# =============================================================================
+# Sarvam chat-completions client
+# =============================================================================
+# Every LLM call site goes through this module. Sync callers share one
+# httpx.Client and async callers one httpx.AsyncClient per event loop, both
+# with a bounded keep-alive connection pool, so repeated calls reuse warm
+# TCP/TLS connections instead of handshaking each time. A semaphore caps how
+# many requests are in flight at once, and every call sets its own timeout.
+# Successful responses go through llm_cache, so an identical request (same
+# model, messages and sampling parameters) is answered without the network.
+
+SARVAM_BASE_URL = os.getenv("SARVAM_BASE_URL", "https://api.sarvam.ai/v1").rstrip("/")
+SARVAM_URL = f"{SARVAM_BASE_URL}/chat/completions"
+
+MAX_CONCURRENCY = int(os.getenv("SARVAM_MAX_CONCURRENCY", "8"))
+MAX_CONNECTIONS = int(os.getenv("SARVAM_MAX_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("SARVAM_KEEPALIVE_SECONDS", "60"))
+CONNECT_TIMEOUT = 10
+DEFAULT_TIMEOUT = 30
+
+_LIMITS = httpx.Limits(
+    max_connections=MAX_CONNECTIONS,
+    max_keepalive_connections=MAX_CONNECTIONS,
+    keepalive_expiry=KEEPALIVE_EXPIRY,
+)
+
+_client = None
+_client_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+
+_async_client = None
+_async_client_loop = None
+_async_slots = None
+
+
+def _headers() -> dict:
+    return {
+        "api-subscription-key": os.getenv("SARVAM_API_KEY", ""),
+        "Content-Type": "application/json"
+    }
+
+
+def _timeout(timeout: float) -> httpx.Timeout:
+    return httpx.Timeout(timeout, connect=min(CONNECT_TIMEOUT, timeout))
+
+
+def _content(response: httpx.Response) -> str:
+    response.raise_for_status()
+    return response.json()["choices"][0]["message"]["content"]
+
+
+def is_configured() -> bool:
+    return bool(os.getenv("SARVAM_API_KEY"))
+
+
+# ==============================
+# SYNC
+# ==============================
+
+def get_client() -> httpx.Client:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(limits=_LIMITS)
+        return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
+
+
+def chat_completion(payload: dict, timeout: float = DEFAULT_TIMEOUT, cache: bool = True) -> str:
+    """
+    POSTs a chat-completions body and returns the first choice's message
+    content, from the response cache when the same body was answered
+    before. Raises httpx.HTTPStatusError on non-2xx responses.
+    """
+    key = fingerprint(payload) if cache and CACHE_ENABLED else None
+    if key:
+        cached = response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    with _slots:
+        response = get_client().post(
+            SARVAM_URL, headers=_headers(), json=payload, timeout=_timeout(timeout)
+        )
+    content = _content(response)
+    if key:
+        response_cache.put(key, content)
+    return content
+
+
+# ==============================
+# ASYNC
+# ==============================
+
+def _async_pool():
+    """
+    (AsyncClient, concurrency semaphore) for the running event loop. A
+    client cannot be reused across loops, so a new loop gets a new pair.
+    Calls keep the pair they got, so close_async_client() resetting the
+    globals cannot leave an in-flight call without its semaphore.
+    """
+    global _async_client, _async_client_loop, _async_slots
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client_loop is not loop:
+        _async_client = httpx.AsyncClient(limits=_LIMITS)
+        _async_client_loop = loop
+        _async_slots = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _async_client, _async_slots
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    The shared AsyncClient for the running event loop.
+    """
+    return _async_pool()[0]
+
+
+async def close_async_client():
+    global _async_client, _async_client_loop, _async_slots
+    if _async_client is not None:
+        await _async_client.aclose()
+    _async_client = None
+    _async_client_loop = None
+    _async_slots = None
+
+
+async def chat_completion_async(payload: dict, timeout: float = DEFAULT_TIMEOUT, cache: bool = True) -> str:
+    """
+    Async chat_completion on the shared AsyncClient. Cache lookups run in a
+    worker thread since the disk tier is SQLite.
+    """
+    key = fingerprint(payload) if cache and CACHE_ENABLED else None
+    if key:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            return cached
+
+    client, slots = _async_pool()
+    async with slots:
+        response = await client.post(
+            SARVAM_URL, headers=_headers(), json=payload, timeout=_timeout(timeout)
+        )
+    content = _content(response)
+    if key:
+        await asyncio.to_thread(response_cache.put, key, content)
+    return content
+
+
+async def chat_completion_stream_async(payload: dict, timeout: float = DEFAULT_TIMEOUT, cache: bool = True):
+    """
+    Streaming chat_completion_async: yields the first choice's content in
+    pieces as Sarvam generates it. A cached response is yielded whole, and a
+    completed stream is cached under the same key as the non-streaming call.
+    Lines that are not JSON chunks (keep-alive comments, partial frames) are
+    skipped. Closing the generator early (e.g. the client went away) closes
+    the upstream request.
+    """
+    key = fingerprint(payload) if cache and CACHE_ENABLED else None
+    if key:
+        cached = await asyncio.to_thread(response_cache.get, key)
+        if cached is not None:
+            yield cached
+            return
+
+    client, slots = _async_pool()
+    parts = []
+    async with slots:
+        async with client.stream(
+            "POST", SARVAM_URL, headers=_headers(), json={**payload, "stream": True},
+            timeout=_timeout(timeout)
+        ) as response:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+                try:
+                    chunk = json.loads(data)
+                except ValueError:
+                    continue
+                if not isinstance(chunk, dict):
+                    continue
+                choices = chunk.get("choices") or [{}]
+                delta = (choices[0].get("delta") or {}).get("content")
+                if delta:
+                    parts.append(delta)
+                    yield delta
+
+    if key and parts:
+        await asyncio.to_thread(response_cache.put, key, "".join(parts))
@@ -0,0 +1,93 @@
+# server/statement.py
+
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+from statement_schema import (
+    StatementSchema,
+    apply_schema,
+    detect_schema,
+    normalize_header,
+    parse_dates,
+    read_statement_csv,
+)
+
+# ==============================
+# CONSTANTS
+# ==============================
+
+TEXT_COLUMNS = ["category", "subcategory"]
+
+# Bump whenever parse_statement / normalize_frame produce a different frame
+# for the same bytes; cached parses from an older version are then ignored
+PARSER_VERSION = 1
+
+
+# ==============================
+# PARSED STATEMENT
+# ==============================
+
+@dataclass
+class ParsedStatement:
+    """
+    A bank statement parsed and normalised once per upload.
+
+    `frame` has lowercase/stripped column names, float credit/debit/balance
+    (blank cells stay NaN so statistics over real postings are unchanged),
+    lowercase category/subcategory and, when a date column is present,
+    parsed `date` plus derived `monthyear` (Period[M]) and `month` (YYYY-MM).
+
+    Consumers treat the frame as read-only and validate the columns they need.
+    """
+    frame: pd.DataFrame
+    source: Optional[str] = None
+    digest: Optional[str] = None  # SHA-256 of the uploaded bytes, when known
+    layout: Optional[str] = None  # statement_schema adapter that read it
+
+    def __len__(self):
+        return len(self.frame)
+
+    def require(self, columns, label="CSV"):
+        missing = set(columns) - set(self.frame.columns)
+        if missing:
+            raise ValueError(
+                f"{label} missing required columns: {missing}. "
+                f"Found columns: {list(self.frame.columns)}"
+            )
+
+
+def normalize_frame(df: pd.DataFrame, schema: Optional[StatementSchema] = None) -> pd.DataFrame:
+    """
+    Maps a raw frame onto the canonical layout (see statement_schema.py) and
+    normalises dtypes and text. Shared by every reader (whole-file and
+    chunked); `schema` is detected from the header when not given.
+    """
+    if schema is None:
+        schema = detect_schema(tuple(normalize_header(c) for c in df.columns))
+    df = apply_schema(df, schema)
+
+    for col in TEXT_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.lower().str.strip()
+
+    if "date" in df.columns:
+        df["date"] = parse_dates(df["date"], schema)
+        df["monthyear"] = df["date"].dt.to_period("M")
+        df["month"] = df["monthyear"].astype(str)
+
+    return df
+
+
+def parse_statement(source) -> ParsedStatement:
+    """
+    Read and normalise a statement CSV exactly once.
+    `source` is a path or any readable binary/text stream (e.g. an upload).
+    """
+    schema, df = read_statement_csv(source)
+    return ParsedStatement(
+        frame=normalize_frame(df, schema),
+        source=source if isinstance(source, str) else None,
+        layout=schema.name
+    )
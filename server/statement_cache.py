@@ -0,0 +1,159 @@
+# server/statement_cache.py
+
+import hashlib
+import logging
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from statement import PARSER_VERSION, ParsedStatement, parse_statement
+from statement_schema import registry_fingerprint
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CONSTANTS
+# ==============================
+
+# Parsed statements are stored as Parquet files named after the SHA-256 of
+# the uploaded bytes, so re-uploading the same CSV (e.g. while moving the
+# risk slider) skips CSV parsing and date inference entirely. The name also
+# carries the parser version and adapter registry, so a change to either
+# never serves a frame parsed the old way.
+CACHE_DIR = os.getenv("STATEMENT_CACHE_DIR", os.path.join(".cache", "statements"))
+CACHE_MAX_BYTES = int(os.getenv("STATEMENT_CACHE_MAX_MB", "256")) * 1024 * 1024
+
+HASH_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Parquet key-value metadata holding the adapter that read the statement
+LAYOUT_METADATA_KEY = b"finautobot.layout"
+
+
+# ==============================
+# HELPERS
+# ==============================
+
+def digest_stream(stream) -> str:
+    """
+    SHA-256 of a binary stream, read in chunks. Rewinds the stream so it can
+    still be parsed afterwards.
+    """
+    sha = hashlib.sha256()
+    stream.seek(0)
+    while True:
+        chunk = stream.read(HASH_CHUNK_SIZE)
+        if not chunk:
+            break
+        sha.update(chunk)
+    stream.seek(0)
+    return sha.hexdigest()
+
+
+def _cache_path(digest: str) -> str:
+    version = f"p{PARSER_VERSION}-{registry_fingerprint()}"
+    return os.path.join(CACHE_DIR, f"{digest}.{version}.parquet")
+
+
+def _evict(max_bytes: int = CACHE_MAX_BYTES):
+    """
+    Drop least recently used entries (oldest mtime first) until the cache
+    fits in `max_bytes`.
+    """
+    entries = []
+    for name in os.listdir(CACHE_DIR):
+        if not name.endswith(".parquet"):
+            continue
+        try:
+            stat = os.stat(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(os.path.join(CACHE_DIR, name))
+        except FileNotFoundError:
+            pass
+        total -= size
+
+
+# ==============================
+# CACHE API
+# ==============================
+
+def load_cached_statement(digest: str):
+    """
+    Returns the cached ParsedStatement for `digest`, or None on a miss.
+    """
+    path = _cache_path(digest)
+    try:
+        table = pq.read_table(path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Discarding unreadable statement cache entry {digest}: {e}")
+        return None
+
+    # Mark as recently used for LRU eviction
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+    layout = (table.schema.metadata or {}).get(LAYOUT_METADATA_KEY)
+    return ParsedStatement(
+        frame=table.to_pandas(),
+        digest=digest,
+        layout=layout.decode("utf-8") if layout else None
+    )
+
+
+def store_statement(statement: ParsedStatement):
+    """
+    Best-effort write of a parsed statement into the cache. Never raises:
+    a cache failure must not fail the request.
+    """
+    if not statement.digest:
+        return
+
+    # Write to a private temp file and rename, so readers never see a
+    # half-written entry
+    tmp_path = os.path.join(CACHE_DIR, f".{statement.digest}.{uuid.uuid4().hex}.tmp")
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        table = pa.Table.from_pandas(statement.frame, preserve_index=False)
+        if statement.layout:
+            table = table.replace_schema_metadata({
+                **(table.schema.metadata or {}),
+                LAYOUT_METADATA_KEY: statement.layout.encode("utf-8"),
+            })
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, _cache_path(statement.digest))
+        _evict()
+    except Exception as e:
+        logger.warning(f"Could not cache parsed statement {statement.digest}: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def parse_statement_cached(stream) -> ParsedStatement:
+    """
+    Content-addressed parse of an uploaded statement stream: loads the
+    normalised frame from the cache when the same bytes were seen before,
+    otherwise parses the CSV and caches the result.
+    """
+    digest = digest_stream(stream)
+
+    statement = load_cached_statement(digest)
+    if statement is not None:
+        return statement
+
+    statement = parse_statement(stream)
+    statement.digest = digest
+    store_statement(statement)
+    return statement
@@ -0,0 +1,265 @@
+# server/statement_schema.py
+
+import csv
+import hashlib
+import io
+import json
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ==============================
+# CANONICAL LAYOUT
+# ==============================
+
+# Every adapter maps its bank's export onto these column names, which are
+# the ones the analysis and tax snapshot work with.
+CANONICAL_COLUMNS = [
+    "date", "transaction detail", "credit", "debit",
+    "balance", "category", "subcategory"
+]
+
+NUMERIC_DTYPES = {
+    "credit": "float64",
+    "debit": "float64",
+    "balance": "float64",
+}
+
+
+# ==============================
+# SCHEMAS
+# ==============================
+
+@dataclass(frozen=True)
+class StatementSchema:
+    """
+    Declares how one bank's CSV export maps onto the canonical layout.
+
+    columns: normalised (lowercase, stripped) source header -> canonical name
+    date_format: strptime format of the date column, None to infer
+    decimal / thousands: number conventions of the amount columns
+    """
+    name: str
+    columns: dict
+    date_format: Optional[str] = None
+    dayfirst: bool = False
+    decimal: str = "."
+    thousands: Optional[str] = None
+    optional: frozenset = field(default_factory=frozenset)
+
+    def matches(self, header) -> bool:
+        required = set(self.columns) - set(self.optional)
+        return required.issubset(header)
+
+
+SCHEMAS = []
+
+
+def register_schema(schema: StatementSchema):
+    """
+    Adds an adapter. Adapters registered later are tried first, so a more
+    specific layout can be registered after a generic one.
+    """
+    SCHEMAS.insert(0, schema)
+    detect_schema.cache_clear()
+    return schema
+
+
+def registry_fingerprint() -> str:
+    """
+    Short hash of the registered adapters, in detection order. Changes
+    whenever an adapter is added or edited, so anything cached from a parse
+    (see statement_cache.py) can tell it was read by a different registry.
+    """
+    spec = [
+        [schema.name, sorted(schema.columns.items()), schema.date_format, schema.dayfirst,
+         schema.decimal, schema.thousands, sorted(schema.optional)]
+        for schema in SCHEMAS
+    ]
+    return hashlib.sha256(json.dumps(spec).encode("utf-8")).hexdigest()[:16]
+
+
+def normalize_header(name) -> str:
+    return str(name).strip().lower()
+
+
+@lru_cache(maxsize=256)
+def detect_schema(header: tuple) -> StatementSchema:
+    """
+    Picks the adapter for a normalised header. Cached per header, so repeat
+    uploads of the same bank's export skip detection.
+    """
+    for schema in SCHEMAS:
+        if schema.matches(header):
+            return schema
+
+    # Unknown layout: keep the columns as they are and let the consumer's
+    # column validation report what is missing
+    return StatementSchema(
+        name="unknown",
+        columns={c: c for c in header},
+        optional=frozenset(header),
+    )
+
+
+# ==============================
+# ADAPTERS
+# ==============================
+
+# FinAutoBot's own layout (also covers the Title Case variant written by the
+# older tooling, since headers are compared case-insensitively)
+register_schema(StatementSchema(
+    name="finautobot",
+    columns={c: c for c in CANONICAL_COLUMNS},
+))
+
+register_schema(StatementSchema(
+    name="hdfc",
+    columns={
+        "date": "date",
+        "narration": "transaction detail",
+        "withdrawal amt.": "debit",
+        "deposit amt.": "credit",
+        "closing balance": "balance",
+    },
+    date_format="%d/%m/%y",
+    dayfirst=True,
+))
+
+register_schema(StatementSchema(
+    name="sbi",
+    columns={
+        "txn date": "date",
+        "description": "transaction detail",
+        "debit": "debit",
+        "credit": "credit",
+        "balance": "balance",
+    },
+    date_format="%d %b %Y",
+    dayfirst=True,
+    thousands=",",
+))
+
+register_schema(StatementSchema(
+    name="icici",
+    columns={
+        "transaction date": "date",
+        "transaction remarks": "transaction detail",
+        "withdrawal amount (inr )": "debit",
+        "deposit amount (inr )": "credit",
+        "balance (inr )": "balance",
+    },
+    date_format="%d/%m/%Y",
+    dayfirst=True,
+    thousands=",",
+))
+
+
+
+# ==============================
+# LOADER
+# ==============================
+
+def read_header(source) -> list:
+    """
+    Raw header row of a CSV path or stream (the stream is rewound).
+    """
+    if isinstance(source, str):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            line = f.readline()
+    else:
+        position = source.tell()
+        line = source.readline()
+        source.seek(position)
+        if isinstance(line, bytes):
+            line = line.decode("utf-8-sig")
+    return next(csv.reader(io.StringIO(line)), [])
+
+
+def _read_kwargs(schema: StatementSchema, raw_header: list) -> dict:
+    dtype = {}
+    for raw in raw_header:
+        canonical = schema.columns.get(normalize_header(raw))
+        if canonical in NUMERIC_DTYPES:
+            dtype[raw] = NUMERIC_DTYPES[canonical]
+    kwargs = {"dtype": dtype}
+    if schema.decimal != ".":
+        kwargs["decimal"] = schema.decimal
+    return kwargs
+
+
+def _coerce_numbers(df: pd.DataFrame, schema: StatementSchema) -> pd.DataFrame:
+    for col in NUMERIC_DTYPES:
+        if col in df.columns and not pd.api.types.is_numeric_dtype(df[col]):
+            values = df[col]
+            if schema.thousands:
+                values = values.str.replace(schema.thousands, "", regex=False)
+            df[col] = pd.to_numeric(values, errors="coerce")
+    return df
+
+
+def apply_schema(df: pd.DataFrame, schema: StatementSchema) -> pd.DataFrame:
+    """
+    Renames a frame read with `schema` to the canonical layout, makes the
+    amount columns numeric and fills the columns the bank does not export.
+    """
+    df.columns = [normalize_header(c) for c in df.columns]
+    df = df.rename(columns=schema.columns)
+    df = _coerce_numbers(df, schema)
+
+    # Bank exports without our categorisation get a neutral one
+    if "category" not in df.columns and {"credit", "debit"}.issubset(df.columns):
+        df["category"] = (df["credit"].fillna(0) > 0).map({True: "income", False: "expense"})
+    if "subcategory" not in df.columns and "category" in df.columns:
+        df["subcategory"] = "other"
+
+    return df
+
+
+def parse_dates(values: pd.Series, schema: StatementSchema) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    if schema.date_format:
+        try:
+            return pd.to_datetime(values, format=schema.date_format)
+        except (ValueError, TypeError):
+            logger.info(f"Dates do not match {schema.name} format {schema.date_format}; inferring")
+    return pd.to_datetime(values, dayfirst=schema.dayfirst)
+
+
+def read_statement_csv(source, chunksize=None):
+    """
+    Reads a statement CSV with the detected adapter's explicit dtypes.
+
+    Whole-file reads use the multithreaded pyarrow engine; layouts it cannot
+    handle (thousands separators, stray text in amount columns) fall back to
+    the C engine. Returns (schema, raw frame), or (schema, iterator of raw
+    frames) when `chunksize` is given; pass them through apply_schema (or
+    statement.normalize_frame) to get the canonical layout.
+    """
+    raw_header = read_header(source)
+    schema = detect_schema(tuple(normalize_header(c) for c in raw_header))
+    kwargs = _read_kwargs(schema, raw_header)
+
+    if chunksize:
+        kwargs.pop("dtype")
+        return schema, pd.read_csv(source, chunksize=chunksize, **kwargs)
+
+    if not schema.thousands:
+        start = None if isinstance(source, str) else source.tell()
+        try:
+            return schema, pd.read_csv(source, engine="pyarrow", **kwargs)
+        except ImportError:
+            pass
+        except ValueError as e:
+            logger.info(f"Fast CSV path failed for {schema.name} layout ({e}); falling back")
+        if start is not None:
+            source.seek(start)
+
+    kwargs.pop("dtype")
+    return schema, pd.read_csv(source, **kwargs)
@@ -0,0 +1,119 @@
+# server/tax_optimiser.py
+
+import numpy as np
+
+from statement import ParsedStatement
+from tax_regimes import DEFAULT_FINANCIAL_YEAR, get_regime
+from tax_snapshot import SECTION_LIMITS, tax_snapshot_from_statement
+
+# =============================================================================
+# Deduction what-if optimiser
+# =============================================================================
+# Answers "how much more 80C / 80D / home-loan interest should this client
+# claim, and when does the old regime start beating the new one?".
+# Starting from the deductions the tax snapshot found in the statement, every
+# combination of extra deductions on a grid (each capped by the room left
+# under SECTION_LIMITS) is evaluated in one vectorised batch: old-regime tax
+# depends on the deductions, new-regime tax does not.
+
+DEFAULT_GRID_STEPS = 51
+
+GRID_SECTIONS = {
+    "80C": "80C",
+    "80D": "80D",
+    "home_loan_interest": "24B",
+}
+
+
+def _plan(extras, index, total_extra, tax, regime):
+    return {
+        "extra_80C": round(float(extras["80C"][index]), 2),
+        "extra_80D": round(float(extras["80D"][index]), 2),
+        "extra_home_loan_interest": round(float(extras["home_loan_interest"][index]), 2),
+        "total_extra": round(float(total_extra[index]), 2),
+        "regime": regime,
+        "estimated_tax": round(float(tax), 2),
+    }
+
+
+def optimise_deductions(
+    statement: ParsedStatement,
+    steps: int = DEFAULT_GRID_STEPS,
+    financial_year: str = DEFAULT_FINANCIAL_YEAR,
+) -> dict:
+    """
+    Sweeps a grid of extra deductions on top of the statement's tax
+    snapshot (`steps` points per section with room left, a single 0 for a
+    section already at its limit) and returns the tax-minimising plan (the
+    cheapest one among ties) and the break-even plan: the smallest extra
+    deduction at which the old regime is no more expensive than the new.
+    """
+    if steps < 2:
+        raise ValueError("steps must be at least 2")
+
+    old_regime = get_regime("old", financial_year)
+
+    snapshot = tax_snapshot_from_statement(statement, financial_year)
+    base = snapshot["tax_base"]
+    claimed = base["deductions_claimed"]
+    estimate = snapshot["tax_estimate"]
+
+    # ---- GRID ----
+    # A section with no room left only has one plan: claim nothing extra
+    room = {name: max(SECTION_LIMITS[limit] - claimed[name], 0) for name, limit in GRID_SECTIONS.items()}
+    axes = {
+        name: np.linspace(0, left, steps) if left > 0 else np.zeros(1)
+        for name, left in room.items()
+    }
+    mesh = np.meshgrid(*axes.values(), indexing="ij")
+    extras = {name: values.ravel() for name, values in zip(axes, mesh)}
+    total_extra = extras["80C"] + extras["80D"] + extras["home_loan_interest"]
+
+    # ---- TAX OVER THE WHOLE GRID ----
+    taxable_old = (
+        base["gross_income"]
+        - (claimed["80C"] + extras["80C"])
+        - (claimed["80D"] + extras["80D"])
+        - (claimed["home_loan_interest"] + extras["home_loan_interest"])
+    )
+    old_tax = old_regime.tax(taxable_old)
+    new_tax = estimate["new_regime"]["estimated_tax"]
+
+    current_tax = min(estimate["old_regime"]["estimated_tax"], new_tax)
+
+    # ---- BEST PLAN ----
+    # Lowest tax; among equal taxes, the smallest extra investment (so when
+    # the new regime wins outright the plan is to invest nothing extra)
+    plan_tax = np.minimum(old_tax, new_tax)
+    best = np.lexsort((total_extra, plan_tax))[0]
+    best_plan = _plan(
+        extras, best, total_extra, plan_tax[best],
+        "old" if old_tax[best] < new_tax else "new"
+    )
+    best_plan["tax_saved"] = round(current_tax - best_plan["estimated_tax"], 2)
+
+    # ---- BREAK-EVEN ----
+    old_wins = np.flatnonzero(old_tax <= new_tax)
+    break_even = None
+    if len(old_wins):
+        flip = old_wins[np.lexsort((old_tax[old_wins], total_extra[old_wins]))[0]]
+        break_even = _plan(extras, flip, total_extra, old_tax[flip], "old")
+
+    return {
+        "financial_year": financial_year,
+        "current": {
+            "old_regime_tax": estimate["old_regime"]["estimated_tax"],
+            "new_regime_tax": new_tax,
+            "recommended_regime": estimate["recommended_regime"],
+        },
+        "grid": {
+            name: {
+                "max_extra": round(float(values[-1]), 2),
+                "step": round(float(values[1] - values[0]), 2) if len(values) > 1 else 0.0,
+            }
+            for name, values in axes.items()
+        },
+        "plans_evaluated": int(len(total_extra)),
+        "best_plan": best_plan,
+        "break_even": break_even,
+    }
@@ -0,0 +1,143 @@
+# server/tax_regimes.py
+
+from dataclasses import dataclass
+
+import numpy as np
+
+# =============================================================================
+# Slab engine
+# =============================================================================
+# Each income-tax regime is data: slab lower edges, the rate inside each slab,
+# cess, the section 87A rebate and the standard deduction. Tax for any
+# number of taxable incomes is evaluated at once: the tax owed at every slab
+# edge is precomputed as a cumulative sum, so an income only needs its slab
+# (one searchsorted) plus the marginal part above that slab's edge.
+
+@dataclass(frozen=True)
+class TaxRegime:
+    """
+    edges: lower edge of each slab, ascending, starting at 0
+    rates: rate applied inside each slab (same length as edges)
+    rebate_limit / rebate_max: taxable incomes up to the limit get up to
+        rebate_max off the slab tax (section 87A); 0 disables it
+    marginal_relief: just above rebate_limit, the slab tax is capped at the
+        income in excess of the limit (new regime)
+    """
+    name: str
+    financial_year: str
+    edges: tuple
+    rates: tuple
+    cess: float = 0.04
+    rebate_limit: float = 0
+    rebate_max: float = 0
+    marginal_relief: bool = False
+    standard_deduction: float = 0
+
+    def __post_init__(self):
+        if len(self.edges) != len(self.rates) or self.edges[0] != 0:
+            raise ValueError(f"{self.name} {self.financial_year}: slabs must start at 0 with one rate per edge")
+        if list(self.edges) != sorted(self.edges):
+            raise ValueError(f"{self.name} {self.financial_year}: slab edges must be ascending")
+
+    @property
+    def edge_tax(self) -> np.ndarray:
+        """Slab tax owed at each slab's lower edge."""
+        edges = np.asarray(self.edges, dtype=float)
+        rates = np.asarray(self.rates, dtype=float)
+        return np.concatenate([[0.0], np.cumsum(np.diff(edges) * rates[:-1])])
+
+    def tax(self, taxable_income):
+        """
+        Tax (including cess) for a scalar or an array of taxable incomes,
+        rounded to paise. Returns the same shape as the input.
+        """
+        income = np.maximum(np.asarray(taxable_income, dtype=float), 0)
+        edges = np.asarray(self.edges, dtype=float)
+        rates = np.asarray(self.rates, dtype=float)
+
+        slab = np.searchsorted(edges, income, side="right") - 1
+        tax = self.edge_tax[slab] + (income - edges[slab]) * rates[slab]
+
+        if self.rebate_limit:
+            rebate = np.where(income <= self.rebate_limit, np.minimum(tax, self.rebate_max), 0)
+            if self.marginal_relief:
+                above = income - self.rebate_limit
+                rebate = np.where(above > 0, np.maximum(tax - above, 0), rebate)
+            tax = tax - rebate
+
+        return np.round(tax * (1 + self.cess), 2)
+
+
+# ==============================
+# REGISTRY
+# ==============================
+
+REGIMES = {}
+
+DEFAULT_FINANCIAL_YEAR = "2025-26"
+
+
+def register_regime(regime: TaxRegime):
+    REGIMES[(regime.name, regime.financial_year)] = regime
+    return regime
+
+
+def get_regime(name: str, financial_year: str = DEFAULT_FINANCIAL_YEAR) -> TaxRegime:
+    try:
+        return REGIMES[(name, financial_year)]
+    except KeyError:
+        known = sorted(fy for n, fy in REGIMES if n == name)
+        raise ValueError(f"No {name} regime registered for FY {financial_year} (known: {known})")
+
+
+def financial_years(name: str) -> list:
+    return sorted(fy for n, fy in REGIMES if n == name)
+
+
+# Old regime: deductions (80C/80D/home loan) allowed, no standard deduction
+# applied by the snapshot; slabs and the 87A rebate (up to ₹12,500 for
+# taxable income up to ₹5 lakh) unchanged since FY 2023-24
+for year in ("2023-24", "2024-25", "2025-26"):
+    register_regime(TaxRegime(
+        name="old",
+        financial_year=year,
+        edges=(0, 250000, 500000, 1000000),
+        rates=(0.0, 0.05, 0.20, 0.30),
+        rebate_limit=500000,
+        rebate_max=12500,
+    ))
+
+# New regime (section 115BAC). The standard deduction applies when salary is
+# detected; the 87A rebate comes with marginal relief.
+register_regime(TaxRegime(
+    name="new",
+    financial_year="2023-24",
+    edges=(0, 300000, 600000, 900000, 1200000, 1500000),
+    rates=(0.0, 0.05, 0.10, 0.15, 0.20, 0.30),
+    rebate_limit=700000,
+    rebate_max=25000,
+    marginal_relief=True,
+    standard_deduction=50000,
+))
+
+register_regime(TaxRegime(
+    name="new",
+    financial_year="2024-25",
+    edges=(0, 300000, 700000, 1000000, 1200000, 1500000),
+    rates=(0.0, 0.05, 0.10, 0.15, 0.20, 0.30),
+    rebate_limit=700000,
+    rebate_max=25000,
+    marginal_relief=True,
+    standard_deduction=75000,
+))
+
+register_regime(TaxRegime(
+    name="new",
+    financial_year="2025-26",
+    edges=(0, 400000, 800000, 1200000, 1600000, 2000000, 2400000),
+    rates=(0.0, 0.05, 0.10, 0.15, 0.20, 0.25, 0.30),
+    rebate_limit=1200000,
+    rebate_max=60000,
+    marginal_relief=True,
+    standard_deduction=75000,
+))
@@ -1,15 +1,20 @@
 # server/tax_snapshot.py
 
+import numpy as np
 import pandas as pd
 import re
 
+from statement import ParsedStatement, parse_statement
+from tax_regimes import DEFAULT_FINANCIAL_YEAR, get_regime
+
 # ==============================
 # CONSTANTS
 # ==============================
 
 SECTION_LIMITS = {
     "80C": 150000,
-    "80D": 25000
+    "80D": 25000,
+    "24B": 200000  # home loan interest
 }
 
 SALARY_KEYWORDS = ["salary", "payroll", "wages"]
@@ -20,15 +25,29 @@ INVESTMENT_KEYWORDS = ["elss", "ppf", "mutual fund", "lic", "nps"]
 HOME_LOAN_KEYWORDS = ["home loan", "housing loan", "emi"]
 
 
+# Each keyword list is one tax tag; a transaction detail is classified into
+# a bitmask of every tag whose keywords it contains
+TAG_SALARY = 1 << 0
+TAG_TDS = 1 << 1
+TAG_INSURANCE = 1 << 2
+TAG_MEDICAL = 1 << 3
+TAG_INVESTMENT = 1 << 4
+TAG_HOME_LOAN = 1 << 5
+
+TAX_TAGS = {
+    TAG_SALARY: SALARY_KEYWORDS,
+    TAG_TDS: TDS_KEYWORDS,
+    TAG_INSURANCE: INSURANCE_KEYWORDS,
+    TAG_MEDICAL: MEDICAL_KEYWORDS,
+    TAG_INVESTMENT: INVESTMENT_KEYWORDS,
+    TAG_HOME_LOAN: HOME_LOAN_KEYWORDS,
+}
+
+
 # ==============================
 # HELPERS
 # ==============================
 
-def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [c.strip().lower() for c in df.columns]
-    return df
-
-
 def contains_any(text: str, keywords: list) -> bool:
     if not isinstance(text, str):
         return False
@@ -36,131 +55,137 @@ def contains_any(text: str, keywords: list) -> bool:
     return any(k in text for k in keywords)
 
 
-# ==============================
-# CORE TAX SNAPSHOT
-# ==============================
+def _build_classifier(tags: dict):
+    """
+    One regex over every keyword, wrapped in a lookahead so overlapping
+    matches are all found ("policy" contains "lic"). At a given position
+    the longest keyword wins, so each keyword's bits also include the tags
+    of the keywords that are prefixes of it.
+    """
+    keyword_tags = {}
+    for tag, keywords in tags.items():
+        for keyword in keywords:
+            keyword_tags[keyword] = keyword_tags.get(keyword, 0) | tag
+
+    keyword_bits = dict.fromkeys(keyword_tags, 0)
+    for keyword in keyword_bits:
+        for other, bits in keyword_tags.items():
+            if keyword.startswith(other):
+                keyword_bits[keyword] |= bits
+
+    alternation = "|".join(
+        re.escape(k) for k in sorted(keyword_bits, key=len, reverse=True)
+    )
+    return re.compile(f"(?=({alternation}))"), keyword_bits
 
 
-def compute_old_regime_tax(taxable_income: float) -> float:
-    """
-    Old regime slab-based tax (India) + 4% cess
+TAX_PATTERN, KEYWORD_BITS = _build_classifier(TAX_TAGS)
+
+
+def classify_details(details: pd.Series) -> np.ndarray:
     """
+    Tax-tag bitmask (uint8) per transaction detail, matching contains_any
+    for every tag at once.
 
-    tax = 0
+    Digit runs are collapsed first (keywords contain no digits, so this
+    cannot change a match); reference numbers then stop making every
+    narration unique and the regex runs once per distinct narration.
+    """
+    text = (
+        details.astype("string[pyarrow]")
+               .str.lower()
+               .str.replace(r"[0-9]+", "0", regex=True)
+    )
+    codes, uniques = pd.factorize(text)
 
-    if taxable_income <= 250000:
-        tax = 0
+    unique_bits = np.zeros(len(uniques) + 1, dtype=np.uint8)
+    for i, value in enumerate(uniques):
+        bits = 0
+        for keyword in TAX_PATTERN.findall(value):
+            bits |= KEYWORD_BITS[keyword]
+        unique_bits[i] = bits
 
-    elif taxable_income <= 500000:
-        tax = (taxable_income - 250000) * 0.05
+    # Missing details have code -1 and pick the trailing 0
+    return unique_bits[codes]
 
-    elif taxable_income <= 1000000:
-        tax = (
-            (250000 * 0.05) +
-            (taxable_income - 500000) * 0.20
-        )
 
-    else:
-        tax = (
-            (250000 * 0.05) +
-            (500000 * 0.20) +
-            (taxable_income - 1000000) * 0.30
-        )
+# ==============================
+# CORE TAX SNAPSHOT
+# ==============================
 
-    # Add 4% Health & Education cess
-    return round(tax * 1.04, 2)
 
-def compute_new_regime_tax_2025(taxable_income: float) -> float:
+def compute_old_regime_tax(taxable_income, financial_year: str = DEFAULT_FINANCIAL_YEAR):
     """
-    New tax regime (FY 2025–26) + 4% cess
-    Assumes ₹50,000 standard deduction already applied if salary.
+    Old regime slab-based tax (India) + 4% cess.
+    Accepts a scalar or a NumPy array of taxable incomes.
     """
+    tax = get_regime("old", financial_year).tax(taxable_income)
+    return float(tax) if np.ndim(tax) == 0 else tax
 
-    tax = 0
-
-    if taxable_income <= 300000:
-        tax = 0
-    elif taxable_income <= 600000:
-        tax = (taxable_income - 300000) * 0.05
-    elif taxable_income <= 900000:
-        tax = (300000 * 0.05) + (taxable_income - 600000) * 0.10
-    elif taxable_income <= 1200000:
-        tax = (
-            (300000 * 0.05) +
-            (300000 * 0.10) +
-            (taxable_income - 900000) * 0.15
-        )
-    elif taxable_income <= 1500000:
-        tax = (
-            (300000 * 0.05) +
-            (300000 * 0.10) +
-            (300000 * 0.15) +
-            (taxable_income - 1200000) * 0.20
-        )
-    else:
-        tax = (
-            (300000 * 0.05) +
-            (300000 * 0.10) +
-            (300000 * 0.15) +
-            (300000 * 0.20) +
-            (taxable_income - 1500000) * 0.30
-        )
 
-    return round(tax * 1.04, 2)
+def compute_new_regime_tax_2025(taxable_income, financial_year: str = DEFAULT_FINANCIAL_YEAR):
+    """
+    New tax regime for `financial_year` (FY 2025–26 by default), 87A rebate
+    and marginal relief included, + 4% cess
+    Assumes the regime's standard deduction already applied if salary.
+    """
+    tax = get_regime("new", financial_year).tax(taxable_income)
+    return float(tax) if np.ndim(tax) == 0 else tax
 
 
-def extract_tax_snapshot(csv_path: str) -> dict:
+def extract_tax_snapshot(csv_path: str, financial_year: str = DEFAULT_FINANCIAL_YEAR) -> dict:
     """
     Deterministic tax snapshot from bank statement CSV
     """
+    return tax_snapshot_from_statement(parse_statement(csv_path), financial_year)
+
+
+def tax_snapshot_from_statement(statement: ParsedStatement, financial_year: str = DEFAULT_FINANCIAL_YEAR) -> dict:
+    """
+    Deterministic tax snapshot from an already parsed statement, using the
+    slabs registered for `financial_year` (see tax_regimes.py)
+    """
+    old_regime = get_regime("old", financial_year)
+    new_regime = get_regime("new", financial_year)
 
     # ------------------------------
-    # LOAD CSV
+    # VALIDATE
     # ------------------------------
-    df = pd.read_csv(csv_path)
-    df = normalize_columns(df)
-
     required_cols = {"credit", "debit", "transaction detail"}
-    if not required_cols.issubset(df.columns):
-        raise ValueError(f"Missing required columns: {required_cols - set(df.columns)}")
+    if not required_cols.issubset(statement.frame.columns):
+        raise ValueError(f"Missing required columns: {required_cols - set(statement.frame.columns)}")
 
-    df["credit"] = pd.to_numeric(df["credit"], errors="coerce").fillna(0)
-    df["debit"] = pd.to_numeric(df["debit"], errors="coerce").fillna(0)
+    df = statement.frame.assign(
+        credit=statement.frame["credit"].fillna(0),
+        debit=statement.frame["debit"].fillna(0)
+    )
 
-    details = df["transaction detail"].astype(str)
+    tags = classify_details(df["transaction detail"])
+    is_salary = (tags & TAG_SALARY) != 0
 
     # ------------------------------
     # 1️⃣ TAX BASE (REAL NUMBERS)
     # ------------------------------
 
-    salary_income = df[
-        details.apply(lambda x: contains_any(x, SALARY_KEYWORDS))
-    ]["credit"].sum()
+    salary_income = df["credit"][is_salary].sum()
 
-    other_income = df[
-        (~details.apply(lambda x: contains_any(x, SALARY_KEYWORDS))) &
-        (df["credit"] > 0)
-    ]["credit"].sum()
+    other_income = df["credit"][~is_salary & (df["credit"] > 0)].sum()
 
     gross_income = salary_income + other_income
 
     # Standard deduction (only if salary detected)
-    standard_deduction = 50000 if salary_income > 0 else 0
+    standard_deduction = new_regime.standard_deduction if salary_income > 0 else 0
 
     # ------------------------------
     # 2️⃣ DEDUCTIONS (FROM DEBITS)
     # ------------------------------
 
-    deduction_80c = df[
-        details.apply(lambda x: contains_any(x, INVESTMENT_KEYWORDS))
-    ]["debit"].sum()
+    deduction_80c = df["debit"][(tags & TAG_INVESTMENT) != 0].sum()
 
-    deduction_80d = df[
-        details.apply(lambda x: contains_any(x, INSURANCE_KEYWORDS))
-    ]["debit"].sum()
+    deduction_80d = df["debit"][(tags & TAG_INSURANCE) != 0].sum()
 
     home_loan_interest = (
-        df[details.apply(lambda x: contains_any(x, HOME_LOAN_KEYWORDS))]["debit"].sum()
+        df["debit"][(tags & TAG_HOME_LOAN) != 0].sum()
         * 0.7  # conservative interest split
     )
 
@@ -168,11 +193,9 @@ def extract_tax_snapshot(csv_path: str) -> dict:
     # 3️⃣ TAX SIGNALS
     # ------------------------------
 
-    tds_detected = details.apply(lambda x: contains_any(x, TDS_KEYWORDS)).any()
+    tds_detected = ((tags & TAG_TDS) != 0).any()
 
-    medical_spend = df[
-        details.apply(lambda x: contains_any(x, MEDICAL_KEYWORDS))
-    ]["debit"].sum()
+    medical_spend = df["debit"][(tags & TAG_MEDICAL) != 0].sum()
 
     investment_activity_detected = deduction_80c > 0
 
@@ -210,17 +233,22 @@ def extract_tax_snapshot(csv_path: str) -> dict:
         0
     )
 
-    # New regime taxable income (FY 2025–26)
+    # New regime taxable income
     taxable_income_new = max(
         gross_income - standard_deduction,
         0
     )  
-    old_regime_tax = compute_old_regime_tax(taxable_income_old)
-    new_regime_tax = compute_new_regime_tax_2025(taxable_income_new)
+    old_regime_tax = float(old_regime.tax(taxable_income_old))
+    new_regime_tax = float(new_regime.tax(taxable_income_new))
     # ------------------------------
     # FINAL STRUCTURED OUTPUT
     # ------------------------------
     standard_deduction = standard_deduction or 0
+    new_regime_estimate = {
+        "taxable_income": round(taxable_income_new, 2),
+        "estimated_tax": round(new_regime_tax, 2),
+        "standard_deduction_applied": standard_deduction > 0
+    }
     return {
         "tax_base": {
             "salary_income": round(float(salary_income), 2),
@@ -255,15 +283,15 @@ def extract_tax_snapshot(csv_path: str) -> dict:
         },
 
         "tax_estimate": {
+            "financial_year": financial_year,
             "old_regime": {
                 "taxable_income": round(taxable_income_old, 2),
                 "estimated_tax": round(old_regime_tax, 2)
             },
-            "new_regime_2025_26": {
-                "taxable_income": round(taxable_income_new, 2),
-                "estimated_tax": round(new_regime_tax, 2),
-                "standard_deduction_applied": standard_deduction > 0
-            },
+            "new_regime": new_regime_estimate,
+            # Deprecated: the pre-registry key, kept for one release for API
+            # consumers that still read it; use new_regime + financial_year
+            **({"new_regime_2025_26": new_regime_estimate} if financial_year == "2025-26" else {}),
             "recommended_regime": "new" if new_regime_tax < old_regime_tax else "old",
             "confidence": "medium"
         },
@@ -0,0 +1,65 @@
+"""
+Parity tests for the aggregation paths: a statement analysed whole-file,
+in chunks (analyze_transactions_streaming) and incrementally against a
+stored history (incremental.py) must give the same payload.
+
+Run: python -m pytest test_aggregation.py
+"""
+
+import json
+
+import pytest
+
+import incremental
+from event_detection import analyze_statement_incremental, analyze_transactions
+from statement import parse_statement
+
+EXTRA = [("NETFLIX SUBSCRIPTION", 649, "Expense", "Entertainment")]
+
+
+def _canonical(payload):
+    # Chunks add the same floats in a different order, so sums can differ
+    # in the last bit; compare to a fixed number of decimals
+    return json.loads(
+        json.dumps(payload, sort_keys=True, default=str),
+        parse_float=lambda s: round(float(s), 6),
+    )
+
+
+@pytest.fixture
+def history():
+    token = incremental.store.create()
+    yield token
+    incremental.store.forget(token)
+
+
+@pytest.fixture
+def whole(statement_csv):
+    path = statement_csv(events=("job", "wedding"), extra=EXTRA)
+    return path, _canonical(analyze_transactions(path, debug=True))
+
+
+@pytest.mark.parametrize("chunksize", [7, 100, 10000])
+def test_chunked_matches_whole_file(whole, chunksize):
+    path, expected = whole
+    assert _canonical(analyze_transactions(path, chunksize=chunksize, debug=True)) == expected
+
+
+def test_incremental_matches_whole_file(whole, statement_csv, history):
+    path, expected = whole
+    # Last year's upload first, then the full statement, then the same again
+    earlier = statement_csv(months=12, events=("job", "wedding"), extra=EXTRA)
+    analyze_statement_incremental(parse_statement(earlier), history, debug=True)
+    for _ in range(2):
+        result = analyze_statement_incremental(parse_statement(path), history, debug=True)
+        assert _canonical(result) == expected
+
+
+def test_sections_match_across_paths(whole, history):
+    path, _ = whole
+    sections = ["monthly_summary", "life_event_scores"]
+    expected = analyze_transactions(path, sections=sections)
+    assert set(expected) == set(sections)
+    assert _canonical(analyze_transactions(path, chunksize=50, sections=sections)) == _canonical(expected)
+    result = analyze_statement_incremental(parse_statement(path), history, sections=sections)
+    assert _canonical(result) == _canonical(expected)
@@ -0,0 +1,189 @@
+"""
+Tests for the local life-event scorer (life_events.py), how its result
+is resolved against the LLM (event_detection.resolve_life_event) and the
+dated timeline (life_event_timeline, POST /life-events/timeline), on
+synthetic statements from conftest.py with injected events.
+
+Run: python -m pytest test_life_events.py
+"""
+
+import asyncio
+
+import httpx
+import pytest
+
+import event_detection
+from event_detection import analyze_statement, resolve_life_event, statement_life_event_timeline
+from life_events import AMBIGUITY_MARGIN, MIN_EVENT_SCORE
+
+SEEDS = range(3)
+
+
+def _scores(statement):
+    return analyze_statement(statement, sections=["life_event_scores"])["life_event_scores"]
+
+
+# ==============================
+# SCORER
+# ==============================
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_quiet_statements_score_none(make_statement, seed):
+    scores = _scores(make_statement(seed=seed))
+    assert scores["event"] == "none"
+    assert not scores["ambiguous"]
+    assert max(scores["scores"].values()) < MIN_EVENT_SCORE
+    assert scores["confidence"] == pytest.approx(1 - max(scores["scores"].values()), abs=1e-3)
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+@pytest.mark.parametrize("injected, expected", [
+    ("job", "jobChange"),
+    ("wedding", "wedding"),
+    ("baby", "newBaby"),
+    ("home", "homePurchase"),
+])
+def test_one_injected_event_per_class(make_statement, seed, injected, expected):
+    scores = _scores(make_statement(seed=seed, events=(injected,)))
+    assert scores["event"] == expected
+    assert not scores["ambiguous"]
+    assert scores["confidence"] == scores["scores"][expected] >= MIN_EVENT_SCORE
+    assert scores["reasoning"] != "No strong life-event signals in the statement."
+
+
+@pytest.mark.parametrize("hike, expected", [
+    (0.15, "jobChange"),
+    (0.10, "jobChange"),   # e.g. 80k -> 88k registers on its own
+    (0.05, "none"),
+])
+def test_salary_hike_threshold(make_statement, hike, expected):
+    assert _scores(make_statement(events=("job",), hike=hike))["event"] == expected
+
+
+def test_one_off_bonus_is_not_a_job_change(make_statement):
+    scores = _scores(make_statement(events=("bonus",)))
+    assert scores["event"] == "none"
+    assert scores["scores"]["jobChange"] == 0
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_wedding_and_home_loan_together_are_ambiguous(make_statement, seed):
+    scores = _scores(make_statement(seed=seed, events=("wedding", "home")))
+    top, second = sorted(scores["scores"].values(), reverse=True)[:2]
+    assert scores["ambiguous"]
+    assert top - second < AMBIGUITY_MARGIN
+    assert {scores["event"]} <= {"wedding", "homePurchase"}
+
+
+# ==============================
+# RESOLUTION
+# ==============================
+
+def _payload(statement):
+    return {"life_event_scores": _scores(statement), "analysis_text": "monthly summary"}
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """
+    Configures a Sarvam key and records calls instead of making them.
+    """
+    calls = []
+
+    def detect(analysis_text):
+        calls.append(analysis_text)
+        return {"primaryEvent": "wedding", "detectedSignal": "wedding", "reasoning": "from the LLM"}
+
+    monkeypatch.setenv("SARVAM_API_KEY", "test")
+    monkeypatch.setattr(event_detection, "detect_life_event_with_sarvam", detect)
+    return calls
+
+
+def test_clear_event_is_resolved_locally(make_statement, llm):
+    result = resolve_life_event(_payload(make_statement(events=("home",))))
+    assert result["source"] == "local"
+    assert result["primaryEvent"] == "homePurchase"
+    assert llm == []
+
+
+def test_ambiguous_event_escalates_to_the_llm(make_statement, llm):
+    result = resolve_life_event(_payload(make_statement(events=("wedding", "home"))))
+    assert result["source"] == "llm"
+    assert result["primaryEvent"] == "wedding"
+    assert set(result["scores"]) == {"jobChange", "wedding", "newBaby", "homePurchase"}
+    assert llm == ["monthly summary"]
+
+
+def test_ambiguous_event_stays_local_without_a_key(make_statement, monkeypatch):
+    monkeypatch.delenv("SARVAM_API_KEY", raising=False)
+    result = resolve_life_event(_payload(make_statement(events=("wedding", "home"))))
+    assert result["source"] == "local"
+
+
+# ==============================
+# TIMELINE
+# ==============================
+
+def test_quiet_statement_has_an_empty_timeline(make_statement):
+    assert statement_life_event_timeline(make_statement()) == []
+
+
+def test_each_occurrence_is_one_dated_entry(make_statement):
+    # Baby in Nov 2022, job change from Jan 2023: every 3-month window
+    # covering an event scores it, and those windows merge into one entry
+    timeline = statement_life_event_timeline(make_statement(events=("baby", "job")))
+    assert [(t["event"], t["start"], t["end"]) for t in timeline] == [
+        ("newBaby", "2022-09", "2022-11"),
+        ("jobChange", "2023-01", "2023-03"),
+    ]
+    assert all(t["confidence"] >= MIN_EVENT_SCORE for t in timeline)
+    assert "hospital_spike" in timeline[0]["signals"]
+    assert timeline[1]["signals"] == ["salary_shift"]
+
+
+def test_window_length_sets_the_span(make_statement):
+    statement = make_statement(events=("wedding",))
+    one_month = statement_life_event_timeline(statement, window=1)
+    assert [(t["event"], t["start"], t["end"]) for t in one_month] == [("wedding", "2023-03", "2023-03")]
+    six_months = statement_life_event_timeline(statement, window=6)
+    assert [t["event"] for t in six_months] == ["wedding"]
+    assert six_months[0]["start"] <= "2023-03" <= six_months[0]["end"]
+
+
+def test_window_as_long_as_the_statement_has_no_timeline(make_statement):
+    assert statement_life_event_timeline(make_statement(months=6, events=("wedding",)), window=6) == []
+
+
+def test_window_below_one_month_is_rejected(make_statement):
+    with pytest.raises(ValueError):
+        statement_life_event_timeline(make_statement(), window=0)
+
+
+def _post_timeline(csv_path, window):
+    import main
+
+    async def post():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            with open(csv_path, "rb") as f:
+                return await client.post(
+                    "/life-events/timeline",
+                    files={"file": ("statement.csv", f, "text/csv")},
+                    data={"window": str(window)},
+                )
+    return asyncio.run(post())
+
+
+def test_timeline_endpoint(statement_csv):
+    response = _post_timeline(statement_csv(events=("wedding",)), 3)
+    assert response.status_code == 200
+    body = response.json()
+    assert body["window_months"] == 3
+    assert [t["event"] for t in body["timeline"]] == ["wedding"]
+
+
+@pytest.mark.parametrize("window", [0, -2])
+def test_timeline_endpoint_rejects_short_windows(statement_csv, window):
+    response = _post_timeline(statement_csv(), window)
+    assert response.status_code == 400
+    assert "window" in response.json()["detail"]
@@ -0,0 +1,89 @@
+"""
+Tests for merchant key normalisation (merchant_keys.py), on narrations in
+the formats HDFC, ICICI, SBI and Axis statements use.
+
+Run: python -m pytest test_merchant_keys.py
+"""
+
+import pandas as pd
+
+from aggregation import aggregate_frame, recurring_counts
+from event_detection import analyze_statement
+from merchant_keys import UNKNOWN_MERCHANT, merchant_key, merchant_keys
+
+
+def test_hdfc_upi_narrations_keep_the_payee():
+    # HDFC: UPI-<payee>-<vpa>-<ifsc>-<reference>-<remark>
+    assert merchant_key("UPI-SWIGGY-swiggy@icici-ICIC0000103-123") == "swiggy"
+    assert merchant_key("UPI-SWIGGY-SWIGGY@ICICI-ICIC0DC0099-401712345678-PAYMENT FROM PHONE") == "swiggy"
+    assert merchant_key("UPI-ZOMATO-zomato@hdfc-HDFC0000001-412345678901-UPI") == "zomato"
+
+
+def test_hdfc_narrations_do_not_collapse_into_one_merchant():
+    keys = merchant_keys(pd.Series([
+        "UPI-SWIGGY-swiggy@icici-ICIC0000103-412345678901-UPI",
+        "UPI-ZOMATO-zomato@hdfc-HDFC0000001-412345678902-UPI",
+        "UPI-BLINKIT-blinkit.payu@hdfcbank-HDFC0MERUPI-412345678903-UPI",
+    ]))
+    assert list(keys) == ["swiggy", "zomato", "blinkit"]
+
+
+def test_icici_sbi_and_axis_upi_narrations():
+    assert merchant_key("UPI/471007221478/RAJ KIRANA/okaxis") == "raj kirana"
+    assert merchant_key("UPI/401712345678/SWIGGY/swiggy.in@icici/ICICI Bank") == "swiggy"
+    assert merchant_key("UPI/P2M/401712345678/SWIGGY/Payment") == "swiggy"
+
+
+def test_neft_imps_and_card_narrations():
+    assert merchant_key("NEFT/ACME CORP SALARY/575314301269") == "acme corp salary"
+    assert merchant_key("IMPS-412345678901-JOHN DOE-SBIN0001234-XXXXXXXX1234-RENT") == "john doe"
+    assert merchant_key("POS AMAZON 138227633838") == "amazon"
+    assert merchant_key("POS 416021XXXXXX1234 AMAZON") == "amazon"
+
+
+def test_references_change_but_key_does_not():
+    keys = merchant_keys(pd.Series([
+        "UPI-NETFLIX-netflix@hdfcbank-HDFC0000001-401712345678-SUBSCRIPTION",
+        "UPI-NETFLIX-netflix@hdfcbank-HDFC0000001-402998877665-SUBSCRIPTION",
+    ]))
+    assert keys.nunique() == 1
+
+
+def test_names_with_digits_are_kept():
+    assert merchant_key("UPI/FOODSHOP2/1234") == "foodshop2"
+    assert merchant_key("7ELEVEN STORE") == "7eleven store"
+    assert merchant_key("SHOP1234") == "shop1234"
+    assert merchant_key("STORE 24X7 1001") == "store 24x7"
+
+
+def test_reference_shapes_are_stripped():
+    assert merchant_key("NEFT-SBIN420123456789-JOHN DOE") == "john doe"
+    assert merchant_key("UPI/HDFCN52022062712345678/ACME") == "acme"
+    assert merchant_key("POS 01MAY24 AMAZON") == "amazon"
+    assert merchant_key("REF 4120A3456789 SWIGGY") == "swiggy"
+
+
+def test_channel_only_narrations_are_unknown():
+    assert merchant_key("ATM WDL") == UNKNOWN_MERCHANT
+    assert merchant_key("UPI/REF 1234567") == UNKNOWN_MERCHANT
+    assert merchant_keys(pd.Series([None, "NEFT"])).tolist() == [UNKNOWN_MERCHANT] * 2
+
+
+CHANNEL_ONLY_ROWS = [
+    ("ATM WDL", 5000, "Expense", "Cash"),
+    ("UPI/REF 1234567", 300, "Expense", "UPI"),
+    ("NEFT", 1200, "Expense", "Transfer"),
+]
+
+
+def test_unknown_is_never_a_recurring_merchant(make_statement):
+    statement = make_statement(months=6, extra=CHANNEL_ONLY_ROWS)
+    assert merchant_keys(statement.frame["transaction detail"]).eq(UNKNOWN_MERCHANT).any()
+
+    section = analyze_statement(statement, sections=["recurring_merchants"])["recurring_merchants"]
+    merchants = [r["merchant"] for r in section]
+    assert UNKNOWN_MERCHANT not in merchants
+    assert {"swiggy", "landlord rent", "acme corp salary"} <= set(merchants)
+
+    counts = recurring_counts(aggregate_frame(statement.frame)["detail_months"])
+    assert UNKNOWN_MERCHANT not in set(counts["merchant"])
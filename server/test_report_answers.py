@@ -0,0 +1,88 @@
+"""
+Tests for local report-chat answers (report_answers.py): factual lookups
+are answered from the report's structured fields, everything else falls
+through to the LLM (None).
+
+Run: python -m pytest test_report_answers.py
+"""
+
+import pytest
+
+from report_answers import answer_locally
+
+REPORT = {
+    "monthly_summary": [
+        {"month": "2025-01", "income": 75000, "expenses": 160796, "savings": -85796},
+        {"month": "2025-02", "income": 75000, "expenses": 166899, "savings": -91899},
+        {"month": "2025-03", "income": 95000, "expenses": 107798, "savings": -12798},
+    ],
+    "category_breakdown": {
+        "2025-01": [{"category": "rent", "amount": 25000}, {"category": "food", "amount": 12000}],
+        "2025-02": [{"category": "rent", "amount": 25000}, {"category": "shopping", "amount": 40000}],
+    },
+    "tax_snapshot": {
+        "tax_base": {"deductions_claimed": {"80C": 50000, "80D": 0, "home_loan_interest": 0}},
+        "tax_gaps": {"potential_80C_remaining": 100000, "potential_80D_remaining": 25000},
+        "tax_estimate": {
+            "financial_year": "2025-26",
+            "old_regime": {"estimated_tax": 52000},
+            "new_regime": {"estimated_tax": 31200},
+            "recommended_regime": "new",
+        },
+    },
+}
+
+
+def test_monthly_lookups():
+    assert answer_locally(REPORT, "What was my income in March?") == "In March 2025 your income was ₹95,000."
+    assert answer_locally(REPORT, "which month had the highest expenses") == (
+        "Your highest expenses were in February 2025: ₹1,66,899."
+    )
+
+
+def test_category_lookup():
+    assert answer_locally(REPORT, "what was my biggest expense category") == (
+        "Your biggest expense category from January 2025 to February 2025 was rent at ₹50,000."
+    )
+
+
+def test_tax_lookups():
+    assert answer_locally(REPORT, "how much tax will I pay") == (
+        "Your estimated tax is ₹31,200 under the new regime (₹52,000 old, ₹31,200 new)."
+    )
+    assert answer_locally(REPORT, "which regime is better?").startswith("The new regime is cheaper")
+    assert answer_locally(REPORT, "How much 80C is left?") == "You can still claim up to ₹1,00,000 under section 80C."
+
+
+def test_income_tax_is_a_tax_question():
+    assert answer_locally(REPORT, "what is my total income tax").startswith("Your estimated tax is")
+
+
+@pytest.mark.parametrize("question", [
+    "how much tax can I save",
+    "how much tax would I save under the new regime",
+    "how much can I save on tax with 80C",
+    "what is the lowest tax I could pay",
+    "how do I reduce my tax",
+    "what are my tax savings options",
+])
+def test_tax_saving_questions_go_to_the_llm(question):
+    assert answer_locally(REPORT, question) is None
+
+
+@pytest.mark.parametrize("question", [
+    "how much tax did I pay in March",
+    "what was my tax this month",
+    "tax paid last quarter",
+])
+def test_period_scoped_tax_questions_go_to_the_llm(question):
+    assert answer_locally(REPORT, question) is None
+
+
+@pytest.mark.parametrize("question", [
+    "Why are my expenses so high?",
+    "What should I invest in?",
+    "tell me about the market",
+])
+def test_open_ended_questions_go_to_the_llm(question):
+    assert answer_locally(REPORT, question) is None